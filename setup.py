@@ -31,6 +31,16 @@ setup(
                       'psycopg2-binary',
                       'SQLAlchemy~=2.0',
                      ],
+    extras_require={
+        'arrow': ['pyarrow'],
+        'async': ['asyncpg', 'greenlet'],
+    },
+    entry_points={
+        'console_scripts': [
+            'uw-person-export=uw_person_client.export:main',
+            'uw-person-snapshot=uw_person_client.snapshot:main',
+        ],
+    },
     license='Apache License, Version 2.0',
     description=('A library for connecting to and querying the '
                  'T&LS UW person datastore'),
@@ -5,17 +5,20 @@
 import logging
 import os
 
-# setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    handlers=[
-        logging.StreamHandler()
-    ])
+# applications configure logging; the library only adds a no-op handler
+logging.getLogger(__name__).addHandler(logging.NullHandler())
 
 appenv = os.getenv("UW_PERSON_CLIENT_ENV", os.getenv("AXDD_PERSON_CLIENT_ENV"))
 
-if appenv == "PROD":
-    from uw_person_client.clients.core_client import UWPersonClient
-else:
-    from uw_person_client.clients.mock_client import (
-        MockedUWPersonClient as UWPersonClient)
+
+def __getattr__(name):
+    # import the client, and with it SQLAlchemy, on first use
+    if name == "UWPersonClient":
+        if appenv == "PROD":
+            from uw_person_client.clients.core_client import UWPersonClient
+        else:
+            from uw_person_client.clients.mock_client import (
+                MockedUWPersonClient as UWPersonClient)
+        globals()[name] = UWPersonClient
+        return UWPersonClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
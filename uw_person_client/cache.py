@@ -0,0 +1,192 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from uw_person_client.components import person_keys
+
+
+class ReferenceDataCache():
+    """Holds small lookup tables in memory, keyed by row id, reloading a
+    table once it is older than ttl seconds. Cached values are shared by
+    every caller and are read-only components.
+    """
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._tables = {}
+        self._lock = Lock()
+
+    def get(self, name, key, load_all, load_one=None):
+        """Return the cached value for key in table name, loading the table
+        with load_all() when it is missing or stale. Keys absent from the
+        table are fetched with load_one(key) and added to it.
+        """
+        values = self._get_table(name, load_all)
+        try:
+            return values[key]
+        except KeyError:
+            if load_one is None:
+                return None
+            value = load_one(key)
+            if value is not None:
+                values[key] = value
+            return value
+
+    def clear(self, name=None):
+        with self._lock:
+            if name is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(name, None)
+
+    def _get_table(self, name, load_all):
+        entry = self._tables.get(name)
+        if entry is None or monotonic() - entry[0] > self.ttl:
+            # loaded without holding the lock, which the async client would
+            # hold across a switch to another coroutine on the same thread;
+            # concurrent callers may each load the table, and the last one
+            # loaded replaces it
+            entry = (monotonic(), load_all())
+            with self._lock:
+                self._tables[name] = entry
+        return entry[1]
+
+
+class PersonCache():
+    """Size-bounded LRU cache of mapped persons with a TTL. Each entry is
+    reachable by every identifier of its person, so a lookup by uwnetid
+    populates the cache for the uwregid, student number and system key
+    lookups of the same person with the same options.
+    """
+
+    def __init__(self, maxsize=1000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._keys = {}
+        self._lock = Lock()
+
+    def get(self, identifier, value, options=(), validate=None):
+        """Return the cached person for an identifier value, or None. An
+        entry is dropped when it has expired or validate(entry) is False.
+        """
+        with self._lock:
+            entry = self._keys.get((identifier, value, options))
+            if entry is not None and monotonic() > entry.expires:
+                self._remove(entry)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(id(entry))
+        if entry is not None and validate is not None and not validate(entry):
+            with self._lock:
+                self._remove(entry)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry.person
+
+    def set(self, person, identifier, value, options=(), version=None):
+        keys = [(identifier, value, options)]
+        for name, key in person_keys(person):
+            keys.append((name, key, options))
+        entry = PersonCacheEntry(person, keys, monotonic() + self.ttl,
+                                 version)
+        with self._lock:
+            for key in keys:
+                if key in self._keys:
+                    self._remove(self._keys[key])
+            self._entries[id(entry)] = entry
+            for key in keys:
+                self._keys[key] = entry
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries.values())))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+
+    def stats(self):
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize}
+
+    def _remove(self, entry):
+        if self._entries.pop(id(entry), None) is not None:
+            for key in entry.keys:
+                if self._keys.get(key) is entry:
+                    del self._keys[key]
+
+
+class PersonCacheEntry():
+
+    def __init__(self, person, keys, expires, version=None):
+        self.person = person
+        self.keys = keys
+        self.expires = expires
+        self.version = version
+
+
+class NotFoundCache():
+    """Size-bounded record of identifier values that matched no person,
+    each remembered for ttl seconds.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self._expires = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, identifier, value):
+        key = (identifier, value)
+        with self._lock:
+            expires = self._expires.get(key)
+            if expires is None:
+                return False
+            if monotonic() > expires:
+                del self._expires[key]
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, identifier, value):
+        key = (identifier, value)
+        with self._lock:
+            self._expires.pop(key, None)
+            self._expires[key] = monotonic() + self.ttl
+            while len(self._expires) > self.maxsize:
+                self._expires.popitem(last=False)
+
+    def discard(self, identifier, value):
+        with self._lock:
+            self._expires.pop((identifier, value), None)
+
+    def discard_person(self, person):
+        """Forget the identifier values of a person that has been loaded,
+        such as a uwnetid that was not found before it was assigned
+        """
+        for identifier, value in person_keys(person):
+            self.discard(identifier, value)
+
+    def clear(self):
+        with self._lock:
+            self._expires.clear()
+
+    def stats(self):
+        return {"hits": self.hits,
+                "size": len(self._expires),
+                "maxsize": self.maxsize}
@@ -2,7 +2,46 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
+import json
+from contextlib import nullcontext
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from uw_person_client.components import (
+    Adviser, Degree, Employee, Hold, Major, Person, Sport, Student,
+    Transcript, Transfer)
+from uw_person_client.exceptions import (
+    InvalidPageTokenException, PersonNotFoundException)
+
+# column tables of student relations, which are keyed by system_key
+COLUMN_TABLES = (
+    "majors", "pending_majors", "sports", "advisers", "transcripts",
+    "transfers", "holds", "degrees")
+# component and leading key columns of each table of get_columns()
+COMPONENT_TABLES = {
+    "person": (Person, ()),
+    "employee": (Employee, ("uwregid",)),
+    "student": (Student, ()),
+    "majors": (Major, ("system_key", "position")),
+    "pending_majors": (Major, ("system_key", "position")),
+    "sports": (Sport, ("system_key",)),
+    "advisers": (Adviser, ("system_key", "uwnetid", "uwregid")),
+    "transcripts": (Transcript, ("system_key",)),
+    "transfers": (Transfer, ("system_key",)),
+    "holds": (Hold, ("system_key",)),
+    "degrees": (Degree, ("system_key",)),
+}
+
+
 class AbstractUWPersonClient():
+    # maximum number of identifiers bound into a single batch query
+    lookup_chunk_size = 1000
+    # number of rows fetched per round trip by the iter_* methods
+    stream_batch_size = 500
+
+    def session_scope(self):
+        """Context manager for a block of calls that share a database
+        session; a no-op for clients without one
+        """
+        return nullcontext()
 
     def get_person_by_uwnetid(self, uwnetid):
         raise NotImplementedError()
@@ -13,10 +52,22 @@ class AbstractUWPersonClient():
     def get_person_by_student_number(self, student_number):
         raise NotImplementedError()
 
+    def get_persons_by_uwnetids(self, uwnetids):
+        raise NotImplementedError()
+
+    def get_persons_by_uwregids(self, uwregids):
+        raise NotImplementedError()
+
+    def get_persons_by_student_numbers(self, student_numbers):
+        raise NotImplementedError()
+
+    def get_persons_by_system_keys(self, system_keys):
+        raise NotImplementedError()
+
     def get_persons(self, page=None, page_size=None):
         raise NotImplementedError()
 
-    def get_registered_students(self):
+    def get_registered_students(self, page=None, page_size=None):
         raise NotImplementedError()
 
     def get_active_students(self, page=None, page_size=None):
@@ -28,12 +79,240 @@ class AbstractUWPersonClient():
     def get_advisers(self, advising_program=None):
         raise NotImplementedError()
 
+    def get_persons_page(self, page_size, page_token=None):
+        raise NotImplementedError()
+
+    def get_registered_students_page(self, page_size, page_token=None):
+        raise NotImplementedError()
+
+    def get_active_students_page(self, page_size, page_token=None):
+        raise NotImplementedError()
+
+    def get_active_employees_page(self, page_size, page_token=None):
+        raise NotImplementedError()
+
+    def get_advisers_page(self, page_size, page_token=None,
+                          advising_program=None):
+        raise NotImplementedError()
+
+    def iter_persons(self, batch_size=None):
+        raise NotImplementedError()
+
+    def iter_registered_students(self, batch_size=None):
+        raise NotImplementedError()
+
+    def iter_active_students(self, batch_size=None):
+        raise NotImplementedError()
+
+    def iter_active_employees(self, batch_size=None):
+        raise NotImplementedError()
+
+    def iter_advisers(self, advising_program=None, batch_size=None):
+        raise NotImplementedError()
+
     def get_persons_by_adviser_netid(self, uwnetid):
         raise NotImplementedError()
 
     def get_persons_by_adviser_regid(self, uwregid):
         raise NotImplementedError()
 
+    def get_adviser_caseloads(self, uwnetids=None, uwregids=None,
+                              advising_program=None):
+        raise NotImplementedError()
+
+    def get_columns(self, population="persons", relations=None,
+                    advising_program=None, arrow=False):
+        raise NotImplementedError()
+
+    def get_persons_updated_since(self, since=None, batch_size=None):
+        raise NotImplementedError()
+
+    def get_persons_updated_since_page(self, page_size, page_token=None,
+                                       since=None, watermark=None):
+        raise NotImplementedError()
+
+    def get_update_watermark(self):
+        raise NotImplementedError()
+
+    def get_person_keys(self, population="persons", advising_program=None):
+        raise NotImplementedError()
+
+    def _get_persons_by_lookup(self, get_person, values, **kwargs):
+        """Return a dict of each value to the person that get_person
+        finds for it, or None
+        """
+        persons = {}
+        for value in values:
+            try:
+                persons[value] = get_person(value, **kwargs)
+            except PersonNotFoundException:
+                persons[value] = None
+        return persons
+
+    def _caseload_identifiers(self, name, values):
+        # a bare string would be read as a collection of characters
+        if values is None:
+            return None
+        if isinstance(values, (str, bytes)):
+            raise TypeError(f"{name} must be a collection of identifiers")
+        return list(values)
+
+    def _caseload_keys(self, uwnetid, uwregid, uwnetids, uwregids):
+        # the requested identifiers that an adviser matches
+        if uwnetids is None and uwregids is None:
+            return [uwnetid]
+        return [key for key, keys in ((uwnetid, uwnetids),
+                                      (uwregid, uwregids))
+                if keys is not None and key in keys]
+
+    def _chunked(self, values):
+        values = list(values)
+        for i in range(0, len(values), self.lookup_chunk_size):
+            yield values[i:i + self.lookup_chunk_size]
+
+    def _parse_fields(self, fields):
+        """Return the projection for fields such as ["uwnetid",
+        "student.majors", "employee"]: person attribute names keyed by
+        "person", plus the attribute names (None for all of them) of an
+        included student or employee
+        """
+        if isinstance(fields, str):
+            fields = [fields]
+        projection = {"person": []}
+        for field in fields:
+            component, _, name = field.partition(".")
+            if component not in ("student", "employee"):
+                projection["person"].append(field)
+            elif not name:
+                projection[component] = None
+            elif projection.get(component, []) is not None:
+                projection.setdefault(component, []).append(name)
+        return projection
+
+    def _prune_person(self, person, **kwargs):
+        """Remove the components and attributes that the include_* and
+        fields arguments leave out from a fully loaded person
+        """
+        if not kwargs.get('include_employee', True):
+            self._delete_attr(person, "employee")
+        if not kwargs.get('include_student', True):
+            self._delete_attr(person, "student")
+        elif hasattr(person, "student"):
+            for name in ("transcripts", "transfers", "sports", "advisers",
+                         "majors", "pending_majors", "holds", "degrees"):
+                if not kwargs.get(f'include_student_{name}', True):
+                    self._delete_attr(person.student, name)
+        if kwargs.get('fields') is not None:
+            self._project_person(person, self._parse_fields(kwargs['fields']))
+        return person
+
+    def _project_person(self, person, projection):
+        self._retain_attrs(person, projection["person"] + [
+            component for component in ("student", "employee")
+            if component in projection])
+        for component in ("student", "employee"):
+            if (projection.get(component) is not None and
+                    hasattr(person, component)):
+                self._retain_attrs(getattr(person, component),
+                                   projection[component])
+
+    def _retain_attrs(self, obj, names):
+        for name in obj.attrs():
+            if name not in names:
+                delattr(obj, name)
+
+    def _delete_attr(self, obj, attr):
+        try:
+            delattr(obj, attr)
+        except AttributeError:
+            pass
+
+    def _column_relations(self, relations=None):
+        if relations is None:
+            return COLUMN_TABLES
+        for name in relations:
+            if name not in COLUMN_TABLES:
+                raise ValueError(f"Unknown relation '{name}'")
+        return relations
+
+    def _get_component_columns(self, persons, relations=None, arrow=False):
+        """Return fully loaded persons as the tables of column lists that
+        get_columns() selects. Terms are split into year and quarter
+        columns.
+        """
+        relations = self._column_relations(relations)
+        rows = {name: [] for name in ("person", "employee", "student",
+                                      *relations)}
+        for person in persons:
+            rows["person"].append(({}, person))
+            employee = getattr(person, "employee", None)
+            if employee is not None:
+                rows["employee"].append(({"uwregid": person.uwregid},
+                                         employee))
+            student = getattr(person, "student", None)
+            if student is None:
+                continue
+            rows["student"].append(({}, student))
+            keys = {"system_key": student.system_key}
+            for name in relations:
+                items = getattr(student, name, None) or []
+                for position, item in enumerate(items, start=1):
+                    if name in ("majors", "pending_majors"):
+                        rows[name].append(
+                            ({**keys, "position": position}, item))
+                    elif name == "advisers":
+                        rows[name].append((
+                            {**keys, "uwnetid": item.uwnetid,
+                             "uwregid": item.uwregid},
+                            getattr(getattr(item, "employee", None),
+                                    "adviser", None)))
+                    else:
+                        rows[name].append((keys, item))
+
+        tables = {name: self._component_table(name, table_rows)
+                  for name, table_rows in rows.items()}
+        if arrow:
+            import pyarrow
+            return {name: pyarrow.table(columns)
+                    for name, columns in tables.items()}
+        return tables
+
+    def _component_table(self, name, rows):
+        component, keys = COMPONENT_TABLES[name]
+        # nested components have tables of their own
+        fields = [field for field in component.FIELDS if field not in (
+            "student", "employee", "adviser", *COLUMN_TABLES)]
+        table = {key: [values[key] for values, item in rows] for key in keys}
+        for field in fields:
+            values = [getattr(item, field, None) for values, item in rows]
+            if field.endswith("_term"):
+                table[f"{field}_year"] = [
+                    getattr(term, "year", None) for term in values]
+                table[f"{field}_quarter"] = [
+                    getattr(term, "quarter", None) for term in values]
+            else:
+                table[field] = values
+        return table
+
+    def _check_page_size(self, page_size):
+        if page_size < 1:
+            raise ValueError(f"Invalid page_size '{page_size}'")
+
+    def _encode_page_token(self, key):
+        return urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+    def _decode_page_token(self, page_token):
+        key = self._load_page_token(page_token)
+        if not isinstance(key, int) or isinstance(key, bool):
+            raise InvalidPageTokenException()
+        return key
+
+    def _load_page_token(self, page_token):
+        try:
+            return json.loads(urlsafe_b64decode(page_token.encode()))
+        except (AttributeError, ValueError):
+            raise InvalidPageTokenException()
+
     def _zfill_or_none(self, value, length):
         value = str(value).zfill(length) if (
             value and len(str(value)) > 0) else None
@@ -46,3 +325,178 @@ class AbstractUWPersonClient():
 
     def format_student_number(self, value):
         return self._zfill_or_none(value, 7)
+
+
+class AbstractAsyncUWPersonClient(AbstractUWPersonClient):
+    """Awaitable counterpart of the sync client, whose methods are run by
+    _call(). The iter_* methods return async generators over keyset pages.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get_person_by_uwnetid(self, uwnetid, **kwargs):
+        return await self._call(
+            self.client.get_person_by_uwnetid, uwnetid, **kwargs)
+
+    async def get_person_by_uwregid(self, uwregid, **kwargs):
+        return await self._call(
+            self.client.get_person_by_uwregid, uwregid, **kwargs)
+
+    async def get_person_by_student_number(self, student_number, **kwargs):
+        return await self._call(
+            self.client.get_person_by_student_number, student_number,
+            **kwargs)
+
+    async def get_person_by_system_key(self, system_key, **kwargs):
+        return await self._call(
+            self.client.get_person_by_system_key, system_key, **kwargs)
+
+    async def get_persons_by_uwnetids(self, uwnetids, **kwargs):
+        return await self._call(
+            self.client.get_persons_by_uwnetids, uwnetids, **kwargs)
+
+    async def get_persons_by_uwregids(self, uwregids, **kwargs):
+        return await self._call(
+            self.client.get_persons_by_uwregids, uwregids, **kwargs)
+
+    async def get_persons_by_student_numbers(self, student_numbers,
+                                             **kwargs):
+        return await self._call(
+            self.client.get_persons_by_student_numbers, student_numbers,
+            **kwargs)
+
+    async def get_persons_by_system_keys(self, system_keys, **kwargs):
+        return await self._call(
+            self.client.get_persons_by_system_keys, system_keys, **kwargs)
+
+    async def get_persons(self, page=None, page_size=None, **kwargs):
+        return await self._call(
+            self.client.get_persons, page=page, page_size=page_size,
+            **kwargs)
+
+    async def get_registered_students(self, page=None, page_size=None,
+                                      **kwargs):
+        return await self._call(
+            self.client.get_registered_students, page=page,
+            page_size=page_size, **kwargs)
+
+    async def get_active_students(self, page=None, page_size=None, **kwargs):
+        return await self._call(
+            self.client.get_active_students, page=page,
+            page_size=page_size, **kwargs)
+
+    async def get_active_employees(self, page=None, page_size=None, **kwargs):
+        return await self._call(
+            self.client.get_active_employees, page=page,
+            page_size=page_size, **kwargs)
+
+    async def get_advisers(self, advising_program=None, **kwargs):
+        return await self._call(
+            self.client.get_advisers, advising_program=advising_program,
+            **kwargs)
+
+    async def get_persons_page(self, page_size, page_token=None, **kwargs):
+        return await self._call(
+            self.client.get_persons_page, page_size, page_token, **kwargs)
+
+    async def get_registered_students_page(self, page_size, page_token=None,
+                                           **kwargs):
+        return await self._call(
+            self.client.get_registered_students_page, page_size, page_token,
+            **kwargs)
+
+    async def get_active_students_page(self, page_size, page_token=None,
+                                       **kwargs):
+        return await self._call(
+            self.client.get_active_students_page, page_size, page_token,
+            **kwargs)
+
+    async def get_active_employees_page(self, page_size, page_token=None,
+                                        **kwargs):
+        return await self._call(
+            self.client.get_active_employees_page, page_size, page_token,
+            **kwargs)
+
+    async def get_advisers_page(self, page_size, page_token=None,
+                                advising_program=None, **kwargs):
+        return await self._call(
+            self.client.get_advisers_page, page_size, page_token,
+            advising_program=advising_program, **kwargs)
+
+    async def get_persons_by_adviser_netid(self, uwnetid, **kwargs):
+        return await self._call(
+            self.client.get_persons_by_adviser_netid, uwnetid, **kwargs)
+
+    async def get_persons_by_adviser_regid(self, uwregid, **kwargs):
+        return await self._call(
+            self.client.get_persons_by_adviser_regid, uwregid, **kwargs)
+
+    async def get_adviser_caseloads(self, uwnetids=None, uwregids=None,
+                                    advising_program=None, **kwargs):
+        return await self._call(
+            self.client.get_adviser_caseloads, uwnetids=uwnetids,
+            uwregids=uwregids, advising_program=advising_program, **kwargs)
+
+    async def get_columns(self, population="persons", relations=None,
+                          advising_program=None, arrow=False):
+        return await self._call(
+            self.client.get_columns, population, relations,
+            advising_program=advising_program, arrow=arrow)
+
+    async def get_persons_updated_since(self, since=None, batch_size=None,
+                                        **kwargs):
+        """Return a watermark and an async iterator of the changed persons,
+        which are fetched batch_size at a time by keyset pages
+        """
+        watermark = await self.get_update_watermark()
+        if watermark is None:
+            watermark = since
+        return watermark, self._iter_pages(
+            self.client.get_persons_updated_since_page, batch_size,
+            since=since, watermark=watermark, **kwargs)
+
+    async def get_update_watermark(self):
+        return await self._call(self.client.get_update_watermark)
+
+    async def get_person_keys(self, population="persons",
+                              advising_program=None):
+        return await self._call(
+            self.client.get_person_keys, population,
+            advising_program=advising_program)
+
+    def iter_persons(self, batch_size=None, **kwargs):
+        return self._iter_pages(
+            self.client.get_persons_page, batch_size, **kwargs)
+
+    def iter_registered_students(self, batch_size=None, **kwargs):
+        return self._iter_pages(
+            self.client.get_registered_students_page, batch_size, **kwargs)
+
+    def iter_active_students(self, batch_size=None, **kwargs):
+        return self._iter_pages(
+            self.client.get_active_students_page, batch_size, **kwargs)
+
+    def iter_active_employees(self, batch_size=None, **kwargs):
+        return self._iter_pages(
+            self.client.get_active_employees_page, batch_size, **kwargs)
+
+    def iter_advisers(self, advising_program=None, batch_size=None,
+                      **kwargs):
+        return self._iter_pages(
+            self.client.get_advisers_page, batch_size,
+            advising_program=advising_program, **kwargs)
+
+    async def _call(self, fn, *args, **kwargs):
+        raise NotImplementedError()
+
+    async def _iter_pages(self, get_page, batch_size=None, **kwargs):
+        page_size = batch_size or self.stream_batch_size
+        page_token = None
+        while True:
+            persons, page_token = await self._call(
+                get_page, page_size, page_token, **kwargs)
+            for person in persons:
+                yield person
+            if page_token is None:
+                return
@@ -0,0 +1,24 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+from uw_person_client.clients import AbstractAsyncUWPersonClient
+from uw_person_client.clients.core_client import UWPersonClient
+from uw_person_client.databases.uwpds import AsyncUWPDS
+
+
+class AsyncUWPersonClient(AbstractAsyncUWPersonClient):
+    """Runs the UWPersonClient queries over an async engine. Each call uses
+    its own session from the shared connection pool, so concurrent calls
+    do not need a thread apiece.
+    """
+
+    def __init__(self, db=None):
+        self.DB = db if db is not None else AsyncUWPDS()
+        super().__init__(UWPersonClient(db=self.DB))
+
+    async def close(self):
+        await self.DB.dispose()
+
+    async def _call(self, fn, *args, **kwargs):
+        return await self.DB.run_sync(fn, *args, **kwargs)
@@ -2,123 +2,1041 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
-from sqlalchemy import or_
+from datetime import datetime
+from functools import wraps
+from types import SimpleNamespace
+from commonconf import settings
+from sqlalchemy import (
+    and_, func, inspect, literal, or_, select, union_all)
+from sqlalchemy.orm import aliased, joinedload, load_only, selectinload
 from sqlalchemy.orm.exc import NoResultFound
+from uw_person_client.cache import (
+    NotFoundCache, PersonCache, ReferenceDataCache)
 from uw_person_client.clients import AbstractUWPersonClient
 from uw_person_client.databases.uwpds import UWPDS
 from uw_person_client.exceptions import (
-    PersonNotFoundException, AdviserNotFoundException)
+    PersonNotFoundException, AdviserNotFoundException,
+    InvalidPageTokenException)
 from uw_person_client.components import (
     Person, Student, Employee, Transcript, Major, Sport, Adviser, Term,
-    Transfer, Hold, Degree)
+    Transfer, Hold, Degree, ReadOnlyMajor, ReadOnlyTerm)
+
+
+# component attributes whose source column has a different name
+PERSON_COLUMNS = {
+    "active_student": "_is_active_student",
+    "active_employee": "_is_active_employee",
+}
+EMPLOYEE_COLUMNS = {
+    "primary_title": "title",
+    "primary_department": "department",
+}
+# student component relations, and the student columns each one reads
+STUDENT_RELATIONS = {
+    "academic_term": ("academic_term_id",),
+    "majors": ("major_1_id", "major_2_id", "major_3_id"),
+    "pending_majors": (
+        "pending_major_1_id", "pending_major_2_id", "pending_major_3_id"),
+    "sports": (),
+    "advisers": (),
+    "transcripts": (),
+    "transfers": (),
+    "holds": (),
+    "degrees": (),
+}
+# student codes that are mapped as strings
+STUDENT_CODE_FIELDS = (
+    "application_status_code", "campus_code", "class_code",
+    "enroll_status_code", "exemption_code", "new_continuing_returning_code",
+    "veteran_benefit_code")
+
+
+def releases_session(method):
+    """Release the ORM state a client method loaded once it returns, so
+    that only the mapped components outlive the call
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.DB.release_session()
+    return wrapper
 
 
 class UWPersonClient(AbstractUWPersonClient):
-    def __init__(self):
-        self.DB = UWPDS()
+    def __init__(self, db=None):
+        self.DB = db if db is not None else UWPDS()
+        self.reference_data = ReferenceDataCache(
+            ttl=getattr(settings, "UW_PERSON_REFERENCE_DATA_TTL", 3600))
+        self.person_cache = None
+        cache_size = getattr(settings, "UW_PERSON_CACHE_SIZE", 0)
+        if cache_size:
+            self.person_cache = PersonCache(
+                maxsize=cache_size,
+                ttl=getattr(settings, "UW_PERSON_CACHE_TTL", 300))
+        self.revalidate_cached_persons = getattr(
+            settings, "UW_PERSON_CACHE_REVALIDATE", False)
+        self.map_rows = getattr(settings, "UW_PERSON_MAP_ROWS", False)
+        self.not_found_cache = None
+        not_found_ttl = getattr(settings, "UW_PERSON_NOT_FOUND_CACHE_TTL", 0)
+        if not_found_ttl:
+            self.not_found_cache = NotFoundCache(
+                maxsize=getattr(
+                    settings, "UW_PERSON_NOT_FOUND_CACHE_SIZE", 10000),
+                ttl=not_found_ttl)
 
+    def session_scope(self):
+        return self.DB.session_scope()
+
+    @releases_session
     def get_person_by_uwnetid(self, uwnetid, **kwargs):
-        sqla_person = self.DB.session.query(self.DB.Person).filter(
-            or_(self.DB.Person.uwnetid == uwnetid,
-                self.DB.Person.prior_uwnetids.any(uwnetid))
-        ).one_or_none()
-        if sqla_person is None:
-            raise PersonNotFoundException()
-        return self._map_person(sqla_person, **kwargs)
+        return self._get_cached_person(
+            "uwnetid", uwnetid, self._get_person_by_uwnetid, **kwargs)
 
+    @releases_session
     def get_person_by_uwregid(self, uwregid, **kwargs):
-        sqla_person = self.DB.session.query(self.DB.Person).filter(
-            or_(self.DB.Person.uwregid == uwregid,
-                self.DB.Person.prior_uwregids.any(uwregid))
-        ).one_or_none()
+        return self._get_cached_person(
+            "uwregid", uwregid, self._get_person_by_uwregid, **kwargs)
+
+    @releases_session
+    def get_person_by_student_number(self, student_number, **kwargs):
+        return self._get_cached_person(
+            "student_number", self.format_student_number(student_number),
+            self._get_person_by_student_number, **kwargs)
+
+    @releases_session
+    def get_person_by_system_key(self, system_key, **kwargs):
+        return self._get_cached_person(
+            "system_key", self.format_system_key(system_key),
+            self._get_person_by_system_key, **kwargs)
+
+    @releases_session
+    def get_persons_by_uwnetids(self, uwnetids, **kwargs):
+        return self._get_persons_by_values(
+            uwnetids, self.DB.Person.uwnetid,
+            prior_column=self.DB.Person.prior_uwnetids, **kwargs)
+
+    @releases_session
+    def get_persons_by_uwregids(self, uwregids, **kwargs):
+        return self._get_persons_by_values(
+            uwregids, self.DB.Person.uwregid,
+            prior_column=self.DB.Person.prior_uwregids, **kwargs)
+
+    @releases_session
+    def get_persons_by_student_numbers(self, student_numbers, **kwargs):
+        return self._get_persons_by_values(
+            student_numbers, self.DB.Student.student_number,
+            formatter=self.format_student_number, join=self.DB.Student,
+            **kwargs)
+
+    @releases_session
+    def get_persons_by_system_keys(self, system_keys, **kwargs):
+        return self._get_persons_by_values(
+            system_keys, self.DB.Person.system_key,
+            formatter=self.format_system_key, **kwargs)
+
+    @releases_session
+    def get_persons(self, page=None, page_size=None, **kwargs):
+        sqla_persons = self._paginate(
+            self._query_persons(**kwargs), page, page_size)
+        return self._map_all(sqla_persons, **kwargs)
+
+    @releases_session
+    def get_registered_students(self, page=None, page_size=None, **kwargs):
+        sqla_persons = self._paginate(
+            self._query_registered_students(**kwargs), page, page_size)
+        return self._map_all(sqla_persons, **kwargs)
+
+    @releases_session
+    def get_active_students(self, page=None, page_size=None, **kwargs):
+        sqla_persons = self._paginate(
+            self._query_active_students(**kwargs), page, page_size)
+        return self._map_all(sqla_persons, **kwargs)
+
+    @releases_session
+    def get_active_employees(self, page=None, page_size=None, **kwargs):
+        sqla_persons = self._paginate(
+            self._query_active_employees(**kwargs), page, page_size)
+        return self._map_all(sqla_persons, **kwargs)
+
+    @releases_session
+    def get_advisers(self, advising_program=None, **kwargs):
+        sqla_persons = self._query_advisers(advising_program, **kwargs)
+        return self._map_all(sqla_persons, **kwargs)
+
+    @releases_session
+    def get_persons_page(self, page_size, page_token=None, **kwargs):
+        return self._get_page(
+            self._query_persons(**kwargs), page_size, page_token, **kwargs)
+
+    @releases_session
+    def get_registered_students_page(self, page_size, page_token=None,
+                                     **kwargs):
+        return self._get_page(
+            self._query_registered_students(**kwargs), page_size,
+            page_token, **kwargs)
+
+    @releases_session
+    def get_active_students_page(self, page_size, page_token=None,
+                                 **kwargs):
+        return self._get_page(
+            self._query_active_students(**kwargs), page_size, page_token,
+            **kwargs)
+
+    @releases_session
+    def get_active_employees_page(self, page_size, page_token=None,
+                                  **kwargs):
+        return self._get_page(
+            self._query_active_employees(**kwargs), page_size, page_token,
+            **kwargs)
+
+    @releases_session
+    def get_advisers_page(self, page_size, page_token=None,
+                          advising_program=None, **kwargs):
+        return self._get_page(
+            self._query_advisers(advising_program, **kwargs), page_size,
+            page_token, **kwargs)
+
+    def iter_persons(self, batch_size=None, **kwargs):
+        return self._iter_persons(
+            self._query_persons(**kwargs), batch_size, **kwargs)
+
+    def iter_registered_students(self, batch_size=None, **kwargs):
+        return self._iter_persons(
+            self._query_registered_students(**kwargs), batch_size, **kwargs)
+
+    def iter_active_students(self, batch_size=None, **kwargs):
+        return self._iter_persons(
+            self._query_active_students(**kwargs), batch_size, **kwargs)
+
+    def iter_active_employees(self, batch_size=None, **kwargs):
+        return self._iter_persons(
+            self._query_active_employees(**kwargs), batch_size, **kwargs)
+
+    def iter_advisers(self, advising_program=None, batch_size=None,
+                      **kwargs):
+        return self._iter_persons(
+            self._query_advisers(advising_program, **kwargs), batch_size,
+            **kwargs)
+
+    @releases_session
+    def get_persons_by_adviser_netid(self, uwnetid, **kwargs):
+        try:
+            sqla_adviser = self.DB.session.query(self.DB.Adviser).join(
+                self.DB.Employee).join(self.DB.Person).filter(
+                self.DB.Person.uwnetid == uwnetid).one()
+        except NoResultFound:
+            raise AdviserNotFoundException()
+        sqla_persons = self._query_persons(**kwargs).join(
+            self.DB.Student).join(self.DB.StudentToAdviser).join(
+            self.DB.Adviser).filter(self.DB.Adviser.id == sqla_adviser.id)
+        return self._map_all(sqla_persons, **kwargs)
+
+    @releases_session
+    def get_persons_by_adviser_regid(self, uwregid, **kwargs):
+        try:
+            sqla_adviser = self.DB.session.query(self.DB.Adviser).join(
+                self.DB.Employee).join(self.DB.Person).filter(
+                self.DB.Person.uwregid == uwregid).one()
+        except NoResultFound:
+            raise AdviserNotFoundException()
+        sqla_persons = self._query_persons(**kwargs).join(
+            self.DB.Student).join(self.DB.StudentToAdviser).join(
+            self.DB.Adviser).filter(self.DB.Adviser.id == sqla_adviser.id)
+        return self._map_all(sqla_persons, **kwargs)
+
+    @releases_session
+    def get_adviser_caseloads(self, uwnetids=None, uwregids=None,
+                              advising_program=None, **kwargs):
+        """Return a dict of adviser identifier to the list of persons they
+        advise, for the advisers matching any of uwnetids or uwregids, keyed
+        by the uwnetid or uwregid that was requested, or by uwnetid for
+        all advisers. Filtered by advising_program when given. A requested
+        adviser without students has an empty list, and one that is not
+        an adviser has no entry.
+        """
+        uwnetids = self._caseload_identifiers("uwnetids", uwnetids)
+        uwregids = self._caseload_identifiers("uwregids", uwregids)
+        adviser_employee = aliased(self.DB.Employee)
+        adviser_person = aliased(self.DB.Person)
+        # each IN list is bound a chunk at a time, and a student matched
+        # by both is keyed by the identifiers of its own chunk
+        lookups = []
+        if uwnetids is None and uwregids is None:
+            lookups.append((None, None, None))
+        for chunk in self._chunked(uwnetids or []):
+            lookups.append((adviser_person.uwnetid.in_(chunk), set(chunk),
+                            None))
+        for chunk in self._chunked(uwregids or []):
+            lookups.append((adviser_person.uwregid.in_(chunk), None,
+                            set(chunk)))
+
+        caseloads, persons, adviser_cache = {}, {}, {}
+        for identifier, chunk_uwnetids, chunk_uwregids in lookups:
+            sqla_persons = self._query_persons(**kwargs).add_columns(
+                adviser_person.uwnetid, adviser_person.uwregid).join(
+                self.DB.Person.student).join(
+                self.DB.Student.adviser).join(
+                self.DB.Adviser.employee.of_type(adviser_employee)).join(
+                adviser_employee.person.of_type(adviser_person))
+            if identifier is not None:
+                sqla_persons = sqla_persons.filter(identifier)
+                # requested advisers without students have an empty
+                # caseload
+                for uwnetid, uwregid in self._query_caseload_advisers(
+                        adviser_person, identifier, advising_program):
+                    for key in self._caseload_keys(
+                            uwnetid, uwregid, chunk_uwnetids,
+                            chunk_uwregids):
+                        caseloads.setdefault(key, [])
+            if advising_program:
+                sqla_persons = sqla_persons.filter(
+                    self.DB.Adviser.advising_program == advising_program)
+
+            for sqla_person, adviser_uwnetid, adviser_uwregid in \
+                    sqla_persons:
+                # a student appears once for each of their matching
+                # advisers
+                if sqla_person.id not in persons:
+                    persons[sqla_person.id] = self._map_person(
+                        sqla_person, adviser_cache=adviser_cache, **kwargs)
+                for key in self._caseload_keys(
+                        adviser_uwnetid, adviser_uwregid, chunk_uwnetids,
+                        chunk_uwregids):
+                    caseloads.setdefault(key, []).append(
+                        persons[sqla_person.id])
+        return caseloads
+
+    @releases_session
+    def get_columns(self, population="persons", relations=None,
+                    advising_program=None, arrow=False):
+        """Return the persons of a population ("persons",
+        "registered_students", "active_students", "active_employees" or
+        "advisers") as tables of column lists, selected without creating
+        components: "person" and "employee" keyed by uwregid, "student"
+        and a child table for each named relation (every one by default)
+        keyed by system_key. With arrow, each table is returned as a
+        pyarrow.Table.
+        """
+        relations = self._column_relations(relations)
+        person_ids = self._query_population(
+            population, advising_program).with_entities(
+            self.DB.Person.id).statement
+
+        Person, Student, Employee = (
+            self.DB.Person, self.DB.Student, self.DB.Employee)
+        tables = {
+            "person": self._select_table(
+                Person, Person.id, person_ids, skip=("id",),
+                names={column: name for name, column in
+                       PERSON_COLUMNS.items()}),
+            "employee": self._select_table(
+                Employee, Employee.person_id, person_ids,
+                [Person.uwregid], [(Person, Person.id == Employee.person_id)],
+                skip=("id", "person_id"),
+                names={column: name for name, column in
+                       EMPLOYEE_COLUMNS.items()}),
+            "student": self._select_table(
+                Student, Student.person_id, person_ids,
+                skip=("id", "person_id", *STUDENT_RELATIONS["majors"],
+                      *STUDENT_RELATIONS["pending_majors"])),
+        }
+        for name in STUDENT_CODE_FIELDS:
+            if name in tables["student"]:
+                tables["student"][name] = [
+                    None if value is None else str(value)
+                    for value in tables["student"][name]]
+
+        for name in relations:
+            if name in ("majors", "pending_majors"):
+                tables[name] = self._select_major_table(
+                    STUDENT_RELATIONS[name], person_ids)
+                continue
+            elif name == "sports":
+                entity, link = self.DB.Sport, self.DB.StudentToSport
+                joins = [(link, link.c.sport_id == entity.id)]
+                student_id, skip, columns = link.c.student_id, ("id",), []
+            elif name == "advisers":
+                entity, link = self.DB.Adviser, self.DB.StudentToAdviser
+                adviser_employee = aliased(Employee)
+                adviser_person = aliased(Person)
+                joins = [(link, link.c.adviser_id == entity.id),
+                         (adviser_employee,
+                          adviser_employee.id == entity.employee_id),
+                         (adviser_person,
+                          adviser_person.id == adviser_employee.person_id)]
+                student_id, skip = link.c.student_id, ("id", "employee_id")
+                columns = [adviser_person.uwnetid, adviser_person.uwregid]
+            else:
+                entity = getattr(self.DB, {
+                    "transcripts": "Transcript", "transfers": "Transfer",
+                    "holds": "Hold", "degrees": "Degree"}[name])
+                student_id, skip = entity.student_id, ("id", "student_id")
+                joins, columns = [], []
+            tables[name] = self._select_table(
+                entity, Student.person_id, person_ids,
+                [Student.system_key, *columns],
+                [*joins, (Student, Student.id == student_id)], skip=skip)
+
+        if arrow:
+            import pyarrow
+            return {name: pyarrow.table(columns)
+                    for name, columns in tables.items()}
+        return tables
+
+    def get_persons_updated_since(self, since=None, batch_size=None,
+                                  **kwargs):
+        """Return a watermark, and an iterator of the persons whose student
+        record was loaded or updated after since (every student when since
+        is None) and no later than the watermark. Pass the watermark as
+        since to the next call. Persons without a student record carry no
+        change time; compare get_person_keys() between syncs to find the
+        persons that were removed or deactivated.
+        """
+        watermark = self.get_update_watermark()
+        if watermark is None:
+            return since, iter(())
+        return watermark, self._iter_persons_updated_since(
+            since, watermark, batch_size, **kwargs)
+
+    @releases_session
+    def get_persons_updated_since_page(self, page_size, page_token=None,
+                                       since=None, watermark=None, **kwargs):
+        """Return a page of the persons that get_persons_updated_since()
+        streams, ordered by change time and person id, and the token for
+        the page that follows it (None on the last page)
+        """
+        self._check_page_size(page_size)
+        changed = self._student_changed_dttm()
+        sqla_persons = self._query_updated_since(since, watermark, **kwargs)
+        if page_token is not None:
+            changed_after, person_id = self._decode_change_page_token(
+                page_token)
+            sqla_persons = sqla_persons.filter(or_(
+                changed > changed_after,
+                and_(changed == changed_after,
+                     self.DB.Person.id > person_id)))
+        rows = sqla_persons.add_columns(changed).order_by(
+            changed, self.DB.Person.id).limit(page_size + 1).all()
+        next_page_token = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            sqla_person, changed_at = rows[-1]
+            next_page_token = self._encode_page_token(
+                [changed_at.isoformat(), sqla_person.id])
+        persons = self._map_persons(
+            [sqla_person for sqla_person, _ in rows], **kwargs)
+        return list(persons), next_page_token
+
+    @releases_session
+    def get_update_watermark(self):
+        """Return the latest change time of any student record, which is
+        the watermark that get_persons_updated_since() would return
+        """
+        return self.DB.session.query(
+            func.max(self._student_changed_dttm())).scalar()
+
+    @releases_session
+    def get_person_keys(self, population="persons", advising_program=None):
+        """Return the set of uwregids in a population"""
+        return {uwregid for uwregid, in self._query_population(
+            population, advising_program).with_entities(
+            self.DB.Person.uwregid)}
+
+    """
+    Private Methods
+    """
+
+    def _query_population(self, population, advising_program=None):
+        queries = {
+            "persons": self._query_persons,
+            "registered_students": self._query_registered_students,
+            "active_students": self._query_active_students,
+            "active_employees": self._query_active_employees,
+            "advisers": lambda: self._query_advisers(advising_program),
+        }
+        if population not in queries:
+            raise ValueError(f"Unknown population '{population}'")
+        return queries[population]()
+
+    def _student_changed_dttm(self):
+        # a record reloaded after its last update changed when it was
+        # loaded; greatest() ignores a null update time
+        Student = self.DB.Student
+        return func.greatest(Student.record_update_dttm,
+                             Student.record_load_dttm,
+                             type_=Student.record_load_dttm.type)
+
+    def _iter_persons_updated_since(self, since, watermark, batch_size=None,
+                                    **kwargs):
+        # the query is built on the session that the stream runs on, once
+        # the stream is started
+        sqla_persons = self._query_updated_since(since, watermark, **kwargs)
+        yield from self._iter_persons(
+            sqla_persons.order_by(
+                self._student_changed_dttm(), self.DB.Person.id),
+            batch_size, **kwargs)
+
+    def _query_updated_since(self, since, watermark, **kwargs):
+        changed = self._student_changed_dttm()
+        sqla_persons = self._query_persons(**kwargs).join(self.DB.Student)
+        if watermark is not None:
+            sqla_persons = sqla_persons.filter(changed <= watermark)
+        if since is not None:
+            sqla_persons = sqla_persons.filter(changed > since)
+        return sqla_persons
+
+    def _decode_change_page_token(self, page_token):
+        key = self._load_page_token(page_token)
+        try:
+            changed, person_id = key
+            changed = datetime.fromisoformat(changed)
+        except (TypeError, ValueError):
+            raise InvalidPageTokenException()
+        if not isinstance(person_id, int) or isinstance(person_id, bool):
+            raise InvalidPageTokenException()
+        return changed, person_id
+
+    def _query_caseload_advisers(self, adviser_person, identifier,
+                                 advising_program=None):
+        advisers = self.DB.session.query(
+            adviser_person.uwnetid, adviser_person.uwregid).join(
+            adviser_person.employee).join(self.DB.Employee.adviser).filter(
+            identifier)
+        if advising_program:
+            advisers = advisers.filter(
+                self.DB.Adviser.advising_program == advising_program)
+        return advisers.distinct()
+
+    def _query_persons(self, **kwargs):
+        return self.DB.session.query(self.DB.Person).options(
+            *self._load_options(**kwargs))
+
+    def _get_person_by_uwnetid(self, uwnetid, **kwargs):
+        return self._get_person_by_identifier(
+            uwnetid, self.DB.Person.uwnetid, self.DB.Person.prior_uwnetids,
+            **kwargs)
+
+    def _get_person_by_uwregid(self, uwregid, **kwargs):
+        return self._get_person_by_identifier(
+            uwregid, self.DB.Person.uwregid, self.DB.Person.prior_uwregids,
+            **kwargs)
+
+    def _get_person_by_identifier(self, value, column, prior_column,
+                                  **kwargs):
+        # Separate queries let the current value use its btree index and
+        # the prior values a GIN index, see UWPDS.create_identifier_indexes
+        sqla_person = self._query_persons(**kwargs).filter(
+            column == value).one_or_none()
+        if sqla_person is None:
+            sqla_person = self._query_persons(**kwargs).filter(
+                prior_column.contains([value])).one_or_none()
         if sqla_person is None:
             raise PersonNotFoundException()
         return self._map_person(sqla_person, **kwargs)
 
-    def get_person_by_student_number(self, student_number, **kwargs):
+    def _get_person_by_student_number(self, student_number, **kwargs):
         sqla_person = None
-        student_number = self.format_student_number(student_number)
         if student_number is not None:
-            sqla_person = self.DB.session.query(self.DB.Person).join(
+            sqla_person = self._query_persons(**kwargs).join(
                 self.DB.Student).filter(
                 self.DB.Student.student_number == student_number).one_or_none()
         if sqla_person is None:
             raise PersonNotFoundException()
         return self._map_person(sqla_person, **kwargs)
 
-    def get_person_by_system_key(self, system_key, **kwargs):
+    def _get_person_by_system_key(self, system_key, **kwargs):
         sqla_person = None
-        system_key = self.format_system_key(system_key)
         if system_key is not None:
-            sqla_person = self.DB.session.query(self.DB.Person).filter(
+            sqla_person = self._query_persons(**kwargs).filter(
                 self.DB.Person.system_key == system_key).one_or_none()
         if sqla_person is None:
             raise PersonNotFoundException()
         return self._map_person(sqla_person, **kwargs)
 
-    def get_persons(self, **kwargs):
-        sqla_persons = self.DB.session.query(self.DB.Person)
-        return [self._map_person(item, **kwargs)
-                for item in sqla_persons.all()]
+    def _get_cached_person(self, identifier, value, get_person, **kwargs):
+        if self.not_found_cache is None:
+            return self._get_lru_cached_person(
+                identifier, value, get_person, **kwargs)
 
-    def get_registered_students(self, **kwargs):
-        sqla_persons = self.DB.session.query(self.DB.Person).join(
+        if self.not_found_cache.get(identifier, value):
+            raise PersonNotFoundException()
+        try:
+            return self._get_lru_cached_person(
+                identifier, value, get_person, **kwargs)
+        except PersonNotFoundException:
+            self.not_found_cache.add(identifier, value)
+            raise
+
+    def _get_lru_cached_person(self, identifier, value, get_person,
+                               **kwargs):
+        if self.person_cache is None:
+            return self._load_person(get_person, value, **kwargs)
+
+        options = tuple(sorted(
+            (key, tuple(val) if isinstance(val, list) else val)
+            for key, val in kwargs.items()))
+        validate = (self._is_cached_person_current
+                    if self.revalidate_cached_persons else None)
+        person = self.person_cache.get(identifier, value, options, validate)
+        if person is None:
+            person = self._load_person(get_person, value, **kwargs)
+            version = None
+            if self.revalidate_cached_persons:
+                version = self._get_record_update_dttm(person)
+            self.person_cache.set(
+                person, identifier, value, options, version=version)
+        return person
+
+    def _load_person(self, get_person, value, **kwargs):
+        person = get_person(value, **kwargs)
+        if self.not_found_cache is not None:
+            self.not_found_cache.discard_person(person)
+        return person
+
+    def _is_cached_person_current(self, entry):
+        uwregid = getattr(entry.person, "uwregid", None)
+        if uwregid is None:
+            return True
+        return self._query_record_update_dttm(uwregid) == entry.version
+
+    def _get_record_update_dttm(self, person):
+        student = getattr(person, "student", None)
+        if getattr(student, "record_update_dttm", None) is not None:
+            return student.record_update_dttm
+        uwregid = getattr(person, "uwregid", None)
+        if uwregid is not None:
+            return self._query_record_update_dttm(uwregid)
+
+    def _query_record_update_dttm(self, uwregid):
+        return self.DB.session.query(
+            self.DB.Student.record_update_dttm).join(self.DB.Person).filter(
+            self.DB.Person.uwregid == uwregid).scalar()
+
+    def _get_persons_by_values(self, values, column, prior_column=None,
+                               formatter=None, join=None, **kwargs):
+        """Return a dict of requested value to mapped person, or None
+        for values that match no person
+        """
+        values = list(values)
+        lookup = {}
+        for value in values:
+            formatted = formatter(value) if formatter else value
+            if formatted is not None:
+                lookup[value] = formatted
+
+        persons, adviser_cache = {}, {}
+        for chunk in self._chunked(set(lookup.values())):
+            sqla_persons = self._query_persons(**kwargs).add_columns(column)
+            if join is not None:
+                sqla_persons = sqla_persons.join(join)
+            for sqla_person, key in sqla_persons.filter(column.in_(chunk)):
+                persons[key] = self._map_person(
+                    sqla_person, adviser_cache=adviser_cache, **kwargs)
+
+        # only values with no current match are looked up as prior values
+        missing = set(lookup.values()) - set(persons)
+        if prior_column is not None and missing:
+            for chunk in self._chunked(missing):
+                sqla_persons = self._query_persons(**kwargs).filter(
+                    prior_column.overlap(chunk))
+                for sqla_person in sqla_persons:
+                    person = self._map_person(
+                        sqla_person, adviser_cache=adviser_cache, **kwargs)
+                    for prior in getattr(sqla_person, prior_column.key):
+                        if prior in missing:
+                            persons.setdefault(prior, person)
+
+        return {value: persons.get(lookup.get(value)) for value in values}
+
+    def _query_registered_students(self, **kwargs):
+        return self._query_persons(**kwargs).join(
             self.DB.Student).filter(
                 self.DB.Student.enroll_status_code == '12'  # registered
         )
-        return [self._map_person(item, **kwargs)
-                for item in sqla_persons.all()]
 
-    def get_active_students(self, **kwargs):
-        sqla_persons = self.DB.session.query(self.DB.Person).filter(
+    def _query_active_students(self, **kwargs):
+        return self._query_persons(**kwargs).filter(
             self.DB.Person._is_active_student == True)  # noqa
-        return [self._map_person(item, **kwargs)
-                for item in sqla_persons.all()]
 
-    def get_active_employees(self, **kwargs):
-        sqla_persons = self.DB.session.query(self.DB.Person).filter(
+    def _query_active_employees(self, **kwargs):
+        return self._query_persons(**kwargs).filter(
             self.DB.Person._is_active_employee == True)  # noqa
-        return [self._map_person(item, **kwargs)
-                for item in sqla_persons.all()]
 
-    def get_advisers(self, advising_program=None, **kwargs):
-        sqla_persons = self.DB.session.query(self.DB.Person).join(
+    def _query_advisers(self, advising_program=None, **kwargs):
+        sqla_persons = self._query_persons(**kwargs).join(
             self.DB.Employee).join(self.DB.Adviser)
         if advising_program:
             sqla_persons = sqla_persons.filter(
                 self.DB.Adviser.advising_program == advising_program)
-        return [self._map_person(item, **kwargs)
-                for item in sqla_persons.all()]
+        return sqla_persons
 
-    def get_persons_by_adviser_netid(self, uwnetid, **kwargs):
-        try:
-            sqla_adviser = self.DB.session.query(self.DB.Adviser).join(
-                self.DB.Employee).join(self.DB.Person).filter(
-                self.DB.Person.uwnetid == uwnetid).one()
-        except NoResultFound:
-            raise AdviserNotFoundException()
-        sqla_persons = self.DB.session.query(self.DB.Person).join(
-            self.DB.Student).join(self.DB.StudentToAdviser).join(
-            self.DB.Adviser).filter(self.DB.Adviser.id == sqla_adviser.id)
-        return [self._map_person(item, **kwargs)
-                for item in sqla_persons.all()]
+    def _paginate(self, sqla_persons, page=None, page_size=None):
+        if page is not None and page_size is not None:
+            sqla_persons = sqla_persons.order_by(self.DB.Person.id).offset(
+                (page - 1) * page_size).limit(page_size)
+        return sqla_persons
 
-    def get_persons_by_adviser_regid(self, uwregid, **kwargs):
-        try:
-            sqla_adviser = self.DB.session.query(self.DB.Adviser).join(
-                self.DB.Employee).join(self.DB.Person).filter(
-                self.DB.Person.uwregid == uwregid).one()
-        except NoResultFound:
-            raise AdviserNotFoundException()
-        sqla_persons = self.DB.session.query(self.DB.Person).join(
-            self.DB.Student).join(self.DB.StudentToAdviser).join(
-            self.DB.Adviser).filter(self.DB.Adviser.id == sqla_adviser.id)
-        return [self._map_person(item, **kwargs)
-                for item in sqla_persons.all()]
+    def _get_page(self, sqla_persons, page_size, page_token=None, **kwargs):
+        """Return a page of mapped persons ordered by person id, and the
+        token for the page that follows it (None on the last page)
+        """
+        self._check_page_size(page_size)
+        if page_token is not None:
+            sqla_persons = sqla_persons.filter(
+                self.DB.Person.id > self._decode_page_token(page_token))
+        items = sqla_persons.order_by(self.DB.Person.id).limit(
+            page_size + 1).all()
+        next_page_token = None
+        if len(items) > page_size:
+            items = items[:page_size]
+            next_page_token = self._encode_page_token(items[-1].id)
+        return list(self._map_persons(items, **kwargs)), next_page_token
 
-    """
-    Private Methods
-    """
+    def _iter_persons(self, sqla_persons, batch_size=None, **kwargs):
+        """Stream mapped persons, fetching batch_size rows at a time
+        through a server-side cursor, and releasing the ORM state of each
+        batch once it has been mapped. Client calls made while the stream
+        is consumed leave its session open.
+        """
+        batch_size = batch_size or self.stream_batch_size
+        with self.DB.stream_scope() as session:
+            persons = self._map_persons(
+                sqla_persons.yield_per(batch_size), **kwargs)
+            for count, person in enumerate(persons, start=1):
+                if count % batch_size == 0:
+                    # expunge_all() would invalidate the identity map that
+                    # the rest of the stream is being loaded into
+                    for sqla_object in list(session):
+                        session.expunge(sqla_object)
+                yield person
+
+    def _map_all(self, sqla_persons, **kwargs):
+        if self.map_rows:
+            return self._map_person_rows(sqla_persons, **kwargs)
+        return list(self._map_persons(sqla_persons.all(), **kwargs))
+
+    def _map_persons(self, sqla_persons, **kwargs):
+        """Lazily map persons, sharing one adviser cache so that each
+        adviser is mapped once per call
+        """
+        adviser_cache = {}
+        for item in sqla_persons:
+            yield self._map_person(item, adviser_cache=adviser_cache,
+                                   **kwargs)
+
+    def _map_person_rows(self, sqla_persons, **kwargs):
+        """Map persons from plain result rows rather than ORM instances.
+        Related rows are selected with one query per relation, and are
+        handed to the _map_* methods as records with the attribute names
+        of the ORM instances, so the mapped persons are the same
+        """
+        include_student, include_employee, relations = self._row_includes(
+            **kwargs)
+        persons = self._get_person_records(
+            [SimpleNamespace(**row._mapping) for row in
+             sqla_persons.with_entities(*self._columns(self.DB.Person))],
+            include_student, include_employee, relations)
+        adviser_cache = {}
+        return [self._map_person(person, adviser_cache=adviser_cache,
+                                 **kwargs) for person in persons]
+
+    def _row_includes(self,
+                      include_employee=True,
+                      include_student=True,
+                      include_student_transcripts=True,
+                      include_student_transfers=True,
+                      include_student_sports=True,
+                      include_student_advisers=True,
+                      include_student_majors=True,
+                      include_student_pending_majors=True,
+                      include_student_holds=True,
+                      include_student_degrees=True,
+                      fields=None):
+        """Return whether students and employees are mapped, and the
+        student relations that are read from their own tables
+        """
+        if fields is not None:
+            projection = self._parse_fields(fields)
+            names = projection.get("student") or STUDENT_RELATIONS
+            return ("student" in projection, "employee" in projection,
+                    [name for name in names if name in STUDENT_RELATIONS])
+        return include_student, include_employee, [name for name, include in (
+            ("sports", include_student_sports),
+            ("advisers", include_student_advisers),
+            ("transcripts", include_student_transcripts),
+            ("transfers", include_student_transfers),
+            ("holds", include_student_holds),
+            ("degrees", include_student_degrees)) if include]
+
+    def _get_person_records(self, persons, include_student=True,
+                            include_employee=True, relations=()):
+        person_ids = [person.id for person in persons]
+        students = self._get_student_records(
+            person_ids, relations) if include_student else {}
+        employees = self._get_employee_records(
+            person_ids) if include_employee else {}
+        for person in persons:
+            person.student = students.get(person.id)
+            person.employee = employees.get(person.id)
+        return persons
+
+    def _get_employee_records(self, person_ids):
+        Employee, Adviser = self.DB.Employee, self.DB.Adviser
+        employees = self._select_records(
+            self._columns(Employee), Employee.person_id, person_ids)
+        advisers = {adviser.employee_id: adviser for adviser in
+                    self._select_records(
+                        self._columns(Adviser), Adviser.employee_id,
+                        [employee.id for employee in employees])}
+        for employee in employees:
+            employee.adviser = advisers.get(employee.id)
+        return {employee.person_id: employee for employee in employees}
+
+    def _get_student_records(self, person_ids, relations):
+        Student, Sport = self.DB.Student, self.DB.Sport
+        students = self._select_records(
+            self._columns(Student), Student.person_id, person_ids)
+        student_ids = [student.id for student in students]
+
+        related = {}
+        for name, attr, entity, order_by in (
+                ("transcripts", "transcript", self.DB.Transcript, ()),
+                ("transfers", "transfer", self.DB.Transfer, ()),
+                # ordered as the ORM relationship is
+                ("holds", "student_hold", self.DB.Hold, (self.DB.Hold.seq,)),
+                ("degrees", "degree", self.DB.Degree, ())):
+            if name in relations:
+                related[attr] = self._group_records(self._select_records(
+                    self._columns(entity), entity.student_id, student_ids,
+                    order_by=order_by), "student_id")
+        if "sports" in relations:
+            link = self.DB.StudentToSport
+            related["sport"] = self._group_records(self._select_records(
+                self._columns(Sport) + [link.c.student_id.label("_student")],
+                link.c.student_id, student_ids,
+                (link, link.c.sport_id == Sport.id)), "_student")
+        if "advisers" in relations:
+            related["adviser"] = self._get_student_adviser_records(
+                student_ids)
+
+        for student in students:
+            for attr, records in related.items():
+                setattr(student, attr, records.get(student.id, []))
+        return {student.person_id: student for student in students}
+
+    def _get_student_adviser_records(self, student_ids):
+        """Return the adviser records of each student, each linked to
+        its employee and person records like the ORM relationships
+        """
+        Person, Employee, Adviser = (
+            self.DB.Person, self.DB.Employee, self.DB.Adviser)
+        link = self.DB.StudentToAdviser
+        links = self._select_records(
+            [link.c.student_id, link.c.adviser_id], link.c.student_id,
+            student_ids)
+        persons = self._get_person_records(self._select_records(
+            self._columns(Person), Adviser.id,
+            [row.adviser_id for row in links],
+            (Employee, Employee.person_id == Person.id),
+            (Adviser, Adviser.employee_id == Employee.id)),
+            include_student=False)
+
+        advisers = {}
+        for person in persons:
+            employee = person.employee
+            employee.person = person
+            employee.adviser.employee = employee
+            advisers[employee.adviser.id] = employee.adviser
+        student_advisers = {}
+        for row in links:
+            if row.adviser_id in advisers:
+                student_advisers.setdefault(row.student_id, []).append(
+                    advisers[row.adviser_id])
+        return student_advisers
+
+    def _select_records(self, columns, column, values, *joins, order_by=()):
+        """Select columns for rows whose column is in values, as records
+        in order_by order
+        """
+        records = []
+        for chunk in self._chunked(list(dict.fromkeys(values))):
+            query = self.DB.session.query(*columns)
+            for target, onclause in joins:
+                query = query.join(target, onclause)
+            query = query.filter(column.in_(chunk))
+            if order_by:
+                query = query.order_by(*order_by)
+            records.extend(SimpleNamespace(**row._mapping) for row in query)
+        return records
+
+    def _group_records(self, records, name):
+        groups = {}
+        for record in records:
+            groups.setdefault(getattr(record, name), []).append(record)
+        return groups
+
+    def _select_table(self, entity, filter_column, person_ids, columns=(),
+                      joins=(), skip=(), names=None):
+        """Select the columns of entity for the persons in person_ids as a
+        dict of column lists. Term ids are selected as the year and
+        quarter of the term.
+        """
+        names = names or {}
+        selected, term_joins = list(columns), []
+        for attr in inspect(entity).column_attrs:
+            if attr.key in skip:
+                continue
+            column = getattr(entity, attr.key)
+            if attr.key.endswith("_term_id"):
+                term, name = aliased(self.DB.Term), attr.key[:-3]
+                selected.extend([term.year.label(f"{name}_year"),
+                                 term.quarter.label(f"{name}_quarter")])
+                term_joins.append((term, term.id == column))
+            else:
+                selected.append(column.label(names.get(attr.key, attr.key)))
+
+        query = select(*selected).select_from(entity)
+        for target, onclause in joins:
+            query = query.join(target, onclause)
+        for target, onclause in term_joins:
+            query = query.outerjoin(target, onclause)
+        return self._select_column_lists(
+            query.where(filter_column.in_(person_ids)))
+
+    def _select_major_table(self, major_columns, person_ids):
+        Student, Major = self.DB.Student, self.DB.Major
+        major_attrs = [getattr(Major, attr.key).label(attr.key)
+                       for attr in inspect(Major).column_attrs
+                       if attr.key != "id"]
+        return self._select_column_lists(union_all(*[
+            select(Student.system_key, literal(position).label("position"),
+                   *major_attrs).join(
+                Major, Major.id == getattr(Student, column)).where(
+                Student.person_id.in_(person_ids))
+            for position, column in enumerate(major_columns, start=1)]))
+
+    def _select_column_lists(self, query):
+        result = self.DB.session.execute(query)
+        keys = list(result.keys())
+        rows = result.all()
+        if not rows:
+            return {key: [] for key in keys}
+        return dict(zip(keys, map(list, zip(*rows))))
+
+    def _columns(self, entity):
+        return [getattr(entity, attr.key)
+                for attr in inspect(entity).column_attrs]
+
+    def _load_options(self,
+                      include_employee=True,
+                      include_student=True,
+                      include_student_transcripts=True,
+                      include_student_transfers=True,
+                      include_student_sports=True,
+                      include_student_advisers=True,
+                      include_student_majors=True,
+                      include_student_pending_majors=True,
+                      include_student_holds=True,
+                      include_student_degrees=True,
+                      fields=None):
+        """Return loader options that fetch everything _map_person reads
+        with a fixed number of queries, regardless of result size
+        """
+        if fields is not None:
+            return self._projection_load_options(self._parse_fields(fields))
+
+        options = []
+
+        if include_student:
+            relations = [name for name, include in (
+                ("academic_term", True),
+                ("majors", include_student_majors),
+                ("pending_majors", include_student_pending_majors),
+                ("sports", include_student_sports),
+                ("advisers", include_student_advisers),
+                ("transcripts", include_student_transcripts),
+                ("transfers", include_student_transfers),
+                ("holds", include_student_holds),
+                ("degrees", include_student_degrees)) if include]
+            options.append(joinedload(self.DB.Person.student).options(
+                *self._student_load_options(relations)))
+
+        if include_employee:
+            options.append(joinedload(self.DB.Person.employee).joinedload(
+                self.DB.Employee.adviser))
+
+        return options
+
+    def _student_load_options(self, relations):
+        options = []
+        for name in relations:
+            # terms and majors are served from reference data
+            if name == "sports":
+                options.append(selectinload(self.DB.Student.sport))
+            elif name == "advisers":
+                options.append(
+                    selectinload(self.DB.Student.adviser).joinedload(
+                        self.DB.Adviser.employee).joinedload(
+                        self.DB.Employee.person).options(
+                        *self._load_options(include_student=False)))
+            elif name == "transcripts":
+                options.append(selectinload(self.DB.Student.transcript))
+            elif name == "transfers":
+                options.append(selectinload(self.DB.Student.transfer))
+            elif name == "holds":
+                options.append(selectinload(self.DB.Student.student_hold))
+            elif name == "degrees":
+                options.append(selectinload(self.DB.Student.degree))
+        return options
+
+    def _projection_load_options(self, projection):
+        """Return loader options that select only the columns and
+        relationships named in a parsed fields projection
+        """
+        options = [load_only(self.DB.Person.id, *[
+            self._get_column(self.DB.Person, PERSON_COLUMNS.get(name, name))
+            for name in projection["person"]])]
+
+        if "student" in projection:
+            names = projection["student"]
+            if names is None:
+                options.extend(self._load_options(include_employee=False))
+            else:
+                relations = [name for name in names
+                             if name in STUDENT_RELATIONS]
+                columns = [self.DB.Student.id, self.DB.Student.person_id]
+                for name in names:
+                    columns.extend([
+                        self._get_column(self.DB.Student, column)
+                        for column in STUDENT_RELATIONS.get(name, (name,))])
+                options.append(joinedload(self.DB.Person.student).options(
+                    load_only(*columns),
+                    *self._student_load_options(relations)))
+
+        if "employee" in projection:
+            names = projection["employee"]
+            employee = joinedload(self.DB.Person.employee)
+            if names is None:
+                options.append(employee.joinedload(self.DB.Employee.adviser))
+            else:
+                options.append(employee.load_only(
+                    self.DB.Employee.id, self.DB.Employee.person_id, *[
+                        self._get_column(self.DB.Employee,
+                                         EMPLOYEE_COLUMNS.get(name, name))
+                        for name in names if name != "adviser"]))
+                if "adviser" in names:
+                    options.append(employee.joinedload(
+                        self.DB.Employee.adviser))
+
+        return options
+
+    def _get_column(self, entity, name):
+        try:
+            return getattr(entity, name)
+        except AttributeError:
+            raise ValueError(f"Unknown field '{name}'")
 
     def _map_person(self, sqla_person,
                     include_employee=True,
@@ -130,7 +1048,13 @@ class UWPersonClient(AbstractUWPersonClient):
                     include_student_majors=True,
                     include_student_pending_majors=True,
                     include_student_holds=True,
-                    include_student_degrees=True):
+                    include_student_degrees=True,
+                    fields=None,
+                    adviser_cache=None):
+        if fields is not None:
+            return self._map_projected_person(
+                sqla_person, self._parse_fields(fields), adviser_cache)
+
         person = Person()
         person.uwnetid = sqla_person.uwnetid
         person.uwregid = sqla_person.uwregid
@@ -149,31 +1073,22 @@ class UWPersonClient(AbstractUWPersonClient):
         person.active_student = sqla_person._is_active_student
         person.active_employee = sqla_person._is_active_employee
 
-        if include_student:
-            try:
-                sqla_student = self.DB.session.query(self.DB.Student).filter(
-                    self.DB.Student.person_id == sqla_person.id).one()
-                person.student = self._map_student(
-                    sqla_student,
-                    include_student_transcripts=include_student_transcripts,
-                    include_student_transfers=include_student_transfers,
-                    include_student_sports=include_student_sports,
-                    include_student_advisers=include_student_advisers,
-                    include_student_majors=include_student_majors,
-                    include_student_pending_majors=include_student_pending_majors,  # noqa
-                    include_student_holds=include_student_holds,
-                    include_student_degrees=include_student_degrees,
-                )
-            except NoResultFound:
-                pass
+        if include_student and sqla_person.student is not None:
+            person.student = self._map_student(
+                sqla_person.student,
+                include_student_transcripts=include_student_transcripts,
+                include_student_transfers=include_student_transfers,
+                include_student_sports=include_student_sports,
+                include_student_advisers=include_student_advisers,
+                include_student_majors=include_student_majors,
+                include_student_pending_majors=include_student_pending_majors,
+                include_student_holds=include_student_holds,
+                include_student_degrees=include_student_degrees,
+                adviser_cache=adviser_cache,
+            )
 
-        if include_employee:
-            try:
-                sqla_employee = self.DB.session.query(self.DB.Employee).filter(
-                    self.DB.Employee.person_id == sqla_person.id).one()
-                person.employee = self._map_employee(sqla_employee)
-            except NoResultFound:
-                pass
+        if include_employee and sqla_person.employee is not None:
+            person.employee = self._map_employee(sqla_person.employee)
 
         return person
 
@@ -185,7 +1100,8 @@ class UWPersonClient(AbstractUWPersonClient):
                      include_student_majors=True,
                      include_student_pending_majors=True,
                      include_student_holds=True,
-                     include_student_degrees=True):
+                     include_student_degrees=True,
+                     adviser_cache=None):
         student = Student()
 
         student.system_key = sqla_student.system_key
@@ -323,37 +1239,20 @@ class UWPersonClient(AbstractUWPersonClient):
         student.veteran_desc = sqla_student.veteran_desc
         student.visa_type = sqla_student.visa_type
 
-        # map academic term
-        student.academic_term = self._map_term(sqla_student.academic_term)
+        student.academic_term = self._map_student_relation(
+            sqla_student, "academic_term")
 
         student.admitted_for_yr_qtr_desc = \
             sqla_student.admitted_for_yr_qtr_desc
         student.admitted_for_yr_qtr_id = sqla_student.admitted_for_yr_qtr_id
 
         if include_student_majors:
-            # map majors
-            majors = []
-            if sqla_student.major_1:
-                majors.append(self._map_major(sqla_student.major_1))
-            if sqla_student.major_2:
-                majors.append(self._map_major(sqla_student.major_2))
-            if sqla_student.major_3:
-                majors.append(self._map_major(sqla_student.major_3))
-            student.majors = majors
+            student.majors = self._map_student_relation(
+                sqla_student, "majors")
 
         if include_student_pending_majors:
-            # map pending majors
-            pending_majors = []
-            if sqla_student.pending_major_1:
-                pending_majors.append(
-                    self._map_major(sqla_student.pending_major_1))
-            if sqla_student.pending_major_2:
-                pending_majors.append(
-                    self._map_major(sqla_student.pending_major_2))
-            if sqla_student.pending_major_3:
-                pending_majors.append(
-                    self._map_major(sqla_student.pending_major_3))
-            student.pending_majors = pending_majors
+            student.pending_majors = self._map_student_relation(
+                sqla_student, "pending_majors")
 
         student.requested_major1_code = sqla_student.requested_major1_code
         student.requested_major2_code = sqla_student.requested_major2_code
@@ -364,50 +1263,149 @@ class UWPersonClient(AbstractUWPersonClient):
         student.intended_major3_code = sqla_student.intended_major3_code
 
         if include_student_sports:
-            # map sports
-            student.sports = []
-            for sport in sqla_student.sport:
-                sport = self._map_sport(sport)
-                student.sports.append(sport)
+            student.sports = self._map_student_relation(
+                sqla_student, "sports")
 
         if include_student_advisers:
-            # map advisers
-            student.advisers = []
-            for adviser in sqla_student.adviser:
-                adviser_person = self._map_person(adviser.employee.person,
-                                                  include_student=False)
-                student.advisers.append(adviser_person)
+            student.advisers = self._map_student_relation(
+                sqla_student, "advisers", adviser_cache)
 
         if include_student_transcripts:
-            # map transcripts
-            student.transcripts = []
-            for transcript in sqla_student.transcript:
-                transcript = self._map_transcript(transcript)
-                student.transcripts.append(transcript)
+            student.transcripts = self._map_student_relation(
+                sqla_student, "transcripts")
 
         if include_student_transfers:
-            # map transfers
-            student.transfers = []
-            for transfer in sqla_student.transfer:
-                transfer = self._map_transfer(transfer)
-                student.transfers.append(transfer)
+            student.transfers = self._map_student_relation(
+                sqla_student, "transfers")
 
         if include_student_holds:
-            # map holds
-            student.holds = []
-            for hold in sqla_student.student_hold:
-                hold = self._map_hold(hold)
-                student.holds.append(hold)
+            student.holds = self._map_student_relation(
+                sqla_student, "holds")
 
         if include_student_degrees:
-            # map degrees
-            student.degrees = []
-            for degree in sqla_student.degree:
-                degree = self._map_degree(degree)
-                student.degrees.append(degree)
+            student.degrees = self._map_student_relation(
+                sqla_student, "degrees")
+
+        return student
+
+    def _map_student_relation(self, sqla_student, name, adviser_cache=None):
+        if name == "academic_term":
+            return self._get_term(sqla_student.academic_term_id)
+        elif name == "majors":
+            return [self._get_major(major_id) for major_id in (
+                sqla_student.major_1_id,
+                sqla_student.major_2_id,
+                sqla_student.major_3_id) if major_id is not None]
+        elif name == "pending_majors":
+            return [self._get_major(major_id) for major_id in (
+                sqla_student.pending_major_1_id,
+                sqla_student.pending_major_2_id,
+                sqla_student.pending_major_3_id) if major_id is not None]
+        elif name == "sports":
+            return [self._map_sport(sport) for sport in sqla_student.sport]
+        elif name == "advisers":
+            return [self._map_adviser_person(adviser, adviser_cache)
+                    for adviser in sqla_student.adviser]
+        elif name == "transcripts":
+            return [self._map_transcript(transcript)
+                    for transcript in sqla_student.transcript]
+        elif name == "transfers":
+            return [self._map_transfer(transfer)
+                    for transfer in sqla_student.transfer]
+        elif name == "holds":
+            return [self._map_hold(hold) for hold in sqla_student.student_hold]
+        elif name == "degrees":
+            return [self._map_degree(degree) for degree in sqla_student.degree]
+
+    def _map_adviser_person(self, sqla_adviser, adviser_cache=None):
+        """Map the person record of a student's adviser. Advisers found in
+        adviser_cache are shared rather than mapped again
+        """
+        if adviser_cache is None:
+            return self._map_person(sqla_adviser.employee.person,
+                                    include_student=False)
+        if sqla_adviser.id not in adviser_cache:
+            adviser_cache[sqla_adviser.id] = self._map_person(
+                sqla_adviser.employee.person, include_student=False)
+        return adviser_cache[sqla_adviser.id]
+
+    def _get_term(self, term_id):
+        if term_id is None:
+            return None
+        return self._get_reference(
+            "term", term_id, self.DB.Term, self._map_term, ReadOnlyTerm)
+
+    def _get_major(self, major_id):
+        return self._get_reference(
+            "major", major_id, self.DB.Major, self._map_major, ReadOnlyMajor)
+
+    def _get_reference(self, name, key, entity, mapper, read_only_cls):
+        # cached values are shared between persons, so are read-only
+        def map_row(sqla_row):
+            return read_only_cls.from_component(mapper(sqla_row))
+
+        def load_one(key):
+            sqla_row = self.DB.session.get(entity, key)
+            return None if sqla_row is None else map_row(sqla_row)
+
+        return self.reference_data.get(
+            name, key,
+            lambda: {sqla_row.id: map_row(sqla_row)
+                     for sqla_row in self.DB.session.query(entity)},
+            load_one)
 
+    def _map_projected_person(self, sqla_person, projection,
+                              adviser_cache=None):
+        person = Person()
+        for name in projection["person"]:
+            setattr(person, name,
+                    getattr(sqla_person, PERSON_COLUMNS.get(name, name)))
+
+        if "student" in projection and sqla_person.student is not None:
+            names = projection["student"]
+            if names is None:
+                person.student = self._map_student(
+                    sqla_person.student, adviser_cache=adviser_cache)
+            else:
+                person.student = self._map_projected_student(
+                    sqla_person.student, names, adviser_cache)
+
+        if "employee" in projection and sqla_person.employee is not None:
+            names = projection["employee"]
+            if names is None:
+                person.employee = self._map_employee(sqla_person.employee)
+            else:
+                person.employee = self._map_projected_employee(
+                    sqla_person.employee, names)
+
+        return person
+
+    def _map_projected_student(self, sqla_student, names,
+                               adviser_cache=None):
+        student = Student()
+        for name in names:
+            if name in STUDENT_RELATIONS:
+                value = self._map_student_relation(
+                    sqla_student, name, adviser_cache)
+            else:
+                value = getattr(sqla_student, name)
+                if name in STUDENT_CODE_FIELDS and value is not None:
+                    value = str(value)
+            setattr(student, name, value)
         return student
 
+    def _map_projected_employee(self, sqla_employee, names):
+        employee = Employee()
+        for name in names:
+            if name == "adviser":
+                if sqla_employee.adviser:
+                    employee.adviser = self._map_adviser(
+                        sqla_employee.adviser)
+            else:
+                setattr(employee, name, getattr(
+                    sqla_employee, EMPLOYEE_COLUMNS.get(name, name)))
+        return employee
+
     def _map_employee(self, sqla_employee):
         employee = Employee()
         employee.employee_number = sqla_employee.employee_number
@@ -481,10 +1479,9 @@ class UWPersonClient(AbstractUWPersonClient):
 
     def _map_transcript(self, sqla_transcript):
         transcript = Transcript()
-        transcript.tran_term = self._map_term(
-            sqla_transcript.tran_term)
-        transcript.leave_ends_term = self._map_term(
-            sqla_transcript.leave_ends_term)
+        transcript.tran_term = self._get_term(sqla_transcript.tran_term_id)
+        transcript.leave_ends_term = self._get_term(
+            sqla_transcript.leave_ends_term_id)
         transcript.resident = sqla_transcript.resident
         transcript.resident_cat = sqla_transcript.resident_cat
         transcript.veteran = sqla_transcript.veteran
@@ -559,7 +1556,7 @@ class UWPersonClient(AbstractUWPersonClient):
 
     def _map_degree(self, sqla_degree):
         degree = Degree()
-        degree.degree_term = self._map_term(sqla_degree.degree_term)
+        degree.degree_term = self._get_term(sqla_degree.degree_term_id)
         degree.campus_code = sqla_degree.campus_code
         degree.campus_name = sqla_degree.campus_name
         degree.degree_college_code = sqla_degree.degree_college_code
@@ -5,8 +5,9 @@
 import json
 import glob
 import os
-from uw_person_client.clients import AbstractUWPersonClient
-from uw_person_client.components import Person
+from uw_person_client.clients import (
+    AbstractAsyncUWPersonClient, AbstractUWPersonClient)
+from uw_person_client.components import Person, person_changed
 from uw_person_client.exceptions import PersonNotFoundException
 
 
@@ -55,42 +56,26 @@ class MockedUWPersonClient(AbstractUWPersonClient):
     def _load_person_from_file(self, filename,  **kwargs):
         filehandle = open(filename)
         person = Person().from_dict(json.load(filehandle))
-        if not kwargs.get('include_employee', True):
-            self._delete_attr(person, "employee")
-        if not kwargs.get('include_student', True):
-            self._delete_attr(person, "student")
-        else:
-            if not kwargs.get('include_student_transcripts', True):
-                self._delete_attr(person.student, "transcripts")
-            if not kwargs.get('include_student_transfers', True):
-                self._delete_attr(person.student, "transfers")
-            if not kwargs.get('include_student_sports', True):
-                self._delete_attr(person.student, "sports")
-            if not kwargs.get('include_student_advisers', True):
-                self._delete_attr(person.student, "advisers")
-            if not kwargs.get('include_student_majors', True):
-                self._delete_attr(person.student, "majors")
-            if not kwargs.get('include_student_pending_majors', True):
-                self._delete_attr(person.student, "pending_majors")
-            if not kwargs.get('include_student_holds', True):
-                self._delete_attr(person.student, "holds")
-            if not kwargs.get('include_student_degrees', True):
-                self._delete_attr(person.student, "degrees")
+        self._prune_person(person, **kwargs)
         filehandle.close()
         return person
 
-    def _delete_attr(self, obj, attr):
-        try:
-            delattr(obj, attr)
-        except AttributeError:
-            pass
-
     def _paginate(self, values, page=None, page_size=None):
         if page is not None and page_size is not None:
             offset = (page - 1) * page_size
             values = values[offset:offset+page_size]
         return values
 
+    def _get_page(self, values, page_size, page_token=None):
+        self._check_page_size(page_size)
+        offset = 0
+        if page_token is not None:
+            offset = self._decode_page_token(page_token)
+        next_page_token = None
+        if offset + page_size < len(values):
+            next_page_token = self._encode_page_token(offset + page_size)
+        return values[offset:offset+page_size], next_page_token
+
     def get_person_by_uwnetid(self, uwnetid, **kwargs):
         return self._read_person_file(f'**/*{uwnetid}*.json',  **kwargs)
 
@@ -105,6 +90,22 @@ class MockedUWPersonClient(AbstractUWPersonClient):
         system_key = self.format_system_key(system_key)
         return self._read_person_file(f'**/*{system_key}*.json',  **kwargs)
 
+    def get_persons_by_uwnetids(self, uwnetids, **kwargs):
+        return self._get_persons_by_lookup(
+            self.get_person_by_uwnetid, uwnetids, **kwargs)
+
+    def get_persons_by_uwregids(self, uwregids, **kwargs):
+        return self._get_persons_by_lookup(
+            self.get_person_by_uwregid, uwregids, **kwargs)
+
+    def get_persons_by_student_numbers(self, student_numbers, **kwargs):
+        return self._get_persons_by_lookup(
+            self.get_person_by_student_number, student_numbers, **kwargs)
+
+    def get_persons_by_system_keys(self, system_keys, **kwargs):
+        return self._get_persons_by_lookup(
+            self.get_person_by_system_key, system_keys, **kwargs)
+
     def get_persons(self, page=None, page_size=None, **kwargs):
         return self._paginate(
             self._read_person_files('**/**.json',  **kwargs),
@@ -145,6 +146,48 @@ class MockedUWPersonClient(AbstractUWPersonClient):
         else:
             return advisers
 
+    def get_persons_page(self, page_size, page_token=None, **kwargs):
+        return self._get_page(
+            self.get_persons(**kwargs), page_size, page_token)
+
+    def get_registered_students_page(self, page_size, page_token=None,
+                                     **kwargs):
+        return self._get_page(
+            self.get_registered_students(**kwargs), page_size, page_token)
+
+    def get_active_students_page(self, page_size, page_token=None,
+                                 **kwargs):
+        return self._get_page(
+            self.get_active_students(**kwargs), page_size, page_token)
+
+    def get_active_employees_page(self, page_size, page_token=None,
+                                  **kwargs):
+        return self._get_page(
+            self.get_active_employees(**kwargs), page_size, page_token)
+
+    def get_advisers_page(self, page_size, page_token=None,
+                          advising_program=None, **kwargs):
+        return self._get_page(
+            self.get_advisers(advising_program=advising_program, **kwargs),
+            page_size, page_token)
+
+    def iter_persons(self, batch_size=None, **kwargs):
+        return iter(self.get_persons(**kwargs))
+
+    def iter_registered_students(self, batch_size=None, **kwargs):
+        return iter(self.get_registered_students(**kwargs))
+
+    def iter_active_students(self, batch_size=None, **kwargs):
+        return iter(self.get_active_students(**kwargs))
+
+    def iter_active_employees(self, batch_size=None, **kwargs):
+        return iter(self.get_active_employees(**kwargs))
+
+    def iter_advisers(self, advising_program=None, batch_size=None,
+                      **kwargs):
+        return iter(self.get_advisers(
+            advising_program=advising_program, **kwargs))
+
     def get_persons_by_adviser_netid(self, uwnetid, **kwargs):
         students = self.get_active_students(**kwargs)
         persons = []
@@ -164,3 +207,87 @@ class MockedUWPersonClient(AbstractUWPersonClient):
                     persons.append(person)
                     break
         return persons
+
+    def get_adviser_caseloads(self, uwnetids=None, uwregids=None,
+                              advising_program=None, **kwargs):
+        uwnetids = self._caseload_identifiers("uwnetids", uwnetids)
+        uwregids = self._caseload_identifiers("uwregids", uwregids)
+        caseloads = {}
+        if uwnetids is not None or uwregids is not None:
+            for adviser in self.get_advisers(advising_program):
+                for key in self._caseload_keys(
+                        adviser.uwnetid, adviser.uwregid, uwnetids,
+                        uwregids):
+                    caseloads[key] = []
+        for person in self.get_active_students(**kwargs):
+            for adviser in person.student.advisers:
+                if (advising_program and
+                        adviser.employee.adviser.advising_program !=
+                        advising_program):
+                    continue
+                for key in self._caseload_keys(
+                        adviser.uwnetid, adviser.uwregid, uwnetids, uwregids):
+                    caseloads.setdefault(key, []).append(person)
+        return caseloads
+
+    def get_persons_updated_since(self, since=None, batch_size=None,
+                                  **kwargs):
+        changes = self._get_changes()
+        if not changes:
+            return since, iter(())
+        return changes[-1][0], iter([
+            self._prune_person(person, **kwargs) for changed, person in changes
+            if since is None or changed > since])
+
+    def get_persons_updated_since_page(self, page_size, page_token=None,
+                                       since=None, watermark=None, **kwargs):
+        return self._get_page([
+            self._prune_person(person, **kwargs)
+            for changed, person in self._get_changes()
+            if (since is None or changed > since) and
+            (watermark is None or changed <= watermark)],
+            page_size, page_token)
+
+    def get_update_watermark(self):
+        changes = self._get_changes()
+        return changes[-1][0] if changes else None
+
+    def get_columns(self, population="persons", relations=None,
+                    advising_program=None, arrow=False):
+        return self._get_component_columns(
+            self._get_population(population, advising_program), relations,
+            arrow)
+
+    def get_person_keys(self, population="persons", advising_program=None):
+        return {person.uwregid for person in self._get_population(
+            population, advising_program)}
+
+    def _get_population(self, population, advising_program=None):
+        populations = {
+            "persons": self.get_persons,
+            "registered_students": self.get_registered_students,
+            "active_students": self.get_active_students,
+            "active_employees": self.get_active_employees,
+            "advisers": lambda: self.get_advisers(advising_program),
+        }
+        if population not in populations:
+            raise ValueError(f"Unknown population '{population}'")
+        return populations[population]()
+
+    def _get_changes(self):
+        changes = []
+        for person in self._read_person_files('**/**.json'):
+            changed = person_changed(person)
+            if changed is not None:
+                changes.append((changed, person))
+        changes.sort(key=lambda change: change[0])
+        return changes
+
+
+class AsyncMockedUWPersonClient(AbstractAsyncUWPersonClient):
+
+    def __init__(self):
+        super().__init__(MockedUWPersonClient())
+
+    async def _call(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
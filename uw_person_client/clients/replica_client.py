@@ -0,0 +1,344 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+import logging
+from copy import deepcopy
+from threading import Event, Lock, Thread
+from time import monotonic
+from commonconf import settings
+from uw_person_client.clients import AbstractUWPersonClient
+from uw_person_client.components import person_keys
+from uw_person_client.snapshot import person_populations
+
+logger = logging.getLogger(__name__)
+
+POPULATIONS = {
+    "persons": "iter_persons",
+    "registered_students": "iter_registered_students",
+    "active_students": "iter_active_students",
+    "active_employees": "iter_active_employees",
+    "advisers": "iter_advisers",
+}
+
+
+class ReplicaUWPersonClient(AbstractUWPersonClient):
+    """Serves person lookups from an in-memory copy of a population,
+    indexed by every identifier and refreshed from the change feed of
+    client every refresh_interval seconds by a background thread. Lookups
+    that miss the replica, or arrive when it has not refreshed for
+    max_staleness seconds, are passed to client, as are all other
+    methods. Persons served from the replica are shared and should be
+    treated as read-only.
+
+    The change feed follows student records only. Persons whose student
+    record changes are added to or removed from the replica by their
+    membership of the population. Persons that join or leave it without
+    such a change are found every key_check_interval seconds by comparing
+    the replica with get_person_keys(), which reads the uwregid of every
+    person in the population. Everything else, such as employee records
+    and the persons of the non-student populations, is current as of the
+    last full load, which is repeated every reload_interval seconds; the
+    replica is stale once that is max_staleness seconds overdue.
+    """
+
+    def __init__(self, client=None, population="active_students",
+                 refresh_interval=None, max_staleness=None,
+                 key_check_interval=None, reload_interval=None):
+        if population not in POPULATIONS:
+            raise ValueError(f"Unknown population '{population}'")
+        if client is None:
+            from uw_person_client.clients.core_client import UWPersonClient
+            client = UWPersonClient()
+        self.client = client
+        self.population = population
+        self.refresh_interval = refresh_interval or getattr(
+            settings, "UW_PERSON_REPLICA_REFRESH_INTERVAL", 300)
+        self.max_staleness = max_staleness or getattr(
+            settings, "UW_PERSON_REPLICA_MAX_STALENESS", 3600)
+        self.key_check_interval = key_check_interval or getattr(
+            settings, "UW_PERSON_REPLICA_KEY_CHECK_INTERVAL", 3600)
+        self.reload_interval = reload_interval or getattr(
+            settings, "UW_PERSON_REPLICA_RELOAD_INTERVAL", 86400)
+        self.watermark = None
+        self.refreshed = None
+        self.keys_checked = None
+        self.loaded = None
+        self._persons = {}
+        self._index = {}
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread = None
+
+    def start(self):
+        """Load the population and start refreshing it in the background
+        """
+        self.load()
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, daemon=True,
+                              name="uw-person-replica")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def load(self):
+        # changes made while loading are applied by the next refresh
+        watermark = self.client.get_update_watermark()
+        persons = getattr(self.client, POPULATIONS[self.population])()
+        with self._lock:
+            self._persons, self._index = {}, {}
+            for person in persons:
+                self._add(person)
+        self.watermark = watermark
+        self.refreshed = self.keys_checked = self.loaded = monotonic()
+
+    def refresh(self):
+        """Apply the persons changed since the last refresh, and when
+        key_check_interval has passed, the persons that have otherwise
+        joined or left the population. Loads the population again once
+        reload_interval has passed.
+        """
+        if (self.loaded is None or
+                monotonic() - self.loaded >= self.reload_interval):
+            self.load()
+            logger.debug("Reloaded %d persons", len(self._persons))
+            return
+
+        watermark, persons = self.client.get_persons_updated_since(
+            self.watermark)
+        count = 0
+        for person in persons:
+            with self._lock:
+                if self._in_population(person):
+                    self._add(person)
+                else:
+                    self._remove(person.uwregid)
+            count += 1
+        if (self.keys_checked is None or
+                monotonic() - self.keys_checked >= self.key_check_interval):
+            count += self.check_keys()
+        self.watermark = watermark
+        self.refreshed = monotonic()
+        logger.debug("Refreshed %d persons, %d in replica",
+                     count, len(self._persons))
+
+    def check_keys(self):
+        """Drop the persons that have left the population and add those
+        that have joined it. Returns the number of persons changed.
+        """
+        keys = self.client.get_person_keys(self.population)
+        with self._lock:
+            removed = set(self._persons) - keys
+            for uwregid in removed:
+                self._remove(uwregid)
+            missing = keys - set(self._persons)
+        if missing:
+            added = self.client.get_persons_by_uwregids(missing)
+            with self._lock:
+                for person in added.values():
+                    if person is not None:
+                        self._add(person)
+        self.keys_checked = monotonic()
+        return len(removed) + len(missing)
+
+    def is_stale(self):
+        if self.refreshed is None or self.loaded is None:
+            return True
+        now = monotonic()
+        return (now - self.refreshed > self.max_staleness or
+                now - self.loaded > self.reload_interval + self.max_staleness)
+
+    def session_scope(self):
+        return self.client.session_scope()
+
+    def get_person_by_uwnetid(self, uwnetid, **kwargs):
+        return self._get_person(
+            ("uwnetid", "prior_uwnetid"), uwnetid,
+            self.client.get_person_by_uwnetid, **kwargs)
+
+    def get_person_by_uwregid(self, uwregid, **kwargs):
+        return self._get_person(
+            ("uwregid", "prior_uwregid"), uwregid,
+            self.client.get_person_by_uwregid, **kwargs)
+
+    def get_person_by_student_number(self, student_number, **kwargs):
+        return self._get_person(
+            ("student_number",), self.format_student_number(student_number),
+            self.client.get_person_by_student_number, **kwargs)
+
+    def get_person_by_system_key(self, system_key, **kwargs):
+        return self._get_person(
+            ("system_key",), self.format_system_key(system_key),
+            self.client.get_person_by_system_key, **kwargs)
+
+    def get_persons_by_uwnetids(self, uwnetids, **kwargs):
+        return self._get_persons_by_values(
+            ("uwnetid", "prior_uwnetid"), uwnetids,
+            self.client.get_persons_by_uwnetids, **kwargs)
+
+    def get_persons_by_uwregids(self, uwregids, **kwargs):
+        return self._get_persons_by_values(
+            ("uwregid", "prior_uwregid"), uwregids,
+            self.client.get_persons_by_uwregids, **kwargs)
+
+    def get_persons_by_student_numbers(self, student_numbers, **kwargs):
+        return self._get_persons_by_values(
+            ("student_number",), student_numbers,
+            self.client.get_persons_by_student_numbers,
+            formatter=self.format_student_number, **kwargs)
+
+    def get_persons_by_system_keys(self, system_keys, **kwargs):
+        return self._get_persons_by_values(
+            ("system_key",), system_keys,
+            self.client.get_persons_by_system_keys,
+            formatter=self.format_system_key, **kwargs)
+
+    def get_persons(self, page=None, page_size=None, **kwargs):
+        return self.client.get_persons(page, page_size, **kwargs)
+
+    def get_registered_students(self, page=None, page_size=None, **kwargs):
+        return self.client.get_registered_students(page, page_size, **kwargs)
+
+    def get_active_students(self, page=None, page_size=None, **kwargs):
+        return self.client.get_active_students(page, page_size, **kwargs)
+
+    def get_active_employees(self, page=None, page_size=None, **kwargs):
+        return self.client.get_active_employees(page, page_size, **kwargs)
+
+    def get_advisers(self, advising_program=None, **kwargs):
+        return self.client.get_advisers(advising_program, **kwargs)
+
+    def get_persons_page(self, page_size, page_token=None, **kwargs):
+        return self.client.get_persons_page(page_size, page_token, **kwargs)
+
+    def get_registered_students_page(self, page_size, page_token=None,
+                                     **kwargs):
+        return self.client.get_registered_students_page(
+            page_size, page_token, **kwargs)
+
+    def get_active_students_page(self, page_size, page_token=None,
+                                 **kwargs):
+        return self.client.get_active_students_page(
+            page_size, page_token, **kwargs)
+
+    def get_active_employees_page(self, page_size, page_token=None,
+                                  **kwargs):
+        return self.client.get_active_employees_page(
+            page_size, page_token, **kwargs)
+
+    def get_advisers_page(self, page_size, page_token=None,
+                          advising_program=None, **kwargs):
+        return self.client.get_advisers_page(
+            page_size, page_token, advising_program=advising_program,
+            **kwargs)
+
+    def iter_persons(self, batch_size=None, **kwargs):
+        return self.client.iter_persons(batch_size, **kwargs)
+
+    def iter_registered_students(self, batch_size=None, **kwargs):
+        return self.client.iter_registered_students(batch_size, **kwargs)
+
+    def iter_active_students(self, batch_size=None, **kwargs):
+        return self.client.iter_active_students(batch_size, **kwargs)
+
+    def iter_active_employees(self, batch_size=None, **kwargs):
+        return self.client.iter_active_employees(batch_size, **kwargs)
+
+    def iter_advisers(self, advising_program=None, batch_size=None,
+                      **kwargs):
+        return self.client.iter_advisers(
+            advising_program, batch_size, **kwargs)
+
+    def get_persons_by_adviser_netid(self, uwnetid, **kwargs):
+        return self.client.get_persons_by_adviser_netid(uwnetid, **kwargs)
+
+    def get_persons_by_adviser_regid(self, uwregid, **kwargs):
+        return self.client.get_persons_by_adviser_regid(uwregid, **kwargs)
+
+    def get_adviser_caseloads(self, uwnetids=None, uwregids=None,
+                              advising_program=None, **kwargs):
+        return self.client.get_adviser_caseloads(
+            uwnetids=uwnetids, uwregids=uwregids,
+            advising_program=advising_program, **kwargs)
+
+    def get_columns(self, population="persons", relations=None,
+                    advising_program=None, arrow=False):
+        return self.client.get_columns(
+            population, relations, advising_program, arrow)
+
+    def get_persons_updated_since(self, since=None, batch_size=None,
+                                  **kwargs):
+        return self.client.get_persons_updated_since(
+            since, batch_size, **kwargs)
+
+    def get_persons_updated_since_page(self, page_size, page_token=None,
+                                       since=None, watermark=None, **kwargs):
+        return self.client.get_persons_updated_since_page(
+            page_size, page_token, since=since, watermark=watermark,
+            **kwargs)
+
+    def get_update_watermark(self):
+        return self.client.get_update_watermark()
+
+    def get_person_keys(self, population="persons", advising_program=None):
+        return self.client.get_person_keys(population, advising_program)
+
+    def _run(self):
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Person replica refresh failed")
+
+    def _in_population(self, person):
+        return self.population == "persons" or (
+            self.population in person_populations(person))
+
+    def _add(self, person):
+        self._remove(person.uwregid)
+        keys = list(person_keys(person, priors=True))
+        self._persons[person.uwregid] = (person, keys)
+        for key in keys:
+            self._index[key] = person
+
+    def _remove(self, uwregid):
+        person, keys = self._persons.pop(uwregid, (None, []))
+        for key in keys:
+            if self._index.get(key) is person:
+                del self._index[key]
+
+    def _lookup(self, identifiers, value, **kwargs):
+        if value is None or self.is_stale():
+            return None
+        for identifier in identifiers:
+            person = self._index.get((identifier, value))
+            if person is not None:
+                # pruning must not change the shared copy
+                return self._prune_person(deepcopy(person), **kwargs) if (
+                    kwargs) else person
+        return None
+
+    def _get_person(self, identifiers, value, get_person, **kwargs):
+        person = self._lookup(identifiers, value, **kwargs)
+        if person is None:
+            return get_person(value, **kwargs)
+        return person
+
+    def _get_persons_by_values(self, identifiers, values, get_persons,
+                               formatter=None, **kwargs):
+        persons, missing = {}, []
+        for value in values:
+            person = self._lookup(
+                identifiers, formatter(value) if formatter else value,
+                **kwargs)
+            if person is None:
+                missing.append(value)
+            persons[value] = person
+        if missing:
+            persons.update(get_persons(missing, **kwargs))
+        return persons
@@ -0,0 +1,265 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+from commonconf import settings
+from uw_person_client.clients import AbstractUWPersonClient
+from uw_person_client.exceptions import (
+    AdviserNotFoundException, PersonNotFoundException)
+from uw_person_client.snapshot import POPULATIONS, Snapshot
+
+
+class SnapshotUWPersonClient(AbstractUWPersonClient):
+    """Serves persons from a snapshot file written by build_snapshot(),
+    as of the time it was built
+    """
+
+    def __init__(self, path=None):
+        self.snapshot = Snapshot(
+            path or getattr(settings, "UW_PERSON_SNAPSHOT_PATH"))
+
+    def close(self):
+        self.snapshot.close()
+
+    def get_person_by_uwnetid(self, uwnetid, **kwargs):
+        return self._get_person(("uwnetid", "prior_uwnetid"), uwnetid,
+                                **kwargs)
+
+    def get_person_by_uwregid(self, uwregid, **kwargs):
+        return self._get_person(("uwregid", "prior_uwregid"), uwregid,
+                                **kwargs)
+
+    def get_person_by_student_number(self, student_number, **kwargs):
+        return self._get_person(
+            ("student_number",), self.format_student_number(student_number),
+            **kwargs)
+
+    def get_person_by_system_key(self, system_key, **kwargs):
+        return self._get_person(
+            ("system_key",), self.format_system_key(system_key), **kwargs)
+
+    def get_persons_by_uwnetids(self, uwnetids, **kwargs):
+        return self._get_persons_by_lookup(
+            self.get_person_by_uwnetid, uwnetids, **kwargs)
+
+    def get_persons_by_uwregids(self, uwregids, **kwargs):
+        return self._get_persons_by_lookup(
+            self.get_person_by_uwregid, uwregids, **kwargs)
+
+    def get_persons_by_student_numbers(self, student_numbers, **kwargs):
+        return self._get_persons_by_lookup(
+            self.get_person_by_student_number, student_numbers, **kwargs)
+
+    def get_persons_by_system_keys(self, system_keys, **kwargs):
+        return self._get_persons_by_lookup(
+            self.get_person_by_system_key, system_keys, **kwargs)
+
+    def get_persons(self, page=None, page_size=None, **kwargs):
+        return self._get_population(None, page, page_size, **kwargs)
+
+    def get_registered_students(self, page=None, page_size=None, **kwargs):
+        return self._get_population(
+            "registered_students", page, page_size, **kwargs)
+
+    def get_active_students(self, page=None, page_size=None, **kwargs):
+        return self._get_population(
+            "active_students", page, page_size, **kwargs)
+
+    def get_active_employees(self, page=None, page_size=None, **kwargs):
+        return self._get_population(
+            "active_employees", page, page_size, **kwargs)
+
+    def get_advisers(self, advising_program=None, **kwargs):
+        return list(self.iter_advisers(advising_program, **kwargs))
+
+    def get_persons_page(self, page_size, page_token=None, **kwargs):
+        return self._get_page(
+            self.snapshot.population(), page_size, page_token, **kwargs)
+
+    def get_registered_students_page(self, page_size, page_token=None,
+                                     **kwargs):
+        return self._get_page(
+            self.snapshot.population("registered_students"), page_size,
+            page_token, **kwargs)
+
+    def get_active_students_page(self, page_size, page_token=None,
+                                 **kwargs):
+        return self._get_page(
+            self.snapshot.population("active_students"), page_size, page_token,
+            **kwargs)
+
+    def get_active_employees_page(self, page_size, page_token=None,
+                                  **kwargs):
+        return self._get_page(
+            self.snapshot.population("active_employees"), page_size,
+            page_token, **kwargs)
+
+    def get_advisers_page(self, page_size, page_token=None,
+                          advising_program=None, **kwargs):
+        return self._get_page(self._adviser_records(advising_program),
+                              page_size, page_token, **kwargs)
+
+    def iter_persons(self, batch_size=None, **kwargs):
+        return self._iter_records(self.snapshot.population(), **kwargs)
+
+    def iter_registered_students(self, batch_size=None, **kwargs):
+        return self._iter_records(
+            self.snapshot.population("registered_students"), **kwargs)
+
+    def iter_active_students(self, batch_size=None, **kwargs):
+        return self._iter_records(
+            self.snapshot.population("active_students"), **kwargs)
+
+    def iter_active_employees(self, batch_size=None, **kwargs):
+        return self._iter_records(
+            self.snapshot.population("active_employees"), **kwargs)
+
+    def iter_advisers(self, advising_program=None, batch_size=None,
+                      **kwargs):
+        return self._iter_records(
+            self._adviser_records(advising_program), **kwargs)
+
+    def get_persons_by_adviser_netid(self, uwnetid, **kwargs):
+        return self._get_persons_by_adviser(
+            "uwnetid", "adviser_uwnetid", uwnetid, **kwargs)
+
+    def get_persons_by_adviser_regid(self, uwregid, **kwargs):
+        return self._get_persons_by_adviser(
+            "uwregid", "adviser_uwregid", uwregid, **kwargs)
+
+    def get_adviser_caseloads(self, uwnetids=None, uwregids=None,
+                              advising_program=None, **kwargs):
+        uwnetids = self._caseload_identifiers("uwnetids", uwnetids)
+        uwregids = self._caseload_identifiers("uwregids", uwregids)
+        caseloads, persons = {}, {}
+        if uwnetids is None and uwregids is None:
+            keys = self.snapshot.indexes["adviser_uwnetid"].keys()
+        else:
+            requested = [
+                *[("uwnetid", uwnetid) for uwnetid in uwnetids or []],
+                *[("uwregid", uwregid) for uwregid in uwregids or []]]
+            keys = [(key, self.snapshot.find(f"adviser_{index}", key))
+                    for index, key in requested]
+            # requested advisers without students have an empty caseload
+            for index, key in requested:
+                if self._is_adviser(index, key, advising_program):
+                    caseloads[key] = {}
+
+        for key, records in keys:
+            for record in records:
+                if record not in persons:
+                    persons[record] = self.snapshot.get(record)
+                for adviser in persons[record].student.advisers:
+                    if key not in (adviser.uwnetid, adviser.uwregid):
+                        continue
+                    if (advising_program and
+                            adviser.employee.adviser.advising_program !=
+                            advising_program):
+                        continue
+                    # a student is listed once per adviser, under the
+                    # identifier it was requested by
+                    caseloads.setdefault(key, {})[record] = persons[record]
+        for person in persons.values():
+            self._prune_person(person, **kwargs)
+        return {key: list(caseload.values())
+                for key, caseload in caseloads.items()}
+
+    def get_columns(self, population="persons", relations=None,
+                    advising_program=None, arrow=False):
+        return self._get_component_columns(
+            self._iter_records(self._population_records(
+                population, advising_program)), relations, arrow)
+
+    def get_persons_updated_since(self, since=None, batch_size=None,
+                                  **kwargs):
+        """Return the watermark of the snapshot, and an iterator of the
+        persons whose student record changed after since and before the
+        snapshot was built
+        """
+        if self.snapshot.watermark is None:
+            return since, iter(())
+        return self.snapshot.watermark, self._iter_records(
+            self.snapshot.changes(since), **kwargs)
+
+    def get_persons_updated_since_page(self, page_size, page_token=None,
+                                       since=None, watermark=None, **kwargs):
+        return self._get_page(self.snapshot.changes(since, watermark),
+                              page_size, page_token, **kwargs)
+
+    def get_update_watermark(self):
+        """Return the latest student change time in the snapshot"""
+        return self.snapshot.watermark
+
+    def get_person_keys(self, population="persons", advising_program=None):
+        """Return the set of uwregids in a population, read from the
+        uwregid index rather than the person records
+        """
+        records = set(self._population_records(
+            population, advising_program))
+        return {uwregid for uwregid, uwregid_records
+                in self.snapshot.indexes["uwregid"].keys()
+                if records.intersection(uwregid_records)}
+
+    def _is_adviser(self, index, value, advising_program=None):
+        for record in self.snapshot.find(index, value):
+            employee = getattr(self.snapshot.get(record), "employee", None)
+            adviser = getattr(employee, "adviser", None)
+            if adviser is not None and (
+                    not advising_program or
+                    adviser.advising_program == advising_program):
+                return True
+        return False
+
+    def _get_person(self, indexes, value, **kwargs):
+        for index in indexes:
+            if value is not None:
+                records = self.snapshot.find(index, value)
+                if records:
+                    return self._prune_person(
+                        self.snapshot.get(records[0]), **kwargs)
+        raise PersonNotFoundException()
+
+    def _get_persons_by_adviser(self, identifier, index, value, **kwargs):
+        if not self._is_adviser(identifier, value):
+            raise AdviserNotFoundException()
+        return list(self._iter_records(
+            self.snapshot.find(index, value), **kwargs))
+
+    def _get_population(self, name, page=None, page_size=None, **kwargs):
+        records = self.snapshot.population(name)
+        if page is not None and page_size is not None:
+            records = records[(page - 1) * page_size:page * page_size]
+        return list(self._iter_records(records, **kwargs))
+
+    def _get_page(self, records, page_size, page_token=None, **kwargs):
+        self._check_page_size(page_size)
+        offset = 0
+        if page_token is not None:
+            offset = self._decode_page_token(page_token)
+        next_page_token = None
+        if offset + page_size < len(records):
+            next_page_token = self._encode_page_token(offset + page_size)
+        return list(self._iter_records(
+            records[offset:offset + page_size], **kwargs)), next_page_token
+
+    def _population_records(self, population, advising_program=None):
+        if population == "persons":
+            return self.snapshot.population()
+        if population == "advisers":
+            return self._adviser_records(advising_program)
+        if population not in POPULATIONS:
+            raise ValueError(f"Unknown population '{population}'")
+        return self.snapshot.population(population)
+
+    def _adviser_records(self, advising_program=None):
+        records = self.snapshot.population("advisers")
+        if advising_program:
+            records = [
+                record for record in records
+                if self.snapshot.get(record).employee.adviser.advising_program
+                == advising_program]
+        return records
+
+    def _iter_records(self, records, **kwargs):
+        for record in records:
+            yield self._prune_person(self.snapshot.get(record), **kwargs)
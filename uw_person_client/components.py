@@ -3,41 +3,137 @@
 
 
 import json
-from copy import copy
+from datetime import date, datetime
+from decimal import Decimal
+from operator import attrgetter
+
+_MISSING = object()
+
+
+def json_default(value):
+    """Encode the values of mapped fields that JSON has no type for"""
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def person_keys(person, priors=False, advisers=False):
+    """Yield the (identifier, value) pairs that a person can be looked up
+    by: its uwnetid, uwregid, system_key and student_number, and with
+    priors its prior uwnetids and uwregids, and with advisers the
+    uwnetids and uwregids of its student advisers ("adviser_uwnetid")
+    """
+    for name in ("uwnetid", "uwregid", "system_key"):
+        if getattr(person, name, None):
+            yield name, getattr(person, name)
+    if priors:
+        for name in ("uwnetid", "uwregid"):
+            for prior in getattr(person, f"prior_{name}s", None) or []:
+                yield f"prior_{name}", prior
+    student = getattr(person, "student", None)
+    if student is None:
+        return
+    if getattr(student, "student_number", None):
+        yield "student_number", student.student_number
+    if advisers:
+        for adviser in getattr(student, "advisers", None) or []:
+            for name in ("uwnetid", "uwregid"):
+                if getattr(adviser, name, None):
+                    yield f"adviser_{name}", getattr(adviser, name)
+
+
+def person_changed(person):
+    """Return the time that a person's student record was last loaded or
+    updated, or None for a person without a student record
+    """
+    student = getattr(person, "student", None)
+    times = [datetime.fromisoformat(value) if isinstance(value, str)
+             else value for value in (
+                 getattr(student, "record_update_dttm", None),
+                 getattr(student, "record_load_dttm", None)) if value]
+    return max(times, default=None)
+
+
+def _format_list(values):
+    items = []
+    for value in values:
+        format = _FORMATS.get(type(value))
+        items.append(value if format is None else format(value))
+    return items
+
+
+# to_dict() formatters by exact value type, to which each component
+# class is added
+_FORMATS = {list: _format_list}
+_JSON_ENCODER = json.JSONEncoder(sort_keys=True, indent=2,
+                                 default=json_default)
+_COMPACT_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"),
+                                         default=json_default)
 
 
 class AbstractBase():
+    """Components store the attributes named in their FIELDS as slots,
+    and any others in __dict__. Attributes that were never set do not
+    exist, as when a component is mapped without them.
+    """
+    __slots__ = ("__dict__",)
+    FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _FORMATS[cls] = cls.to_dict
+        if "FIELDS" in cls.__dict__:
+            # reads every field at once, or raises AttributeError
+            get = attrgetter(*cls.FIELDS)
+            cls._get_fields = staticmethod(get if len(cls.FIELDS) > 1 else (
+                lambda obj: (get(obj),)))
+
+    @staticmethod
+    def _get_fields(obj):
+        return ()
 
     def __getattr__(self, name):
-        try:
-            return self.__dict__[name]
-        except KeyError:
-            raise AttributeError(f"Attribute '{name}' does not exist for "
-                                 f"'{type(self).__name__}' instance.")
-
-    def __setattr__(self, name, value):
-        self.__dict__[name] = value
+        # only called for attributes that were never set
+        raise AttributeError(f"Attribute '{name}' does not exist for "
+                             f"'{type(self).__name__}' instance.")
 
-    def to_dict(self):
+    def __getstate__(self):
+        # restored by pickle and copy without a __setstate__ call
+        return self.__dict__ or None, self._field_values()
 
-        def format(value):
-            if isinstance(value, AbstractBase):
-                return value.to_dict()
-            elif isinstance(value, list):
-                return [format(item) for item in value]
-            else:
-                return value
+    def _field_values(self):
+        try:
+            return dict(zip(self.FIELDS, self._get_fields(self)))
+        except AttributeError:
+            data = {}
+            for name in self.FIELDS:
+                value = getattr(self, name, _MISSING)
+                if value is not _MISSING:
+                    data[name] = value
+            return data
+
+    def attrs(self):
+        """Return a dict of the attributes that are set"""
+        data = self._field_values()
+        data.update(self.__dict__)
+        return data
 
-        data = copy(self.__dict__)
+    def to_dict(self):
+        data = self.attrs()
         for key, value in data.items():
-            data[key] = format(value)
+            format = _FORMATS.get(type(value))
+            if format is not None:
+                data[key] = format(value)
         return data
 
-    def to_json(self):
-        return json.dumps(self.to_dict(),
-                          sort_keys=True,
-                          indent=2,
-                          default=str)
+    def to_json(self, compact=False):
+        """Encode as indented JSON with sorted keys, or when compact as
+        JSON without whitespace in field order, about twice as fast
+        """
+        encoder = _COMPACT_JSON_ENCODER if compact else _JSON_ENCODER
+        return encoder.encode(self.to_dict())
 
     def from_dict(self, data, obj=None):
         if obj is None:
@@ -69,6 +165,8 @@ class AbstractBase():
                     obj_cls = Sport
                 elif key == "holds":
                     obj_cls = Hold
+                elif key == "degrees":
+                    obj_cls = Degree
                 items = []
                 for list_value in value:
                     if isinstance(list_value, dict):
@@ -83,49 +181,184 @@ class AbstractBase():
         return obj
 
 
+_FORMATS[AbstractBase] = AbstractBase.to_dict
+
+
 class Person(AbstractBase):
-    pass
+    __slots__ = FIELDS = (
+        "uwnetid", "uwregid", "prior_uwnetids", "prior_uwregids", "system_key",
+        "pronouns", "full_name", "display_name", "first_name", "surname",
+        "preferred_first_name", "preferred_middle_name", "preferred_surname",
+        "whitepages_publish", "active_student", "active_employee", "student",
+        "employee")
 
 
 class Student(AbstractBase):
-    pass
+    __slots__ = FIELDS = (
+        "system_key", "student_number", "application_status_code",
+        "application_status_desc", "application_type_code",
+        "application_type_desc", "applied_to_graduate_yr_qtr_desc",
+        "applied_to_graduate_yr_qtr_id", "asuwind", "birth_city",
+        "birth_country", "birth_state", "birthdate", "campus_code",
+        "campus_desc", "child_of_alumni", "citizen_country", "class_code",
+        "class_desc", "cumulative_gpa", "deceased_date",
+        "directory_release_ind", "disability_ind", "emergency_email",
+        "emergency_name", "emergency_phone", "enroll_status_code",
+        "enroll_status_request_code", "enroll_status_desc", "ethnic_code",
+        "ethnic_desc", "ethnic_long_desc", "ethnic_group_code",
+        "ethnic_group_desc", "exemption_code", "exemption_desc",
+        "external_email", "first_generation_4yr_ind", "first_generation_ind",
+        "gender", "high_school_gpa", "high_school_graduation_date",
+        "hispanic_code", "hispanic_desc", "hispanic_long_desc",
+        "hispanic_group_code", "hispanic_group_desc", "honors_program_code",
+        "honors_program_ind", "iss_perm_resident_country", "jr_col_gpa",
+        "last_enrolled_yr_qtr_desc", "last_enrolled_yr_qtr_id",
+        "local_addr_4digit_zip", "local_addr_5digit_zip", "local_addr_city",
+        "local_addr_country", "local_addr_line1", "local_addr_line2",
+        "local_addr_postal_code", "local_addr_state", "local_phone_number",
+        "new_continuing_returning_code", "new_continuing_returning_desc",
+        "parent_name", "perm_addr_4digit_zip", "perm_addr_5digit_zip",
+        "perm_addr_city", "perm_addr_country", "perm_addr_line1",
+        "perm_addr_line2", "perm_addr_postal_code", "perm_addr_state",
+        "previous_institution_name", "previous_institution_type",
+        "previous_institution_type_desc", "record_load_dttm",
+        "record_update_dttm", "reg_first_yr_qtr_desc", "reg_first_yr_qtr_id",
+        "registered_in_quarter", "registration_hold_ind", "resident_code",
+        "resident_desc", "special_program_code", "special_program_desc",
+        "sr_col_gpa", "student_email", "total_credits",
+        "total_deductible_credits", "total_extension_credits",
+        "total_grade_attempted", "total_grade_points",
+        "total_lower_div_transfer_credits", "total_non_graded_credits",
+        "total_registered_credits", "total_transfer_credits",
+        "total_uw_credits", "total_upper_div_transfer_credits",
+        "veteran_benefit_code", "veteran_benefit_desc", "veteran_desc",
+        "visa_type", "academic_term", "admitted_for_yr_qtr_desc",
+        "admitted_for_yr_qtr_id", "majors", "pending_majors",
+        "requested_major1_code", "requested_major2_code",
+        "requested_major3_code", "intended_major1_code",
+        "intended_major2_code", "intended_major3_code", "sports", "advisers",
+        "transcripts", "transfers", "holds", "degrees")
 
 
 class Employee(AbstractBase):
-    pass
+    __slots__ = FIELDS = (
+        "employee_number", "employee_affiliation_state", "email_addresses",
+        "home_department", "primary_title", "primary_department", "adviser")
 
 
 class Transcript(AbstractBase):
-    pass
+    __slots__ = FIELDS = (
+        "tran_term", "leave_ends_term", "resident", "resident_cat", "veteran",
+        "veteran_benefit", "class_code", "qtr_grade_points",
+        "qtr_graded_attmp", "qtr_nongrd_earned", "qtr_deductible",
+        "over_qtr_grade_pt", "over_qtr_grade_at", "over_qtr_nongrd",
+        "over_qtr_deduct", "qtr_comment", "honors_program", "special_program",
+        "special_program_desc", "scholarship_type", "scholarship_abbr",
+        "scholarship_desc", "yearly_honor_type", "exemption_code",
+        "num_ind_study", "num_courses", "enroll_status",
+        "enroll_status_request_code", "enroll_status_desc",
+        "tenth_day_credits", "tr_en_stat_dt", "add_to_cum")
 
 
 class Transfer(AbstractBase):
-    pass
+    __slots__ = FIELDS = (
+        "institution_code", "year_ending", "year_beginning", "transfer_gpa",
+        "trans_updt_dt", "trans_updt_id", "degree_earned", "degree_earned_yr",
+        "degree_earned_mo", "credential_lvl", "credential_yr",
+        "transfer_comment", "institution_name", "inst_addr_line_1",
+        "inst_addr_line_2", "inst_city", "inst_state", "inst_zip_5",
+        "inst_zip_filler", "inst_country", "inst_postal_cd",
+        "inst_record_stat", "two_year", "wa_cc")
 
 
 class Hold(AbstractBase):
-    pass
+    __slots__ = FIELDS = (
+        "seq", "hold_dt", "hold_office", "hold_office_desc", "hold_reason",
+        "hold_type", "hold_type_desc")
 
 
 class Degree(AbstractBase):
-    pass
+    __slots__ = FIELDS = (
+        "degree_term", "campus_code", "campus_name", "degree_college_code",
+        "degree_college_name", "degree_abbr_code", "degree_pathway_num",
+        "degree_level_code", "degree_level_desc", "degree_type_code",
+        "degree_level_type_desc", "degree_desc", "degree_status_code",
+        "degree_status_desc", "degree_date", "degree_grad_honor",
+        "degree_grad_honor_desc", "degree_uw_credits",
+        "degree_transfer_credits", "degree_extension_credits", "degree_gpa",
+        "degree_index", "degree_major_index")
 
 
 class Major(AbstractBase):
-    pass
+    __slots__ = FIELDS = (
+        "major_abbr_code", "major_pathway", "major_branch",
+        "major_branch_name", "major_name", "major_full_name",
+        "major_short_name", "major_desc", "major_home_url", "major_dept",
+        "major_last_yr", "major_last_qtr", "major_first_yr", "major_first_qtr",
+        "major_cip_code", "major_undergrad", "major_graduate",
+        "major_professional", "major_non_degree", "major_minor",
+        "major_not_termin", "major_ug_certif", "major_grad_certif",
+        "major_evening", "major_ss_std_act", "major_ss_inelig",
+        "major_osfa_inelig", "major_dist_learn", "major_concur_cc",
+        "major_measles_ex", "major_premaj", "major_premaj_ext",
+        "major_nonmatric", "major_gnm", "college", "major_college_name")
 
 
 class Sport(AbstractBase):
-    pass
+    __slots__ = FIELDS = ("sport_code",)
 
 
 class Adviser(AbstractBase):
-    pass
+    __slots__ = FIELDS = (
+        "is_dept_adviser", "advising_email", "advising_phone_number",
+        "advising_program", "advising_pronouns", "booking_url")
 
 
 class Term(AbstractBase):
+    __slots__ = FIELDS = ("year", "quarter")
     TERM_NAMES = {1: "Winter", 2: "Spring", 3: "Summer", 4: "Autumn"}
 
     @property
     def quarter_name(self):
         return self.TERM_NAMES.get(self.quarter)
+
+    @quarter_name.setter
+    def quarter_name(self, value):
+        # kept as given by from_dict()
+        self.__dict__["quarter_name"] = value
+
+
+class ReadOnly():
+    """Mixin for components that are shared between persons, such as
+    cached terms and majors, whose attributes cannot be changed. Copies
+    made by pickle or copy are of the writable component class.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_component(cls, component):
+        obj = cls.__new__(cls)
+        for name, value in component.attrs().items():
+            object.__setattr__(obj, name, value)
+        return obj
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            f"'{type(self).__name__}' instance is read-only.")
+
+    def __delattr__(self, name):
+        raise AttributeError(
+            f"'{type(self).__name__}' instance is read-only.")
+
+    def __reduce__(self):
+        writable = next(cls for cls in type(self).__mro__
+                        if not issubclass(cls, ReadOnly))
+        return writable, (), self.__getstate__()
+
+
+class ReadOnlyTerm(ReadOnly, Term):
+    __slots__ = ()
+
+
+class ReadOnlyMajor(ReadOnly, Major):
+    __slots__ = ()
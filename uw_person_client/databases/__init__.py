@@ -3,25 +3,82 @@
 
 
 import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy.orm import scoped_session
 from sqlalchemy.orm.session import sessionmaker
+from uw_person_client.databases.routing import RoutingSession
 
 
 class AbstractDatabase(object):
+    """Engine and sessions. Each thread gets its own session, so a client
+    shared by worker threads checks out one pooled connection per thread.
+    When create_engine() also sets a router, each session is bound to the
+    read replica engine the router chooses.
+    """
 
     def __init__(self, expire_session_on_commit=True):
-        self._session_factory = sessionmaker(
-            expire_on_commit=expire_session_on_commit)
-        self._session = None
+        self.router = None
         self.create_engine()
+        if self.router is not None:
+            self._session_factory = sessionmaker(
+                class_=RoutingSession, router=self.router,
+                expire_on_commit=expire_session_on_commit)
+        else:
+            self._session_factory = sessionmaker(
+                bind=self.engine, expire_on_commit=expire_session_on_commit)
+        self._scoped_session = scoped_session(self._session_factory)
+        self._scopes = threading.local()
 
     def create_engine(self):
         raise NotImplementedError()
 
     @property
     def session(self):
-        if self._session is None:
-            self._session = self._session_factory(bind=self.engine)
-        return self._session
+        return self._scoped_session()
+
+    @contextmanager
+    def session_scope(self):
+        """Use the current thread's session for the duration of the block,
+        then close it and return its connection to the pool. Nested scopes
+        share the outermost one.
+        """
+        depth = getattr(self._scopes, "depth", 0)
+        self._scopes.depth = depth + 1
+        try:
+            yield self.session
+        finally:
+            self._scopes.depth = depth
+            if depth == 0:
+                self._scoped_session.remove()
+
+    @contextmanager
+    def stream_scope(self):
+        """Use the current thread's session for a stream of results, which
+        other client calls made while it is consumed must not release:
+        release_session() does nothing until the thread's last stream ends,
+        and is then called
+        """
+        streams = getattr(self._scopes, "streams", 0)
+        self._scopes.streams = streams + 1
+        try:
+            yield self.session
+        finally:
+            self._scopes.streams = streams
+            self.release_session()
+
+    def release_session(self):
+        """Drop the ORM state held by the current thread's session: the
+        session is cleared inside a session_scope, and closed otherwise.
+        Does nothing while a stream_scope is open on the thread.
+        """
+        if getattr(self._scopes, "streams", 0):
+            return
+        if getattr(self._scopes, "depth", 0):
+            self.session.expunge_all()
+        else:
+            self._scoped_session.remove()
 
     def commit_session(self):
         try:
@@ -30,3 +87,53 @@ class AbstractDatabase(object):
             logging.error(e)
             self.session.rollback()
             raise
+
+
+class AbstractAsyncDatabase(object):
+    """Async engine and sessions. The sync ORM API is used through
+    run_sync(), which makes the sync session of the async session it opens
+    available as the session attribute for the duration of the call.
+    """
+
+    def __init__(self, expire_session_on_commit=True):
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        self._session_factory = async_sessionmaker(
+            expire_on_commit=expire_session_on_commit)
+        self._sync_session = ContextVar("sync_session", default=None)
+        self.create_engine()
+
+    def create_engine(self):
+        raise NotImplementedError()
+
+    @property
+    def session(self):
+        session = self._sync_session.get()
+        if session is None:
+            raise RuntimeError("No session outside of run_sync()")
+        return session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        async with self._session_factory(bind=self.engine) as session:
+            return await session.run_sync(
+                self._call_with_session, fn, *args, **kwargs)
+
+    @contextmanager
+    def stream_scope(self):
+        # a stream is consumed within the run_sync() call that opened it
+        try:
+            yield self.session
+        finally:
+            self.release_session()
+
+    def release_session(self):
+        self.session.expunge_all()
+
+    async def dispose(self):
+        await self.engine.dispose()
+
+    def _call_with_session(self, session, fn, *args, **kwargs):
+        token = self._sync_session.set(session)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._sync_session.reset(token)
@@ -0,0 +1,426 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+# Declarative models for the datastore tables and columns that the client
+# reads, with the relationship names that automap reflection produces.
+
+from sqlalchemy import (
+    ARRAY, Boolean, Column, Date, DateTime, ForeignKey, Integer, Numeric,
+    Table, TEXT)
+from sqlalchemy.orm import declarative_base, relationship
+
+
+Base = declarative_base()
+
+student_to_sport = Table(
+    "student_to_sport",
+    Base.metadata,
+    Column("student_id", ForeignKey("student.id"), primary_key=True),
+    Column("sport_id", ForeignKey("sport.id"), primary_key=True)
+)
+
+student_to_adviser = Table(
+    "student_to_adviser",
+    Base.metadata,
+    Column("student_id", ForeignKey("student.id"), primary_key=True),
+    Column("adviser_id", ForeignKey("adviser.id"), primary_key=True)
+)
+
+
+class Person(Base):
+    __tablename__ = "person"
+    id = Column(Integer, primary_key=True)
+    _is_active_employee = Column(Boolean)
+    _is_active_student = Column(Boolean)
+    display_name = Column(TEXT)
+    first_name = Column(TEXT)
+    full_name = Column(TEXT)
+    preferred_first_name = Column(TEXT)
+    preferred_middle_name = Column(TEXT)
+    preferred_surname = Column(TEXT)
+    prior_uwnetids = Column(ARRAY(TEXT))
+    prior_uwregids = Column(ARRAY(TEXT))
+    pronouns = Column(TEXT)
+    surname = Column(TEXT)
+    system_key = Column(TEXT)
+    uwnetid = Column(TEXT)
+    uwregid = Column(TEXT)
+    whitepages_publish = Column(Boolean)
+    student = relationship("Student", uselist=False, viewonly=True)
+    employee = relationship("Employee", uselist=False, viewonly=True)
+
+
+class Student(Base):
+    __tablename__ = "student"
+    id = Column(Integer, primary_key=True)
+    person_id = Column(ForeignKey("person.id"))
+    academic_term_id = Column(ForeignKey("term.id"))
+    major_1_id = Column(ForeignKey("major.id"))
+    major_2_id = Column(ForeignKey("major.id"))
+    major_3_id = Column(ForeignKey("major.id"))
+    pending_major_1_id = Column(ForeignKey("major.id"))
+    pending_major_2_id = Column(ForeignKey("major.id"))
+    pending_major_3_id = Column(ForeignKey("major.id"))
+    admitted_for_yr_qtr_desc = Column(TEXT)
+    admitted_for_yr_qtr_id = Column(TEXT)
+    application_status_code = Column(TEXT)
+    application_status_desc = Column(TEXT)
+    application_type_code = Column(TEXT)
+    application_type_desc = Column(TEXT)
+    applied_to_graduate_yr_qtr_desc = Column(TEXT)
+    applied_to_graduate_yr_qtr_id = Column(TEXT)
+    asuwind = Column(Boolean)
+    birth_city = Column(TEXT)
+    birth_country = Column(TEXT)
+    birth_state = Column(TEXT)
+    birthdate = Column(Date)
+    campus_code = Column(TEXT)
+    campus_desc = Column(TEXT)
+    child_of_alumni = Column(Boolean)
+    citizen_country = Column(TEXT)
+    class_code = Column(TEXT)
+    class_desc = Column(TEXT)
+    cumulative_gpa = Column(Numeric)
+    deceased_date = Column(Date)
+    directory_release_ind = Column(Boolean)
+    disability_ind = Column(Boolean)
+    emergency_email = Column(TEXT)
+    emergency_name = Column(TEXT)
+    emergency_phone = Column(TEXT)
+    enroll_status_code = Column(TEXT)
+    enroll_status_desc = Column(TEXT)
+    enroll_status_request_code = Column(TEXT)
+    ethnic_code = Column(TEXT)
+    ethnic_desc = Column(TEXT)
+    ethnic_group_code = Column(TEXT)
+    ethnic_group_desc = Column(TEXT)
+    ethnic_long_desc = Column(TEXT)
+    exemption_code = Column(TEXT)
+    exemption_desc = Column(TEXT)
+    external_email = Column(TEXT)
+    first_generation_4yr_ind = Column(Boolean)
+    first_generation_ind = Column(Boolean)
+    gender = Column(TEXT)
+    high_school_gpa = Column(Numeric)
+    high_school_graduation_date = Column(Date)
+    hispanic_code = Column(TEXT)
+    hispanic_desc = Column(TEXT)
+    hispanic_group_code = Column(TEXT)
+    hispanic_group_desc = Column(TEXT)
+    hispanic_long_desc = Column(TEXT)
+    honors_program_code = Column(TEXT)
+    honors_program_ind = Column(Boolean)
+    intended_major1_code = Column(TEXT)
+    intended_major2_code = Column(TEXT)
+    intended_major3_code = Column(TEXT)
+    iss_perm_resident_country = Column(TEXT)
+    jr_col_gpa = Column(Numeric)
+    last_enrolled_yr_qtr_desc = Column(TEXT)
+    last_enrolled_yr_qtr_id = Column(TEXT)
+    local_addr_4digit_zip = Column(TEXT)
+    local_addr_5digit_zip = Column(TEXT)
+    local_addr_city = Column(TEXT)
+    local_addr_country = Column(TEXT)
+    local_addr_line1 = Column(TEXT)
+    local_addr_line2 = Column(TEXT)
+    local_addr_postal_code = Column(TEXT)
+    local_addr_state = Column(TEXT)
+    local_phone_number = Column(TEXT)
+    new_continuing_returning_code = Column(TEXT)
+    new_continuing_returning_desc = Column(TEXT)
+    parent_name = Column(TEXT)
+    perm_addr_4digit_zip = Column(TEXT)
+    perm_addr_5digit_zip = Column(TEXT)
+    perm_addr_city = Column(TEXT)
+    perm_addr_country = Column(TEXT)
+    perm_addr_line1 = Column(TEXT)
+    perm_addr_line2 = Column(TEXT)
+    perm_addr_postal_code = Column(TEXT)
+    perm_addr_state = Column(TEXT)
+    previous_institution_name = Column(TEXT)
+    previous_institution_type = Column(TEXT)
+    previous_institution_type_desc = Column(TEXT)
+    record_load_dttm = Column(DateTime)
+    record_update_dttm = Column(DateTime)
+    reg_first_yr_qtr_desc = Column(TEXT)
+    reg_first_yr_qtr_id = Column(TEXT)
+    registered_in_quarter = Column(Boolean)
+    registration_hold_ind = Column(Boolean)
+    requested_major1_code = Column(TEXT)
+    requested_major2_code = Column(TEXT)
+    requested_major3_code = Column(TEXT)
+    resident_code = Column(TEXT)
+    resident_desc = Column(TEXT)
+    special_program_code = Column(TEXT)
+    special_program_desc = Column(TEXT)
+    sr_col_gpa = Column(Numeric)
+    student_email = Column(TEXT)
+    student_number = Column(TEXT)
+    system_key = Column(TEXT)
+    total_credits = Column(Numeric)
+    total_deductible_credits = Column(Numeric)
+    total_extension_credits = Column(Numeric)
+    total_grade_attempted = Column(Numeric)
+    total_grade_points = Column(Numeric)
+    total_lower_div_transfer_credits = Column(Numeric)
+    total_non_graded_credits = Column(Numeric)
+    total_registered_credits = Column(Numeric)
+    total_transfer_credits = Column(Numeric)
+    total_upper_div_transfer_credits = Column(Numeric)
+    total_uw_credits = Column(Numeric)
+    veteran_benefit_code = Column(TEXT)
+    veteran_benefit_desc = Column(TEXT)
+    veteran_desc = Column(TEXT)
+    visa_type = Column(TEXT)
+    person = relationship("Person", viewonly=True)
+    academic_term = relationship(
+        "Term", foreign_keys=[academic_term_id], viewonly=True)
+    major_1 = relationship(
+        "Major", foreign_keys=[major_1_id], viewonly=True)
+    major_2 = relationship(
+        "Major", foreign_keys=[major_2_id], viewonly=True)
+    major_3 = relationship(
+        "Major", foreign_keys=[major_3_id], viewonly=True)
+    pending_major_1 = relationship(
+        "Major", foreign_keys=[pending_major_1_id], viewonly=True)
+    pending_major_2 = relationship(
+        "Major", foreign_keys=[pending_major_2_id], viewonly=True)
+    pending_major_3 = relationship(
+        "Major", foreign_keys=[pending_major_3_id], viewonly=True)
+    sport = relationship("Sport", secondary=student_to_sport, viewonly=True)
+    adviser = relationship(
+        "Adviser", secondary=student_to_adviser, viewonly=True)
+    transcript = relationship(
+        "Transcript", back_populates="student", viewonly=True)
+    transfer = relationship(
+        "Transfer", back_populates="student", viewonly=True)
+    degree = relationship("Degree", back_populates="student", viewonly=True)
+    student_hold = relationship(
+        "Hold", back_populates="student", order_by="Hold.seq",
+        viewonly=True)
+
+
+class Employee(Base):
+    __tablename__ = "employee"
+    id = Column(Integer, primary_key=True)
+    person_id = Column(ForeignKey("person.id"))
+    department = Column(TEXT)
+    email_addresses = Column(ARRAY(TEXT))
+    employee_affiliation_state = Column(TEXT)
+    employee_number = Column(TEXT)
+    home_department = Column(TEXT)
+    title = Column(TEXT)
+    person = relationship("Person", viewonly=True)
+    adviser = relationship(
+        "Adviser", back_populates="employee", uselist=False, viewonly=True)
+
+
+class Adviser(Base):
+    __tablename__ = "adviser"
+    id = Column(Integer, primary_key=True)
+    employee_id = Column(ForeignKey("employee.id"))
+    advising_email = Column(TEXT)
+    advising_phone_number = Column(TEXT)
+    advising_program = Column(TEXT)
+    advising_pronouns = Column(TEXT)
+    booking_url = Column(TEXT)
+    is_dept_adviser = Column(Boolean)
+    employee = relationship(
+        "Employee", back_populates="adviser", viewonly=True)
+
+
+class Major(Base):
+    __tablename__ = "major"
+    id = Column(Integer, primary_key=True)
+    college = Column(TEXT)
+    major_abbr_code = Column(TEXT)
+    major_branch = Column(Integer)
+    major_branch_name = Column(TEXT)
+    major_cip_code = Column(Integer)
+    major_college_name = Column(TEXT)
+    major_concur_cc = Column(Boolean)
+    major_dept = Column(TEXT)
+    major_desc = Column(TEXT)
+    major_dist_learn = Column(Boolean)
+    major_evening = Column(Boolean)
+    major_first_qtr = Column(Integer)
+    major_first_yr = Column(Integer)
+    major_full_name = Column(TEXT)
+    major_gnm = Column(Boolean)
+    major_grad_certif = Column(Boolean)
+    major_graduate = Column(Boolean)
+    major_home_url = Column(TEXT)
+    major_last_qtr = Column(Integer)
+    major_last_yr = Column(Integer)
+    major_measles_ex = Column(Boolean)
+    major_minor = Column(Boolean)
+    major_name = Column(TEXT)
+    major_non_degree = Column(Boolean)
+    major_nonmatric = Column(Boolean)
+    major_not_termin = Column(Boolean)
+    major_osfa_inelig = Column(Boolean)
+    major_pathway = Column(Integer)
+    major_premaj = Column(Boolean)
+    major_premaj_ext = Column(Boolean)
+    major_professional = Column(Boolean)
+    major_short_name = Column(TEXT)
+    major_ss_inelig = Column(Boolean)
+    major_ss_std_act = Column(Boolean)
+    major_ug_certif = Column(Boolean)
+    major_undergrad = Column(Boolean)
+
+
+class Sport(Base):
+    __tablename__ = "sport"
+    id = Column(Integer, primary_key=True)
+    sport_code = Column(TEXT)
+
+
+class Term(Base):
+    __tablename__ = "term"
+    id = Column(Integer, primary_key=True)
+    quarter = Column(Integer)
+    year = Column(Integer)
+
+
+class Transcript(Base):
+    __tablename__ = "transcript"
+    id = Column(Integer, primary_key=True)
+    student_id = Column(ForeignKey("student.id"))
+    tran_term_id = Column(ForeignKey("term.id"))
+    leave_ends_term_id = Column(ForeignKey("term.id"))
+    add_to_cum = Column(Integer)
+    class_code = Column(Integer)
+    enroll_status = Column(Integer)
+    enroll_status_desc = Column(TEXT)
+    enroll_status_request_code = Column(TEXT)
+    exemption_code = Column(Integer)
+    honors_program = Column(Integer)
+    num_courses = Column(Integer)
+    num_ind_study = Column(Integer)
+    over_qtr_deduct = Column(Numeric)
+    over_qtr_grade_at = Column(Numeric)
+    over_qtr_grade_pt = Column(Numeric)
+    over_qtr_nongrd = Column(Numeric)
+    qtr_comment = Column(TEXT)
+    qtr_deductible = Column(Numeric)
+    qtr_grade_points = Column(Numeric)
+    qtr_graded_attmp = Column(Numeric)
+    qtr_nongrd_earned = Column(Numeric)
+    resident = Column(Integer)
+    resident_cat = Column(TEXT)
+    scholarship_abbr = Column(TEXT)
+    scholarship_desc = Column(TEXT)
+    scholarship_type = Column(Integer)
+    special_program = Column(Integer)
+    special_program_desc = Column(TEXT)
+    tenth_day_credits = Column(Numeric)
+    tr_en_stat_dt = Column(DateTime)
+    veteran = Column(Integer)
+    veteran_benefit = Column(Integer)
+    yearly_honor_type = Column(Integer)
+    student = relationship(
+        "Student", back_populates="transcript", viewonly=True)
+    tran_term = relationship(
+        "Term", foreign_keys=[tran_term_id], viewonly=True)
+    leave_ends_term = relationship(
+        "Term", foreign_keys=[leave_ends_term_id], viewonly=True)
+
+
+class Transfer(Base):
+    __tablename__ = "transfer"
+    id = Column(Integer, primary_key=True)
+    student_id = Column(ForeignKey("student.id"))
+    credential_lvl = Column(Integer)
+    credential_yr = Column(Integer)
+    degree_earned = Column(TEXT)
+    degree_earned_mo = Column(Integer)
+    degree_earned_yr = Column(Integer)
+    inst_addr_line_1 = Column(TEXT)
+    inst_addr_line_2 = Column(TEXT)
+    inst_city = Column(TEXT)
+    inst_country = Column(TEXT)
+    inst_postal_cd = Column(TEXT)
+    inst_record_stat = Column(Boolean)
+    inst_state = Column(TEXT)
+    inst_zip_5 = Column(TEXT)
+    inst_zip_filler = Column(TEXT)
+    institution_code = Column(TEXT)
+    institution_name = Column(TEXT)
+    trans_updt_dt = Column(DateTime)
+    trans_updt_id = Column(TEXT)
+    transfer_comment = Column(TEXT)
+    transfer_gpa = Column(Numeric)
+    two_year = Column(Boolean)
+    wa_cc = Column(Boolean)
+    year_beginning = Column(Integer)
+    year_ending = Column(Integer)
+    student = relationship(
+        "Student", back_populates="transfer", viewonly=True)
+
+
+class Hold(Base):
+    __tablename__ = "student_hold"
+    id = Column(Integer, primary_key=True)
+    student_id = Column(ForeignKey("student.id"))
+    hold_dt = Column(DateTime)
+    hold_office = Column(TEXT)
+    hold_office_desc = Column(TEXT)
+    hold_reason = Column(TEXT)
+    hold_type = Column(Integer)
+    hold_type_desc = Column(TEXT)
+    seq = Column(Integer)
+    student = relationship(
+        "Student", back_populates="student_hold", viewonly=True)
+
+
+class Degree(Base):
+    __tablename__ = "degree"
+    id = Column(Integer, primary_key=True)
+    student_id = Column(ForeignKey("student.id"))
+    degree_term_id = Column(ForeignKey("term.id"))
+    campus_code = Column(TEXT)
+    campus_name = Column(TEXT)
+    degree_abbr_code = Column(TEXT)
+    degree_college_code = Column(TEXT)
+    degree_college_name = Column(TEXT)
+    degree_date = Column(Date)
+    degree_desc = Column(TEXT)
+    degree_extension_credits = Column(Numeric)
+    degree_gpa = Column(Numeric)
+    degree_grad_honor = Column(Integer)
+    degree_grad_honor_desc = Column(TEXT)
+    degree_index = Column(Integer)
+    degree_level_code = Column(TEXT)
+    degree_level_desc = Column(TEXT)
+    degree_level_type_desc = Column(TEXT)
+    degree_major_index = Column(Integer)
+    degree_pathway_num = Column(TEXT)
+    degree_status_code = Column(TEXT)
+    degree_status_desc = Column(TEXT)
+    degree_transfer_credits = Column(Numeric)
+    degree_type_code = Column(TEXT)
+    degree_uw_credits = Column(Numeric)
+    student = relationship(
+        "Student", back_populates="degree", viewonly=True)
+    degree_term = relationship(
+        "Term", foreign_keys=[degree_term_id], viewonly=True)
+
+
+# keyed by table name, like the classes of an automap base
+CLASSES = {
+    "person": Person,
+    "student": Student,
+    "employee": Employee,
+    "adviser": Adviser,
+    "major": Major,
+    "sport": Sport,
+    "term": Term,
+    "transcript": Transcript,
+    "transfer": Transfer,
+    "student_hold": Hold,
+    "degree": Degree,
+    "student_to_sport": student_to_sport,
+    "student_to_adviser": student_to_adviser,
+}
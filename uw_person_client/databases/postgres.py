@@ -5,24 +5,42 @@
 from commonconf import settings
 from sqlalchemy import create_engine
 from sqlalchemy.pool import QueuePool
-from uw_person_client.databases import AbstractDatabase
+from uw_person_client.databases import AbstractAsyncDatabase, AbstractDatabase
+from uw_person_client.databases.routing import EngineRouter
 
 
 URL_PATTERN = \
-    "postgresql+psycopg2://{username}:{password}@{host}:{port}/{database}"
+    "{driver}://{username}:{password}@{host}:{port}/{database}"
 
 
 class Postgres(AbstractDatabase):
 
     def create_engine(self):
+        self.engine = self._create_engine(
+            getattr(settings, "UW_PERSON_DB_HOSTNAME"))
+        hostnames = getattr(settings, "UW_PERSON_DB_REPLICA_HOSTNAMES", [])
+        if isinstance(hostnames, str):
+            hostnames = [host.strip() for host in hostnames.split(",")
+                         if host.strip()]
+        if hostnames:
+            self.router = EngineRouter(
+                self.engine,
+                [self._create_engine(host) for host in hostnames],
+                policy=getattr(
+                    settings, "UW_PERSON_DB_ROUTING_POLICY", "round_robin"),
+                retry_interval=getattr(
+                    settings, "UW_PERSON_DB_REPLICA_RETRY_INTERVAL", 30))
+
+    def _create_engine(self, host):
         url = URL_PATTERN.format(
+            driver="postgresql+psycopg2",
             username=getattr(settings, "UW_PERSON_DB_USERNAME"),
             password=getattr(settings, "UW_PERSON_DB_PASSWORD"),
-            host=getattr(settings, "UW_PERSON_DB_HOSTNAME"),
+            host=host,
             port=getattr(settings, "UW_PERSON_DB_PORT"),
             database=getattr(settings, "UW_PERSON_DB_DATABASE")
         )
-        self.engine = create_engine(
+        return create_engine(
             url,
             logging_name="sqlalchemy.engine",
             pool_logging_name="sqlalchemy.pool",
@@ -31,3 +49,26 @@ class Postgres(AbstractDatabase):
             max_overflow=getattr(settings, "UW_PERSON_DB_MAX_OVERFLOW", 5),
             pool_recycle=getattr(settings, "UW_PERSON_DB_POOL_RECYCLE", 600)
         )
+
+
+class AsyncPostgres(AbstractAsyncDatabase):
+
+    def create_engine(self):
+        # requires the asyncpg and greenlet packages
+        from sqlalchemy.ext.asyncio import create_async_engine
+        url = URL_PATTERN.format(
+            driver="postgresql+asyncpg",
+            username=getattr(settings, "UW_PERSON_DB_USERNAME"),
+            password=getattr(settings, "UW_PERSON_DB_PASSWORD"),
+            host=getattr(settings, "UW_PERSON_DB_HOSTNAME"),
+            port=getattr(settings, "UW_PERSON_DB_PORT"),
+            database=getattr(settings, "UW_PERSON_DB_DATABASE")
+        )
+        self.engine = create_async_engine(
+            url,
+            logging_name="sqlalchemy.engine",
+            pool_logging_name="sqlalchemy.pool",
+            pool_size=getattr(settings, "UW_PERSON_DB_POOL_SIZE", 2),
+            max_overflow=getattr(settings, "UW_PERSON_DB_MAX_OVERFLOW", 5),
+            pool_recycle=getattr(settings, "UW_PERSON_DB_POOL_RECYCLE", 600)
+        )
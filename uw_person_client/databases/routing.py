@@ -0,0 +1,90 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+import logging
+from itertools import count
+from threading import Lock
+from time import monotonic
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+
+logger = logging.getLogger(__name__)
+
+
+class EngineRouter():
+    """Chooses a read replica engine for each new session, using the
+    round_robin or least_in_use policy. A replica that cannot be connected
+    to is skipped for retry_interval seconds, and the primary engine is
+    used when no replica is available.
+    """
+    POLICIES = ("round_robin", "least_in_use")
+
+    def __init__(self, primary, replicas, policy="round_robin",
+                 retry_interval=30):
+        if policy not in EngineRouter.POLICIES:
+            raise ValueError(f"Unknown routing policy '{policy}'")
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.policy = policy
+        self.retry_interval = retry_interval
+        self._counter = count()
+        self._down_until = {}
+        self._lock = Lock()
+
+    def get_engine(self):
+        for engine in self._candidates():
+            try:
+                # checks out, and returns, a pooled connection
+                with engine.connect():
+                    pass
+                return engine
+            except DBAPIError as ex:
+                logger.warning(f"Replica {engine.url!r} unavailable: {ex}")
+                with self._lock:
+                    self._down_until[engine] = (
+                        monotonic() + self.retry_interval)
+        return self.primary
+
+    def dispose(self):
+        for engine in self.replicas:
+            engine.dispose()
+
+    def _candidates(self):
+        now = monotonic()
+        with self._lock:
+            replicas = [engine for engine in self.replicas
+                        if self._down_until.get(engine, 0) <= now]
+            if not replicas:
+                return []
+            if self.policy == "least_in_use":
+                return sorted(replicas, key=self._checked_out)
+            start = next(self._counter) % len(replicas)
+            return replicas[start:] + replicas[:start]
+
+    def _checked_out(self, engine):
+        try:
+            return engine.pool.checkedout()
+        except AttributeError:
+            return 0
+
+
+class RoutingSession(Session):
+    """Session bound to the engine its router chooses when the session
+    first needs a connection; the choice is kept until the session closes
+    """
+
+    def __init__(self, router=None, **kwargs):
+        super().__init__(**kwargs)
+        self.router = router
+        self._routed_bind = None
+
+    def get_bind(self, mapper=None, **kwargs):
+        if self._routed_bind is None:
+            self._routed_bind = self.router.get_engine()
+        return self._routed_bind
+
+    def close(self):
+        super().close()
+        self._routed_bind = None
@@ -2,52 +2,87 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
-from uw_person_client.databases.postgres import Postgres
-from sqlalchemy import Table, Column, ForeignKey, TEXT, Integer
+import asyncio
+from commonconf import settings
+from uw_person_client.databases import models
+from uw_person_client.databases.postgres import AsyncPostgres, Postgres
+from sqlalchemy import Table, Column, ForeignKey, TEXT, Integer, text
 from sqlalchemy.ext.automap import automap_base
 from sqlalchemy.orm import relationship
 
 
-class UWPDS(Postgres):
+# Indexes that serve the identifier lookups: btree indexes for the current
+# values and GIN indexes for the array containment (@>, &&) probes of the
+# prior values.
+IDENTIFIER_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS person_uwnetid_idx "
+    "ON person (uwnetid)",
+    "CREATE INDEX IF NOT EXISTS person_uwregid_idx "
+    "ON person (uwregid)",
+    "CREATE INDEX IF NOT EXISTS person_prior_uwnetids_gin_idx "
+    "ON person USING gin (prior_uwnetids)",
+    "CREATE INDEX IF NOT EXISTS person_prior_uwregids_gin_idx "
+    "ON person USING gin (prior_uwregids)",
+)
+
+
+class UWPDSMapping():
+    """Maps the datastore tables with the static models, or with automap
+    reflection of the database schema when reflect_schema is set (or
+    UW_PERSON_DB_REFLECT_SCHEMA is true)
+    """
 
     Base = automap_base()
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # only map the database once
-        if len(UWPDS.Base.classes) == 0:
-            self.initialize_relationships()
+    def use_reflection(self, reflect_schema=None):
+        if reflect_schema is None:
+            reflect_schema = getattr(
+                settings, "UW_PERSON_DB_REFLECT_SCHEMA", False)
+        return bool(reflect_schema)
+
+    def map_classes(self, classes):
         # person classes
-        self.Person = UWPDS.Base.classes.person
+        self.Person = classes["person"]
         # employee classes
-        self.Employee = UWPDS.Base.classes.employee
-        self.Adviser = UWPDS.Base.classes.adviser
+        self.Employee = classes["employee"]
+        self.Adviser = classes["adviser"]
         # student classes
-        self.Student = UWPDS.Base.classes.student
-        self.Major = UWPDS.Base.classes.major
-        self.Sport = UWPDS.Base.classes.sport
-        self.StudentToSport = UWPDS.Base.classes.student_to_sport
-        self.StudentToAdviser = UWPDS.Base.classes.student_to_adviser
-        self.Transcript = UWPDS.Base.classes.transcript
-        self.Transfer = UWPDS.Base.classes.transfer
-        self.Hold = UWPDS.Base.classes.student_hold
-        self.Degree = UWPDS.Base.classes.degree
-        self.Term = UWPDS.Base.classes.term
-
-    def initialize_relationships(self):
+        self.Student = classes["student"]
+        self.Major = classes["major"]
+        self.Sport = classes["sport"]
+        self.StudentToSport = classes["student_to_sport"]
+        self.StudentToAdviser = classes["student_to_adviser"]
+        self.Transcript = classes["transcript"]
+        self.Transfer = classes["transfer"]
+        self.Hold = classes["student_hold"]
+        self.Degree = classes["degree"]
+        self.Term = classes["term"]
+
+    def initialize_relationships(self, bind=None):
+        if bind is None:
+            bind = self.engine
+
         student_to_sport = Table(
             'student_to_sport',
-            UWPDS.Base.metadata,
-            autoload_with=self.engine
+            UWPDSMapping.Base.metadata,
+            autoload_with=bind
         )
 
         student_to_adviser = Table(
             'student_to_adviser',
-            UWPDS.Base.metadata,
-            autoload_with=self.engine
+            UWPDSMapping.Base.metadata,
+            autoload_with=bind
         )
 
-        class Student(UWPDS.Base):
+        class Person(UWPDSMapping.Base):
+            __tablename__ = "person"
+            __table_args__ = {'extend_existing': True}
+            student = relationship(
+                "Student", uselist=False, viewonly=True)
+            employee = relationship(
+                "Employee", uselist=False, viewonly=True)
+
+        class Student(UWPDSMapping.Base):
             __tablename__ = "student"
             __table_args__ = {'extend_existing': True}
             sport = relationship("sport",
@@ -120,14 +155,14 @@ class UWPDS(Postgres):
             academic_term = relationship(
                 "term", foreign_keys=[academic_term_id], viewonly=True)
 
-        class Employee(UWPDS.Base):
+        class Employee(UWPDSMapping.Base):
             __tablename__ = "employee"
             __table_args__ = {'extend_existing': True}
             adviser = relationship(
                 "adviser", back_populates="employee", uselist=False,
                 viewonly=True)
 
-        class Transcript(UWPDS.Base):
+        class Transcript(UWPDSMapping.Base):
             __tablename__ = "transcript"
             __table_args__ = {'extend_existing': True}
             tran_term_id = Column('tran_term_id',
@@ -142,11 +177,11 @@ class UWPDS(Postgres):
                                            foreign_keys=[leave_ends_term_id],
                                            viewonly=True)
 
-        class Major(UWPDS.Base):
+        class Major(UWPDSMapping.Base):
             __tablename__ = "major"
             __table_args__ = {'extend_existing': True}
 
-        class Degree(UWPDS.Base):
+        class Degree(UWPDSMapping.Base):
             __tablename__ = "degree"
             __table_args__ = {'extend_existing': True}
             degree_term_id = Column('degree_term_id',
@@ -155,11 +190,64 @@ class UWPDS(Postgres):
                                        foreign_keys=[degree_term_id],
                                        viewonly=True)
 
-        UWPDS.Base.prepare(self.engine, reflect=True)
-        UWPDS.Base.classes.student = Student
-        UWPDS.Base.classes.employee = Employee
-        UWPDS.Base.classes.transcript = Transcript
-        UWPDS.Base.classes.major = Major
-        UWPDS.Base.classes.degree = Degree
-        UWPDS.Base.classes.student_to_sport = student_to_sport
-        UWPDS.Base.classes.student_to_adviser = student_to_adviser
+        UWPDSMapping.Base.prepare(bind, reflect=True)
+        UWPDSMapping.Base.classes.person = Person
+        UWPDSMapping.Base.classes.student = Student
+        UWPDSMapping.Base.classes.employee = Employee
+        UWPDSMapping.Base.classes.transcript = Transcript
+        UWPDSMapping.Base.classes.major = Major
+        UWPDSMapping.Base.classes.degree = Degree
+        UWPDSMapping.Base.classes.student_to_sport = student_to_sport
+        UWPDSMapping.Base.classes.student_to_adviser = student_to_adviser
+
+
+class UWPDS(UWPDSMapping, Postgres):
+
+    def __init__(self, *args, reflect_schema=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.use_reflection(reflect_schema):
+            # only map the database once
+            if len(UWPDS.Base.classes) == 0:
+                self.initialize_relationships()
+            self.map_classes(UWPDS.Base.classes)
+        else:
+            self.map_classes(models.CLASSES)
+
+    def create_identifier_indexes(self):
+        """Optional, for databases owned by the caller. Creates any missing
+        IDENTIFIER_INDEXES; requires CREATE privilege on the person table.
+        """
+        with self.engine.begin() as connection:
+            for ddl in IDENTIFIER_INDEXES:
+                connection.execute(text(ddl))
+
+
+class AsyncUWPDS(UWPDSMapping, AsyncPostgres):
+    """UWPDS for the async client; with reflect_schema, the mapped classes
+    are available once prepare() has been awaited, which run_sync() does
+    """
+
+    def __init__(self, *args, reflect_schema=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reflect_schema = self.use_reflection(reflect_schema)
+        # created by prepare(), within the event loop that runs it
+        self._prepare_lock = None
+        if not self.reflect_schema:
+            self.map_classes(models.CLASSES)
+
+    async def prepare(self):
+        if not self.reflect_schema:
+            return
+        if len(AsyncUWPDS.Base.classes) == 0:
+            if self._prepare_lock is None:
+                self._prepare_lock = asyncio.Lock()
+            async with self._prepare_lock:
+                if len(AsyncUWPDS.Base.classes) == 0:
+                    async with self.engine.connect() as connection:
+                        await connection.run_sync(
+                            self.initialize_relationships)
+        self.map_classes(AsyncUWPDS.Base.classes)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        await self.prepare()
+        return await super().run_sync(fn, *args, **kwargs)
@@ -8,3 +8,7 @@ class PersonNotFoundException(Exception):
 
 class AdviserNotFoundException(Exception):
     pass
+
+
+class InvalidPageTokenException(Exception):
+    pass
@@ -0,0 +1,211 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from time import monotonic
+from uw_person_client.components import (
+    Adviser, Employee, Person, Student, Term, json_default)
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("ndjson", "json", "csv")
+# export name to the client method that streams it
+EXPORTS = {
+    "persons": "iter_persons",
+    "registered-students": "iter_registered_students",
+    "active-students": "iter_active_students",
+    "active-employees": "iter_active_employees",
+    "advisers": "iter_advisers",
+}
+# component fields that hold a single nested component, which flatten()
+# expands into dotted columns
+NESTED_COMPONENTS = {
+    (Person, "student"): Student,
+    (Person, "employee"): Employee,
+    (Employee, "adviser"): Adviser,
+    (Student, "academic_term"): Term,
+}
+
+
+def flatten(data, prefix=""):
+    """Flatten nested component dicts into dotted keys, such as
+    "student.student_number" and "employee.adviser.advising_program".
+    Lists are kept whole.
+    """
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def csv_columns(fields=None, component=Person, prefix=""):
+    """Return the flattened columns of a component and the components
+    nested in it, in the order of their declared FIELDS. With fields,
+    such as ["uwnetid", "student.majors", "employee"], only the columns
+    of those fields.
+    """
+    columns = []
+    for name in component.FIELDS:
+        nested = NESTED_COMPONENTS.get((component, name))
+        if nested is not None:
+            columns.extend(csv_columns(component=nested,
+                                       prefix=f"{prefix}{name}."))
+        else:
+            columns.append(f"{prefix}{name}")
+    if fields is not None:
+        columns = [column for column in columns if any(
+            column == field or column.startswith(f"{field}.")
+            for field in fields)]
+    return columns
+
+
+def iter_json(persons):
+    """Yield a JSON array of persons one person at a time, such as for a
+    streaming response, without encoding the whole array at once. The
+    chunks are those that export_persons() writes as "json".
+    """
+    yield "["
+    separator = ""
+    for person in persons:
+        yield separator + person.to_json(compact=True)
+        separator = ",\n"
+    yield "]\n"
+
+
+class ExportStats():
+
+    def __init__(self):
+        self.count = 0
+        self.started = monotonic()
+        self.seconds = 0
+
+    @property
+    def rate(self):
+        """Persons exported per second"""
+        return self.count / self.seconds if self.seconds else 0.0
+
+    def to_dict(self):
+        return {"count": self.count,
+                "seconds": self.seconds,
+                "rate": self.rate}
+
+
+def export_persons(persons, fileobj, format="ndjson", columns=None,
+                   progress=None, progress_interval=1000):
+    """Write persons to fileobj one at a time as NDJSON, one nested
+    object per line, as a JSON array, or as CSV with flattened columns.
+    CSV columns are those given, or else all of csv_columns(), so that
+    every declared field has a column whichever persons come first.
+    Attributes that are not declared fields are left out.
+    progress(stats) is called every progress_interval persons. Returns
+    the ExportStats of the export.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format '{format}'")
+
+    stats = ExportStats()
+    persons = _counted(persons, stats, progress, progress_interval)
+    if format == "json":
+        fileobj.writelines(iter_json(persons))
+    else:
+        if format == "csv":
+            records = (flatten(person.to_dict()) for person in persons)
+            write = _csv_writer(fileobj, columns)
+        else:
+            records = (person.to_json(compact=True) for person in persons)
+            write = _ndjson_writer(fileobj)
+        for record in records:
+            write(record)
+
+    stats.seconds = monotonic() - stats.started
+    if progress is not None and stats.count % progress_interval:
+        progress(stats)
+    return stats
+
+
+def _counted(persons, stats, progress, progress_interval):
+    # counts each person once the next one is requested, which is after
+    # it has been written
+    for person in persons:
+        yield person
+        stats.count += 1
+        if progress is not None and stats.count % progress_interval == 0:
+            stats.seconds = monotonic() - stats.started
+            progress(stats)
+
+
+def _ndjson_writer(fileobj):
+
+    def write(record):
+        fileobj.write(record)
+        fileobj.write("\n")
+    return write
+
+
+def _csv_writer(fileobj, columns=None):
+    writer = csv.DictWriter(
+        fileobj, csv_columns() if columns is None else columns,
+        extrasaction="ignore")
+    writer.writeheader()
+    encoder = json.JSONEncoder(separators=(",", ":"), default=json_default)
+
+    def write(record):
+        for key, value in record.items():
+            if isinstance(value, list):
+                record[key] = encoder.encode(value)
+        writer.writerow(record)
+    return write
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export persons from the UW person datastore")
+    parser.add_argument("export", choices=EXPORTS)
+    parser.add_argument("-o", "--output",
+                        help="output file, standard output by default")
+    parser.add_argument("-f", "--format", choices=FORMATS,
+                        help="defaults to csv or json for .csv or .json "
+                        "output, else ndjson")
+    parser.add_argument("--field", action="append", dest="fields",
+                        help="export only this field, may be repeated")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--progress-interval", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    extension = os.path.splitext(args.output or "")[1][1:]
+    export_format = args.format or (
+        extension if extension in ("csv", "json") else "ndjson")
+    kwargs = {"batch_size": args.batch_size}
+    if args.fields:
+        kwargs["fields"] = args.fields
+
+    from uw_person_client import UWPersonClient
+    persons = getattr(UWPersonClient(), EXPORTS[args.export])(**kwargs)
+
+    def progress(stats):
+        logger.info("%d persons exported (%.0f/s)", stats.count, stats.rate)
+
+    fileobj = open(args.output, "w", newline="") if (
+        args.output) else sys.stdout
+    try:
+        stats = export_persons(persons, fileobj, export_format,
+                               columns=csv_columns(args.fields) if (
+                                   args.fields) else None,
+                               progress=progress,
+                               progress_interval=args.progress_interval)
+    finally:
+        if fileobj is not sys.stdout:
+            fileobj.close()
+    logger.info("Exported %d persons in %.1fs (%.0f/s)",
+                stats.count, stats.seconds, stats.rate)
+    return 0
@@ -0,0 +1,244 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from uw_person_client.components import person_changed, person_keys
+
+logger = logging.getLogger(__name__)
+
+# records are pickled components, so a change to their state, or to the
+# sections of the file, changes the version
+MAGIC = b"UWPSNAP3"
+HEADER = struct.Struct("<8sQ")
+OFFSET = struct.Struct("<Q")
+RECORD = struct.Struct("<I")
+# identifiers that snapshot records are indexed by
+INDEXES = ("uwnetid", "uwregid", "prior_uwnetid", "prior_uwregid",
+           "student_number", "system_key", "adviser_uwnetid",
+           "adviser_uwregid")
+POPULATIONS = ("registered_students", "active_students",
+               "active_employees", "advisers")
+
+
+def build_snapshot(persons, path):
+    """Write fully loaded persons to a snapshot file at path. The file
+    holds one pickled person per record, sorted fixed-width indexes of
+    identifier to record number, the record numbers of each population,
+    and a sorted index of student change time to record number, the
+    latest of which is the watermark of the snapshot. It is written
+    beside path and moved into place, so that readers of a previous
+    snapshot are unaffected. Returns the number of persons written.
+    """
+    indexes = {name: [] for name in INDEXES}
+    populations = {name: [] for name in POPULATIONS}
+    offsets, changes = [], []
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as snapshot:
+        snapshot.write(HEADER.pack(MAGIC, 0))
+        for record, person in enumerate(persons):
+            offsets.append(snapshot.tell())
+            snapshot.write(pickle.dumps(person, pickle.HIGHEST_PROTOCOL))
+            for name, key in person_keys(person, priors=True,
+                                         advisers=True):
+                indexes[name].append((key.encode(), record))
+            for name in person_populations(person):
+                populations[name].append(record)
+            changed = person_changed(person)
+            if changed is not None:
+                changes.append((_change_key(changed), record))
+        offsets.append(snapshot.tell())
+        changes.sort()
+
+        sections = {"offsets": _write_array(snapshot, OFFSET, offsets)}
+        for name, entries in indexes.items():
+            sections[name] = _write_index(snapshot, sorted(entries))
+        for name, records in populations.items():
+            sections[name] = _write_array(snapshot, RECORD, records)
+        sections["changes"] = _write_index(snapshot, changes)
+
+        toc_offset = snapshot.tell()
+        snapshot.write(json.dumps({
+            "count": len(offsets) - 1,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "watermark": changes[-1][0].decode() if changes else None,
+            "sections": sections,
+        }).encode())
+        snapshot.seek(0)
+        snapshot.write(HEADER.pack(MAGIC, toc_offset))
+    os.replace(temp_path, path)
+    return len(offsets) - 1
+
+
+def person_populations(person):
+    """Yield the names of the populations that a fully loaded person is
+    in, as the client queries them
+    """
+    student = getattr(person, "student", None)
+    employee = getattr(person, "employee", None)
+    if getattr(student, "enroll_status_code", None) == "12":
+        yield "registered_students"
+    if getattr(person, "active_student", False):
+        yield "active_students"
+    if getattr(person, "active_employee", False):
+        yield "active_employees"
+    if getattr(employee, "adviser", None) is not None:
+        yield "advisers"
+
+
+def _change_key(changed):
+    # a fixed format, so that the keys of the index sort by time
+    return changed.isoformat(timespec="microseconds").encode()
+
+
+def _write_array(snapshot, item, values):
+    offset = snapshot.tell()
+    for value in values:
+        snapshot.write(item.pack(value))
+    return {"offset": offset, "count": len(values)}
+
+
+def _write_index(snapshot, entries):
+    offset = snapshot.tell()
+    width = max((len(key) for key, record in entries), default=0)
+    for key, record in entries:
+        snapshot.write(key.ljust(width, b"\0"))
+        snapshot.write(RECORD.pack(record))
+    return {"offset": offset, "count": len(entries), "width": width}
+
+
+class Snapshot():
+    """Read-only, memory-mapped view of a snapshot file. Opening one
+    reads only the header and table of contents, and the pages of the
+    file are shared by every process that maps it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as snapshot:
+            self._buffer = mmap.mmap(
+                snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, toc_offset = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a person snapshot")
+        toc = json.loads(self._buffer[toc_offset:])
+        self.count = toc["count"]
+        self.created = toc["created"]
+        self.watermark = None
+        if toc["watermark"] is not None:
+            self.watermark = datetime.fromisoformat(toc["watermark"])
+        self._offsets = toc["sections"]["offsets"]["offset"]
+        self.indexes = {name: SnapshotIndex(self._buffer, **section)
+                        for name, section in toc["sections"].items()
+                        if name in INDEXES}
+        self._populations = {name: toc["sections"][name]
+                             for name in POPULATIONS}
+        self._changes = SnapshotIndex(
+            self._buffer, **toc["sections"]["changes"])
+
+    def close(self):
+        self._buffer.close()
+
+    def get(self, record):
+        """Return a new person object for a record number"""
+        start, end = struct.unpack_from(
+            "<2Q", self._buffer, self._offsets + record * OFFSET.size)
+        return pickle.loads(self._buffer[start:end])
+
+    def find(self, index, key):
+        """Return the record numbers whose index key is key"""
+        return self.indexes[index].find(key)
+
+    def population(self, name=None):
+        """Return the record numbers of a population, or of every person
+        """
+        if name is None:
+            return range(self.count)
+        section = self._populations[name]
+        return [value for value, in RECORD.iter_unpack(self._buffer[
+            section["offset"]:
+            section["offset"] + section["count"] * RECORD.size])]
+
+    def changes(self, since=None, until=None):
+        """Return the record numbers of the persons whose student record
+        changed after since and no later than until, in change order
+        """
+        start, end = 0, len(self._changes)
+        if since is not None:
+            start = bisect_right(self._changes, _change_key(since))
+        if until is not None:
+            end = bisect_right(self._changes, _change_key(until))
+        return [self._changes.record(position)
+                for position in range(start, end)]
+
+
+class SnapshotIndex():
+    """Sorted, fixed-width (key, record number) entries of a snapshot,
+    searched in place by bisection
+    """
+
+    def __init__(self, buffer, offset, count, width):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+        self._width = width
+        self._size = width + RECORD.size
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        start = self._offset + position * self._size
+        return self._buffer[start:start + self._width].rstrip(b"\0")
+
+    def record(self, position):
+        """Return the record number of the entry at position"""
+        record, = RECORD.unpack_from(
+            self._buffer, self._offset + position * self._size + self._width)
+        return record
+
+    def find(self, key):
+        key = key.encode()
+        records = []
+        if len(key) > self._width:
+            return records
+        position = bisect_left(self, key)
+        while position < self._count and self[position] == key:
+            records.append(self.record(position))
+            position += 1
+        return records
+
+    def keys(self):
+        """Yield each distinct key with its record numbers, in key order
+        """
+        position = 0
+        while position < self._count:
+            key = self[position]
+            records = self.find(key.decode())
+            yield key.decode(), records
+            position += len(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Write a snapshot of the UW person datastore")
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from uw_person_client import UWPersonClient
+    count = build_snapshot(
+        UWPersonClient().iter_persons(batch_size=args.batch_size),
+        args.path)
+    logger.info("Wrote %d persons to %s", count, args.path)
+    return 0
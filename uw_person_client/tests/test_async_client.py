@@ -0,0 +1,224 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+import asyncio
+from importlib.util import find_spec
+from threading import Thread
+from unittest import IsolatedAsyncioTestCase, TestCase, skipUnless
+from unittest.mock import patch, AsyncMock, MagicMock
+from sqlalchemy import insert
+from uw_person_client.clients.async_client import AsyncUWPersonClient
+from uw_person_client.clients.mock_client import AsyncMockedUWPersonClient
+from uw_person_client.components import Major, Term
+from uw_person_client.databases import AbstractAsyncDatabase
+from uw_person_client.exceptions import PersonNotFoundException
+from uw_person_client.tests.test_core_client import (
+    SQLiteBase, SQLitePerson, SQLiteStudent)
+
+
+class AsyncSQLiteDatabase(AbstractAsyncDatabase):
+    Person = SQLitePerson
+    Student = SQLiteStudent
+
+    def create_engine(self):
+        from sqlalchemy.ext.asyncio import create_async_engine
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+
+    async def create_all(self, count):
+        async with self.engine.begin() as connection:
+            await connection.run_sync(SQLiteBase.metadata.create_all)
+            await connection.execute(insert(SQLitePerson), [
+                {"id": i, "uwnetid": f"netid{i}"}
+                for i in range(1, count + 1)])
+
+
+class AsyncUWPersonClientTest(IsolatedAsyncioTestCase):
+
+    @patch('uw_person_client.clients.async_client.AsyncUWPDS')
+    def get_mock_person_client(self, mock_uwpds):
+        client = AsyncUWPersonClient()
+        client.DB.run_sync = AsyncMock(
+            side_effect=lambda fn, *args, **kwargs: fn(*args, **kwargs))
+        client.client = MagicMock()
+        return client
+
+    async def test_get_person_by_uwnetid(self):
+        client = self.get_mock_person_client()
+        person = await client.get_person_by_uwnetid(
+            'javerage', include_student=False)
+        self.assertEqual(
+            person, client.client.get_person_by_uwnetid.return_value)
+        client.DB.run_sync.assert_awaited_once_with(
+            client.client.get_person_by_uwnetid, 'javerage',
+            include_student=False)
+
+    async def test_get_advisers(self):
+        client = self.get_mock_person_client()
+        await client.get_advisers(advising_program='program')
+        client.client.get_advisers.assert_called_once_with(
+            advising_program='program')
+
+    async def test_get_columns(self):
+        client = self.get_mock_person_client()
+        columns = await client.get_columns("active_students")
+        self.assertEqual(columns, client.client.get_columns.return_value)
+        client.client.get_columns.assert_called_once_with(
+            "active_students", None, advising_program=None, arrow=False)
+
+    async def test_get_persons_updated_since(self):
+        client = self.get_mock_person_client()
+        client.client.get_update_watermark.return_value = "watermark"
+        client.client.get_persons_updated_since_page.side_effect = [
+            (["person1", "person2"], "token"), (["person3"], None)]
+        watermark, persons = await client.get_persons_updated_since(
+            "since", batch_size=2, fields=["uwnetid"])
+        self.assertEqual(watermark, "watermark")
+        self.assertEqual(client.DB.run_sync.await_count, 1)
+        self.assertEqual([person async for person in persons],
+                         ["person1", "person2", "person3"])
+        # each page is fetched by its own call
+        self.assertEqual(client.DB.run_sync.await_count, 3)
+        client.client.get_persons_updated_since_page.assert_called_with(
+            2, "token", since="since", watermark="watermark",
+            fields=["uwnetid"])
+
+        client.client.get_update_watermark.return_value = None
+        client.client.get_persons_updated_since_page.side_effect = [
+            ([], None)]
+        watermark, persons = await client.get_persons_updated_since("since")
+        self.assertEqual(watermark, "since")
+        self.assertEqual([person async for person in persons], [])
+
+    async def test_get_person_keys(self):
+        client = self.get_mock_person_client()
+        client.client.get_person_keys.return_value = {"REGID"}
+        self.assertEqual(await client.get_person_keys(
+            "advisers", advising_program="program"), {"REGID"})
+        client.client.get_person_keys.assert_called_once_with(
+            "advisers", advising_program="program")
+
+    async def test_iter_active_students(self):
+        client = self.get_mock_person_client()
+        client.client.get_active_students_page.side_effect = [
+            (['person1', 'person2'], 'token'), (['person3'], None)]
+
+        persons = [person async for person in client.iter_active_students(
+            batch_size=2, include_employee=False)]
+        self.assertEqual(persons, ['person1', 'person2', 'person3'])
+        client.client.get_active_students_page.assert_any_call(
+            2, None, include_employee=False)
+        client.client.get_active_students_page.assert_any_call(
+            2, 'token', include_employee=False)
+
+    async def test_iter_advisers(self):
+        client = self.get_mock_person_client()
+        client.client.get_advisers_page.return_value = (['adviser'], None)
+
+        persons = [person async for person in client.iter_advisers(
+            advising_program='program')]
+        self.assertEqual(persons, ['adviser'])
+        client.client.get_advisers_page.assert_called_once_with(
+            client.stream_batch_size, None, advising_program='program')
+
+
+@skipUnless(find_spec("aiosqlite") and find_spec("greenlet"),
+            "requires aiosqlite and greenlet")
+class AsyncUWPersonClientSessionTest(IsolatedAsyncioTestCase):
+
+    async def test_run_sync(self):
+        client = AsyncUWPersonClient(db=AsyncSQLiteDatabase())
+        await client.DB.create_all(20)
+        try:
+            pages = await asyncio.gather(*[client.get_persons(
+                page=page, page_size=10, fields="uwnetid")
+                for page in (1, 2)])
+            self.assertEqual([persons[0].uwnetid for persons in pages],
+                             ["netid1", "netid11"])
+            persons = await client.get_persons_page(5, fields="uwnetid")
+            self.assertEqual(len(persons[0]), 5)
+            # the session is only set within run_sync()
+            self.assertRaises(RuntimeError, getattr, client.DB, "session")
+        finally:
+            await client.close()
+
+
+class AsyncReferenceDataTest(TestCase):
+
+    def test_gather(self):
+        client = AsyncUWPersonClient(db=MagicMock())
+        client.client._map_term = lambda sqla_term: Term().from_dict(
+            {"year": 2024, "quarter": sqla_term.id})
+        client.client._map_major = lambda sqla_major: Major().from_dict(
+            {"major_abbr_code": f"MAJOR{sqla_major.id}"})
+        nested = []
+
+        def query(entity):
+            # run_sync() switches to the other calls on the loop's thread
+            # while the sync mappers wait for the database
+            if not nested:
+                nested.append(None)
+                nested.append((client.client._get_term(2),
+                               client.client._get_major(1)))
+            return [MagicMock(id=1), MagicMock(id=2)]
+        client.DB.session.query.side_effect = query
+
+        async def run_sync(fn, *args, **kwargs):
+            await asyncio.sleep(0)
+            return fn(*args, **kwargs)
+        client.DB.run_sync = run_sync
+
+        async def gather():
+            return await asyncio.gather(
+                client._call(client.client._get_term, 1),
+                client._call(client.client._get_major, 2),
+                client._call(client.client._get_term, 2))
+
+        results = []
+        thread = Thread(target=lambda: results.extend(asyncio.run(gather())),
+                        daemon=True)
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive(), "reference data deadlocked")
+        self.assertEqual([results[0].quarter, results[2].quarter], [1, 2])
+        self.assertEqual(results[1].major_abbr_code, "MAJOR2")
+        self.assertEqual(nested[1][0].quarter, 2)
+        self.assertEqual(nested[1][1].major_abbr_code, "MAJOR1")
+
+
+class AsyncMockedUWPersonClientTest(IsolatedAsyncioTestCase):
+
+    async def test_get_person_by_uwnetid(self):
+        client = AsyncMockedUWPersonClient()
+        person = await client.get_person_by_uwnetid("javerage")
+        self.assertEqual(person.uwnetid, "javerage")
+        with self.assertRaises(PersonNotFoundException):
+            await client.get_person_by_uwnetid("nobody")
+
+    async def test_get_persons_by_uwnetids(self):
+        client = AsyncMockedUWPersonClient()
+        persons = await client.get_persons_by_uwnetids(["javerage", "foo"])
+        self.assertEqual(persons["javerage"].uwnetid, "javerage")
+        self.assertIsNone(persons["foo"])
+
+    async def test_iter(self):
+        client = AsyncMockedUWPersonClient()
+        persons = [person async for person in client.iter_persons(
+            batch_size=1)]
+        self.assertEqual(len(persons), len(await client.get_persons()))
+        advisers = [person async for person in client.iter_advisers()]
+        self.assertEqual(len(advisers), 1)
+        caseloads = await client.get_adviser_caseloads(uwnetids=["jadviser"])
+        self.assertEqual(len(caseloads["jadviser"]), 2)
+
+    async def test_changes(self):
+        client = AsyncMockedUWPersonClient()
+        watermark, persons = await client.get_persons_updated_since(
+            batch_size=1)
+        expected_watermark, expected = \
+            client.client.get_persons_updated_since()
+        self.assertEqual(watermark, expected_watermark)
+        self.assertEqual([person.uwnetid async for person in persons],
+                         [person.uwnetid for person in expected])
+        self.assertIn("9136CCB8F66711D5BE060004AC494FFE",
+                      await client.get_person_keys("active_students"))
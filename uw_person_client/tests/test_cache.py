@@ -0,0 +1,162 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from uw_person_client.cache import (
+    NotFoundCache, PersonCache, ReferenceDataCache)
+from uw_person_client.components import Person
+
+
+class ReferenceDataCacheTest(TestCase):
+
+    def test_get(self):
+        cache = ReferenceDataCache()
+        load_all = MagicMock(return_value={1: "one", 2: "two"})
+        load_one = MagicMock(return_value="three")
+
+        self.assertEqual(cache.get("term", 1, load_all, load_one), "one")
+        self.assertEqual(cache.get("term", 2, load_all, load_one), "two")
+        load_all.assert_called_once()
+        self.assertEqual(cache.get("term", 3, load_all, load_one), "three")
+        self.assertEqual(cache.get("term", 3, load_all, load_one), "three")
+        load_one.assert_called_once_with(3)
+        self.assertIsNone(cache.get("term", 4, load_all))
+
+    @patch('uw_person_client.cache.monotonic')
+    def test_ttl(self, mock_monotonic):
+        cache = ReferenceDataCache(ttl=60)
+        load_all = MagicMock(return_value={1: "one"})
+
+        mock_monotonic.return_value = 100
+        cache.get("major", 1, load_all)
+        mock_monotonic.return_value = 160
+        cache.get("major", 1, load_all)
+        self.assertEqual(load_all.call_count, 1)
+        mock_monotonic.return_value = 161
+        cache.get("major", 1, load_all)
+        self.assertEqual(load_all.call_count, 2)
+
+    def test_clear(self):
+        cache = ReferenceDataCache()
+        load_all = MagicMock(return_value={1: "one"})
+        cache.get("term", 1, load_all)
+        cache.get("major", 1, load_all)
+        cache.clear("term")
+        cache.get("major", 1, load_all)
+        self.assertEqual(load_all.call_count, 2)
+        cache.get("term", 1, load_all)
+        self.assertEqual(load_all.call_count, 3)
+        cache.clear()
+        cache.get("major", 1, load_all)
+        self.assertEqual(load_all.call_count, 4)
+
+
+class PersonCacheTest(TestCase):
+
+    def get_person(self, uwnetid):
+        return Person().from_dict({
+            "uwnetid": uwnetid, "uwregid": f"{uwnetid}-regid",
+            "system_key": f"{uwnetid}-key",
+            "student": {"student_number": f"{uwnetid}-number"}})
+
+    def test_aliases(self):
+        cache = PersonCache()
+        person = self.get_person("javerage")
+        cache.set(person, "uwnetid", "oldnetid", options=(("a", 1),))
+
+        for identifier, value in [
+                ("uwnetid", "oldnetid"), ("uwnetid", "javerage"),
+                ("uwregid", "javerage-regid"),
+                ("system_key", "javerage-key"),
+                ("student_number", "javerage-number")]:
+            self.assertIs(
+                cache.get(identifier, value, options=(("a", 1),)), person)
+        self.assertIsNone(cache.get("uwnetid", "javerage"))
+        self.assertEqual(cache.stats()["hits"], 5)
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(cache.stats()["size"], 1)
+
+    def test_lru(self):
+        cache = PersonCache(maxsize=2)
+        cache.set(self.get_person("one"), "uwnetid", "one")
+        cache.set(self.get_person("two"), "uwnetid", "two")
+        cache.get("uwnetid", "one")
+        cache.set(self.get_person("three"), "uwnetid", "three")
+
+        self.assertIsNone(cache.get("uwregid", "two-regid"))
+        self.assertIsNotNone(cache.get("uwregid", "one-regid"))
+        self.assertIsNotNone(cache.get("uwnetid", "three"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(cache.stats()["size"], 2)
+
+    @patch('uw_person_client.cache.monotonic')
+    def test_ttl(self, mock_monotonic):
+        cache = PersonCache(ttl=60)
+        mock_monotonic.return_value = 100
+        cache.set(self.get_person("one"), "uwnetid", "one")
+        mock_monotonic.return_value = 160
+        self.assertIsNotNone(cache.get("uwnetid", "one"))
+        mock_monotonic.return_value = 161
+        self.assertIsNone(cache.get("uwnetid", "one"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_validate(self):
+        cache = PersonCache()
+        person = self.get_person("one")
+        cache.set(person, "uwnetid", "one", version=1)
+
+        validate = MagicMock(return_value=True)
+        self.assertIs(cache.get("uwnetid", "one", validate=validate), person)
+        validate.return_value = False
+        self.assertIsNone(cache.get("uwnetid", "one", validate=validate))
+        self.assertIsNone(cache.get("uwregid", "one-regid"))
+        self.assertEqual(validate.call_count, 2)
+
+    def test_replace(self):
+        cache = PersonCache()
+        cache.set(self.get_person("one"), "uwnetid", "one")
+        person = self.get_person("one")
+        cache.set(person, "uwregid", "one-regid")
+        self.assertIs(cache.get("uwnetid", "one"), person)
+        self.assertEqual(cache.stats()["size"], 1)
+        cache.clear()
+        self.assertIsNone(cache.get("uwnetid", "one"))
+
+
+class NotFoundCacheTest(TestCase):
+
+    @patch('uw_person_client.cache.monotonic')
+    def test_get(self, mock_monotonic):
+        cache = NotFoundCache(ttl=60)
+        mock_monotonic.return_value = 100
+        self.assertFalse(cache.get("uwnetid", "bad"))
+        cache.add("uwnetid", "bad")
+        self.assertTrue(cache.get("uwnetid", "bad"))
+        self.assertFalse(cache.get("uwregid", "bad"))
+        mock_monotonic.return_value = 160
+        self.assertTrue(cache.get("uwnetid", "bad"))
+        mock_monotonic.return_value = 161
+        self.assertFalse(cache.get("uwnetid", "bad"))
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_maxsize(self):
+        cache = NotFoundCache(maxsize=2)
+        cache.add("uwnetid", "one")
+        cache.add("uwnetid", "two")
+        cache.add("uwnetid", "one")
+        cache.add("uwnetid", "three")
+        self.assertTrue(cache.get("uwnetid", "one"))
+        self.assertFalse(cache.get("uwnetid", "two"))
+        self.assertTrue(cache.get("uwnetid", "three"))
+        cache.discard("uwnetid", "one")
+        self.assertFalse(cache.get("uwnetid", "one"))
+        cache.add("uwregid", "REGID")
+        cache.discard_person(Person().from_dict(
+            {"uwnetid": "three", "uwregid": "REGID"}))
+        self.assertFalse(cache.get("uwnetid", "three"))
+        self.assertFalse(cache.get("uwregid", "REGID"))
+        cache.clear()
+        self.assertEqual(cache.stats()["size"], 0)
@@ -2,8 +2,14 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
+import json
+import pickle
+from copy import deepcopy
+from datetime import date, datetime
+from decimal import Decimal
 from unittest import TestCase
-from uw_person_client.components import AbstractBase, Term
+from uw_person_client.components import (
+    AbstractBase, Person, Sport, Student, Term, json_default)
 
 
 class AbstractBaseTest(TestCase):
@@ -18,6 +24,86 @@ class AbstractBaseTest(TestCase):
         with self.assertRaises(AttributeError):
             ab.foobar
 
+    def test_fields(self):
+        student = Student()
+        student.system_key = "000083856"
+        student.student_number = "1033334"
+        self.assertEqual(vars(student), {})
+        self.assertEqual(student.attrs(), {"system_key": "000083856",
+                                           "student_number": "1033334"})
+        self.assertFalse(hasattr(student, "gender"))
+        with self.assertRaisesRegex(
+                AttributeError,
+                "Attribute 'gender' does not exist for 'Student' instance."):
+            student.gender
+
+        del student.system_key
+        self.assertFalse(hasattr(student, "system_key"))
+        with self.assertRaises(AttributeError):
+            del student.system_key
+
+    def test_extra_attributes(self):
+        sport = Sport().from_dict({"sport_code": 9, "sport_name": "Rowing"})
+        self.assertEqual(vars(sport), {"sport_name": "Rowing"})
+        self.assertEqual(sport.to_dict(), {"sport_code": 9,
+                                           "sport_name": "Rowing"})
+
+    def test_to_dict(self):
+        data = {"uwnetid": "javerage",
+                "student": {"student_number": "1033334",
+                            "sports": [{"sport_code": 9}],
+                            "prior_names": ["A", "B"]},
+                "employee": {"adviser": {"advising_program": "OMAD"}}}
+        person = Person().from_dict(data)
+        self.assertEqual(person.to_dict(), data)
+        self.assertEqual(list(person.to_dict()), [
+            "uwnetid", "student", "employee"])
+
+    def test_to_json(self):
+        person = Person().from_dict({
+            "uwnetid": "javerage",
+            "student": {"birthdate": date(2000, 1, 2),
+                        "record_load_dttm": datetime(2022, 7, 6, 4, 0, 9),
+                        "cumulative_gpa": Decimal("3.25"),
+                        "sports": [{"sport_code": 9}]}})
+        data = {"uwnetid": "javerage",
+                "student": {"birthdate": "2000-01-02",
+                            "record_load_dttm": "2022-07-06T04:00:09",
+                            "cumulative_gpa": 3.25,
+                            "sports": [{"sport_code": 9}]}}
+        self.assertEqual(json.loads(person.to_json()), data)
+        self.assertEqual(json.loads(person.to_json(compact=True)), data)
+        self.assertIn('\n  "student": {\n', person.to_json())
+        self.assertTrue(person.to_json(compact=True).startswith(
+            '{"uwnetid":"javerage","student":{"birthdate":"2000-01-02",'))
+
+    def test_json_default(self):
+        self.assertEqual(json_default(date(2000, 1, 2)), "2000-01-02")
+        self.assertEqual(json_default(Decimal("0.5")), 0.5)
+        self.assertEqual(json_default(Person), str(Person))
+
+    def test_pickle(self):
+        person = Person().from_dict({
+            "uwnetid": "javerage",
+            "student": {"student_number": "1033334",
+                        "sports": [{"sport_code": 9}],
+                        "extra": True}})
+        for copied in (pickle.loads(pickle.dumps(person)),
+                       deepcopy(person)):
+            self.assertEqual(copied.to_dict(), person.to_dict())
+            self.assertIsInstance(copied.student.sports[0], Sport)
+            self.assertFalse(hasattr(copied, "employee"))
+            self.assertEqual(vars(copied.student), {"extra": True})
+
+    def test_compact(self):
+        # fields are kept in slots rather than a per-object dict
+        student = Student()
+        for name in Student.FIELDS:
+            setattr(student, name, None)
+        self.assertEqual(vars(student), {})
+        self.assertEqual(len(student.attrs()), len(Student.FIELDS))
+        self.assertEqual(len(set(Student.FIELDS)), len(Student.FIELDS))
+
 
 class TermTest(TestCase):
     def test_quarter_name(self):
@@ -31,3 +117,9 @@ class TermTest(TestCase):
         self.assertEqual(term.quarter_name, "Winter")
         term.quarter = 4
         self.assertEqual(term.quarter_name, "Autumn")
+
+    def test_from_dict(self):
+        data = {"year": 2013, "quarter": 4, "quarter_name": "Autumn"}
+        term = Term().from_dict(data)
+        self.assertEqual(term.quarter_name, "Autumn")
+        self.assertEqual(term.to_dict(), data)
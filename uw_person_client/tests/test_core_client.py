@@ -2,15 +2,189 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
+import os
+import pickle
+import tracemalloc
+from contextlib import nullcontext
+from copy import deepcopy
+from datetime import datetime
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest.mock import patch, MagicMock
 from uw_person_client.exceptions import (
-    AdviserNotFoundException, PersonNotFoundException)
-from uw_person_client.clients.core_client import UWPersonClient
+    AdviserNotFoundException, InvalidPageTokenException,
+    PersonNotFoundException)
+from uw_person_client.cache import NotFoundCache, PersonCache
+from uw_person_client.clients.core_client import (
+    STUDENT_RELATIONS, UWPersonClient)
 from uw_person_client.components import (
     Adviser, Employee, Major, Person, Sport, Student, Term, Transcript,
     Transfer, Hold, Degree)
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Integer, TEXT, Table, create_engine,
+    event, select)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query, Session, declarative_base, relationship
 from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.pool import QueuePool
+from uw_person_client.databases import AbstractDatabase, models
+
+
+Base = declarative_base()
+
+
+class SQLPerson(Base):
+    __tablename__ = "person"
+    id = Column(Integer, primary_key=True)
+    uwnetid = Column(TEXT)
+    uwregid = Column(TEXT)
+    prior_uwnetids = Column(postgresql.ARRAY(TEXT))
+    prior_uwregids = Column(postgresql.ARRAY(TEXT))
+
+
+SQLiteBase = declarative_base()
+
+
+class SQLitePerson(SQLiteBase):
+    __tablename__ = "person"
+    id = Column(Integer, primary_key=True)
+    uwnetid = Column(TEXT)
+    uwregid = Column(TEXT)
+    student = relationship("SQLiteStudent", uselist=False, viewonly=True)
+    employee = relationship("SQLiteEmployee", uselist=False, viewonly=True)
+
+
+class SQLiteStudent(SQLiteBase):
+    __tablename__ = "student"
+    id = Column(Integer, primary_key=True)
+    person_id = Column(ForeignKey("person.id"))
+    record_load_dttm = Column(DateTime)
+    record_update_dttm = Column(DateTime)
+    student_hold = relationship("SQLiteHold", order_by="SQLiteHold.seq",
+                                viewonly=True)
+    adviser = relationship("SQLiteAdviser", secondary="student_to_adviser",
+                           viewonly=True)
+
+
+class SQLiteHold(SQLiteBase):
+    __tablename__ = "student_hold"
+    id = Column(Integer, primary_key=True)
+    student_id = Column(ForeignKey("student.id"))
+    hold_dt = Column(DateTime)
+    hold_office = Column(TEXT)
+    hold_office_desc = Column(TEXT)
+    hold_reason = Column(TEXT)
+    hold_type = Column(Integer)
+    hold_type_desc = Column(TEXT)
+    seq = Column(Integer)
+
+
+class SQLiteEmployee(SQLiteBase):
+    __tablename__ = "employee"
+    id = Column(Integer, primary_key=True)
+    person_id = Column(ForeignKey("person.id"))
+    person = relationship("SQLitePerson", viewonly=True)
+    adviser = relationship("SQLiteAdviser", uselist=False, viewonly=True)
+
+
+class SQLiteAdviser(SQLiteBase):
+    __tablename__ = "adviser"
+    id = Column(Integer, primary_key=True)
+    employee_id = Column(ForeignKey("employee.id"))
+    advising_program = Column(TEXT)
+    employee = relationship("SQLiteEmployee", viewonly=True)
+
+
+SQLiteStudentToAdviser = Table(
+    "student_to_adviser", SQLiteBase.metadata,
+    Column("student_id", ForeignKey("student.id")),
+    Column("adviser_id", ForeignKey("adviser.id")))
+
+
+class SQLiteDatabase(AbstractDatabase):
+    Person = SQLitePerson
+    Student = SQLiteStudent
+    Hold = SQLiteHold
+
+    def create_engine(self):
+        self.engine = create_engine("sqlite://")
+        SQLiteBase.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(SQLitePerson.__table__.insert(), [
+                {"id": i, "uwnetid": f"netid{i}"} for i in range(1, 2001)])
+
+
+class SQLiteChangesDatabase(SQLiteDatabase):
+    """Pooled file database of students loaded on the first of the month
+    and updated on the id'th day, or never for ids over 5
+    """
+
+    def __init__(self, path):
+        self.path = path
+        super().__init__()
+
+    def create_engine(self):
+        self.engine = create_engine(f"sqlite:///{self.path}",
+                                    poolclass=QueuePool)
+        event.listen(self.engine, "connect", lambda connection, record: (
+            connection.create_function("greatest", -1, lambda *values: max(
+                value for value in values if value is not None))))
+        SQLiteBase.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(SQLitePerson.__table__.insert(), [
+                {"id": i, "uwnetid": f"netid{i}"} for i in range(1, 11)])
+            connection.execute(SQLiteStudent.__table__.insert(), [
+                {"id": i, "person_id": i,
+                 "record_load_dttm": datetime(2024, 1, 1),
+                 "record_update_dttm": datetime(2024, 1, i) if (
+                     i <= 5) else None} for i in range(1, 11)])
+
+
+class SQLiteHoldsDatabase(SQLiteDatabase):
+    """Students with holds inserted in descending seq order"""
+    # not selected without their relations
+    Sport = Transcript = Transfer = Degree = None
+
+    def create_engine(self):
+        self.engine = create_engine("sqlite://")
+        SQLiteBase.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(SQLitePerson.__table__.insert(), [
+                {"id": i, "uwnetid": f"netid{i}"} for i in range(1, 4)])
+            connection.execute(SQLiteStudent.__table__.insert(), [
+                {"id": i, "person_id": i} for i in range(1, 4)])
+            connection.execute(SQLiteHold.__table__.insert(), [
+                {"student_id": i, "seq": seq, "hold_type": seq,
+                 "hold_reason": f"reason{seq}"}
+                for i in range(1, 4) for seq in range(9, 6, -i)])
+
+
+class SQLiteCaseloadDatabase(SQLiteDatabase):
+    """Advisers 1 and 2 in program A and 3 in program B, of which 2 has
+    no students; students 4 to 7 advised by 1, and 6 and 7 by 3 as well;
+    and employee 8, who is not an adviser
+    """
+    Employee = SQLiteEmployee
+    Adviser = SQLiteAdviser
+
+    def create_engine(self):
+        self.engine = create_engine("sqlite://")
+        SQLiteBase.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(SQLitePerson.__table__.insert(), [
+                {"id": i, "uwnetid": f"netid{i}", "uwregid": f"REGID{i}"}
+                for i in range(1, 9)])
+            connection.execute(SQLiteEmployee.__table__.insert(), [
+                {"id": i, "person_id": i} for i in (1, 2, 3, 8)])
+            connection.execute(SQLiteAdviser.__table__.insert(), [
+                {"id": i, "employee_id": i, "advising_program": program}
+                for i, program in ((1, "A"), (2, "A"), (3, "B"))])
+            connection.execute(SQLiteStudent.__table__.insert(), [
+                {"id": i, "person_id": i} for i in range(4, 8)])
+            connection.execute(SQLiteStudentToAdviser.insert(), [
+                {"student_id": i, "adviser_id": adviser_id}
+                for adviser_id, students in ((1, range(4, 8)), (3, (6, 7)))
+                for i in students])
 
 
 class UWPersonClientTest(TestCase):
@@ -19,52 +193,55 @@ class UWPersonClientTest(TestCase):
     def get_mock_person_client(self, mock_uwpds):
         client = UWPersonClient()
         setattr(client.__class__, 'DB', mock_uwpds.return_value)
+        client._load_options = MagicMock(return_value=[])
         return client
 
     @patch('uw_person_client.clients.core_client.UWPersonClient._map_person')
-    @patch('uw_person_client.clients.core_client.or_')
-    def test_get_person_by_uwnetid(self, mock_or, mock_map_person):
+    def test_get_person_by_uwnetid(self, mock_map_person):
         client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
         # person exists
         mock_person = MagicMock()
         mock_netid = 'test'
-        client.DB.session.query.return_value.filter.return_value.first = \
+        mock_query.filter.return_value.first = \
             MagicMock(return_value=mock_person)
 
         return_value = client.get_person_by_uwnetid(mock_netid, arg1='arg1')
         # assertions
         client.DB.session.query.assert_called_once_with(client.DB.Person)
-        client.DB.session.query.return_value.filter.return_value.one_or_none.\
+        mock_query.filter.return_value.one_or_none.\
             assert_called_once()
         self.assertEqual(
             return_value, mock_map_person(mock_person, arg1='arg1'))
 
         # no person found
-        client.DB.session.query.return_value.filter.return_value.one_or_none =\
+        mock_query.filter.return_value.one_or_none =\
             MagicMock(return_value=None)
         with self.assertRaises(PersonNotFoundException):
             client.get_person_by_uwnetid(mock_netid)
 
     @patch('uw_person_client.clients.core_client.UWPersonClient._map_person')
-    @patch('uw_person_client.clients.core_client.or_')
-    def test_get_person_by_uwregid(self, mock_or, mock_map_person):
+    def test_get_person_by_uwregid(self, mock_map_person):
         client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
         # person exists
         mock_person = MagicMock()
         mock_regid = 'test'
-        client.DB.session.query.return_value.filter.return_value.first = \
+        mock_query.filter.return_value.first = \
             MagicMock(return_value=mock_person)
 
         return_value = client.get_person_by_uwregid(mock_regid, arg1='arg1')
         # assertions
         client.DB.session.query.assert_called_once_with(client.DB.Person)
-        client.DB.session.query.return_value.filter.return_value.one_or_none.\
+        mock_query.filter.return_value.one_or_none.\
             assert_called_once()
         self.assertEqual(
             return_value, mock_map_person(mock_person, arg1='arg1'))
 
         # no person found
-        client.DB.session.query.return_value.filter.return_value.one_or_none =\
+        mock_query.filter.return_value.one_or_none =\
             MagicMock(return_value=None)
         with self.assertRaises(PersonNotFoundException):
             client.get_person_by_uwregid(mock_regid)
@@ -72,10 +249,12 @@ class UWPersonClientTest(TestCase):
     @patch('uw_person_client.clients.core_client.UWPersonClient._map_person')
     def test_get_person_by_student_number(self, mock_map_person):
         client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
         # person exists
         mock_person = MagicMock()
         mock_student_number = '1234567'
-        client.DB.session.query.return_value.join.return_value.filter.\
+        mock_query.join.return_value.filter.\
             return_value.one_or_none = MagicMock(return_value=mock_person)
 
         return_value = client.get_person_by_student_number(
@@ -83,18 +262,18 @@ class UWPersonClientTest(TestCase):
         # assertions
         client.DB.session.query.assert_called_once_with(
             client.DB.Person)
-        client.DB.session.query.return_value.join.assert_called_once_with(
+        mock_query.join.assert_called_once_with(
             client.DB.Student)
-        client.DB.session.query.return_value.join.return_value.filter.\
+        mock_query.join.return_value.filter.\
             assert_called_once_with(
                 client.DB.Student.student_number == mock_student_number)
-        client.DB.session.query.return_value.join.return_value.filter.\
+        mock_query.join.return_value.filter.\
             return_value.one_or_none.assert_called_once()
         self.assertEqual(
             return_value, mock_map_person(mock_person, arg1='arg1'))
 
         # no person found
-        client.DB.session.query.return_value.join.return_value.filter.\
+        mock_query.join.return_value.filter.\
             return_value.one_or_none = MagicMock(return_value=None)
         with self.assertRaises(PersonNotFoundException):
             client.get_person_by_student_number(mock_student_number)
@@ -102,10 +281,12 @@ class UWPersonClientTest(TestCase):
     @patch('uw_person_client.clients.core_client.UWPersonClient._map_person')
     def test_get_person_by_system_key(self, mock_map_person):
         client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
         # person exists
         mock_person = MagicMock()
         mock_system_key = '12345'
-        client.DB.session.query.return_value.join.return_value.filter.\
+        mock_query.join.return_value.filter.\
             return_value.one_or_none = MagicMock(return_value=mock_person)
 
         return_value = client.get_person_by_system_key(
@@ -113,22 +294,194 @@ class UWPersonClientTest(TestCase):
 
         # assertions
         client.DB.session.query.assert_called_once_with(client.DB.Person)
-        client.DB.session.query.return_value.filter.return_value.one_or_none.\
+        mock_query.filter.return_value.one_or_none.\
             assert_called_once()
         self.assertEqual(
             return_value, mock_map_person(mock_person, arg1='arg1'))
 
         # no person found
-        client.DB.session.query.return_value.filter.return_value.one_or_none =\
+        mock_query.filter.return_value.one_or_none =\
             MagicMock(return_value=None)
         with self.assertRaises(PersonNotFoundException):
             client.get_person_by_system_key(mock_system_key)
 
+    def test_session_scope(self):
+        client = self.get_mock_person_client()
+        self.assertEqual(client.session_scope(),
+                         client.DB.session_scope.return_value)
+
+    def test_get_person_by_uwnetid_cached(self):
+        client = self.get_mock_person_client()
+        client.person_cache = PersonCache()
+        mock_person = Person().from_dict({
+            'uwnetid': 'javerage', 'uwregid': 'regid',
+            'system_key': '000123456'})
+        client._get_person_by_uwnetid = MagicMock(return_value=mock_person)
+
+        self.assertIs(client.get_person_by_uwnetid(
+            'javerage', include_student=False), mock_person)
+        self.assertIs(client.get_person_by_uwnetid(
+            'javerage', include_student=False), mock_person)
+        self.assertIs(client.get_person_by_system_key(
+            123456, include_student=False), mock_person)
+        client._get_person_by_uwnetid.assert_called_once_with(
+            'javerage', include_student=False)
+        # different include flags are cached separately
+        client.get_person_by_uwnetid('javerage')
+        self.assertEqual(client._get_person_by_uwnetid.call_count, 2)
+        self.assertEqual(client.person_cache.stats()['hits'], 2)
+        self.assertEqual(client.person_cache.stats()['misses'], 2)
+
+    def test_get_person_by_uwnetid_not_found_cached(self):
+        client = self.get_mock_person_client()
+        client.not_found_cache = NotFoundCache()
+        client._get_person_by_uwnetid = MagicMock(
+            side_effect=PersonNotFoundException())
+
+        for i in range(3):
+            with self.assertRaises(PersonNotFoundException):
+                client.get_person_by_uwnetid('nobody')
+        client._get_person_by_uwnetid.assert_called_once_with('nobody')
+        self.assertEqual(client.not_found_cache.stats()['hits'], 2)
+
+        # the uwnetid is found once a person loaded by uwregid has it
+        client._get_person_by_uwregid = MagicMock(
+            return_value=Person().from_dict(
+                {"uwnetid": "nobody", "uwregid": "REGID"}))
+        client.get_person_by_uwregid('REGID')
+        client._get_person_by_uwnetid = MagicMock(
+            return_value=client._get_person_by_uwregid.return_value)
+        self.assertEqual(
+            client.get_person_by_uwnetid('nobody').uwregid, 'REGID')
+
+    def test_get_person_by_uwregid_revalidated(self):
+        client = self.get_mock_person_client()
+        client.person_cache = PersonCache()
+        client.revalidate_cached_persons = True
+        mock_person = Person().from_dict({
+            'uwnetid': 'javerage', 'uwregid': 'regid',
+            'student': {'record_update_dttm': '2024-01-01'}})
+        client._get_person_by_uwregid = MagicMock(return_value=mock_person)
+        mock_scalar = client.DB.session.query.return_value.join.\
+            return_value.filter.return_value.scalar
+        mock_scalar.return_value = '2024-01-01'
+
+        client.get_person_by_uwregid('regid')
+        client.get_person_by_uwregid('regid')
+        self.assertEqual(client._get_person_by_uwregid.call_count, 1)
+        client.DB.session.query.assert_called_once_with(
+            client.DB.Student.record_update_dttm)
+        # the student record changed
+        mock_scalar.return_value = '2024-02-01'
+        client.get_person_by_uwregid('regid')
+        self.assertEqual(client._get_person_by_uwregid.call_count, 2)
+
+    @patch('uw_person_client.clients.core_client.UWPersonClient._map_person')
+    def test_get_persons_by_uwnetids(self, mock_map_person):
+        client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_person1, mock_person2 = MagicMock(), MagicMock()
+        mock_person2.prior_uwnetids = ['old', 'older']
+        client.DB.Person.prior_uwnetids.key = 'prior_uwnetids'
+        mock_query.add_columns.return_value.filter.return_value = [
+            (mock_person1, 'one')]
+        mock_query.filter.return_value = [mock_person2]
+        mock_map_person.side_effect = lambda p, **kw: p
+
+        persons = client.get_persons_by_uwnetids(
+            ['one', 'old', 'foo'], include_student=False)
+        # assertions
+        mock_query.add_columns.assert_called_once_with(
+            client.DB.Person.uwnetid)
+        client.DB.Person.uwnetid.in_.assert_called_once()
+        # only the unmatched values are looked up as prior netids
+        self.assertEqual(
+            set(client.DB.Person.prior_uwnetids.overlap.call_args[0][0]),
+            {'old', 'foo'})
+        self.assertEqual(persons, {'one': mock_person1,
+                                   'old': mock_person2,
+                                   'foo': None})
+        mock_map_person.assert_any_call(mock_person1, include_student=False,
+                                        adviser_cache={})
+
+        # every value has a current match
+        client.DB.Person.prior_uwnetids.overlap.reset_mock()
+        persons = client.get_persons_by_uwnetids(['one'])
+        client.DB.Person.prior_uwnetids.overlap.assert_not_called()
+        self.assertEqual(persons, {'one': mock_person1})
+
+    def test_get_person_by_uwnetid_sql(self):
+        client = self.get_mock_person_client()
+        client.DB = MagicMock()
+        client.DB.Person = SQLPerson
+        client.DB.session = Session()
+        statements = []
+
+        def one_or_none(query):
+            statements.append(str(query.statement.compile(
+                dialect=postgresql.dialect())))
+
+        with patch.object(Query, 'one_or_none', autospec=True,
+                          side_effect=one_or_none):
+            with self.assertRaises(PersonNotFoundException):
+                client.get_person_by_uwnetid('javerage')
+
+        self.assertEqual(len(statements), 2)
+        self.assertIn("WHERE person.uwnetid = %(uwnetid_1)s", statements[0])
+        self.assertNotIn("prior_uwnetids", statements[0].split("WHERE")[1])
+        self.assertIn("WHERE person.prior_uwnetids @> %(prior_uwnetids_1)s",
+                      statements[1])
+        self.assertNotIn("ANY", statements[1])
+
+    @patch('uw_person_client.clients.core_client.UWPersonClient._map_person')
+    def test_get_persons_by_student_numbers(self, mock_map_person):
+        client = self.get_mock_person_client()
+        client.lookup_chunk_size = 2
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_person = MagicMock()
+        mock_query.add_columns.return_value.join.return_value.filter.\
+            return_value = [(mock_person, '1033334')]
+        mock_map_person.side_effect = lambda p, **kw: p
+
+        persons = client.get_persons_by_student_numbers(
+            ['1033334', 1033334, '1234', '4567', None])
+        # assertions
+        mock_query.add_columns.return_value.join.assert_called_with(
+            client.DB.Student)
+        self.assertEqual(mock_query.add_columns.return_value.join.
+                         return_value.filter.call_count, 2)
+        self.assertEqual(persons, {'1033334': mock_person,
+                                   1033334: mock_person,
+                                   '1234': None,
+                                   '4567': None,
+                                   None: None})
+
+    @patch('uw_person_client.clients.core_client.UWPersonClient._map_person')
+    def test_get_persons_by_system_keys(self, mock_map_person):
+        client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_query.add_columns.return_value.filter.return_value = []
+
+        persons = client.get_persons_by_system_keys([])
+        self.assertEqual(persons, {})
+        mock_query.add_columns.assert_not_called()
+
+        persons = client.get_persons_by_system_keys(['12345', '0'])
+        mock_query.add_columns.assert_called_once_with(
+            client.DB.Person.system_key)
+        self.assertEqual(persons, {'12345': None, '0': None})
+        mock_map_person.assert_not_called()
+
     @patch('uw_person_client.clients.core_client.UWPersonClient._map_person')
     def test_get_persons(self, mock_map_person):
         client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
         mock_person1, mock_person2 = MagicMock(), MagicMock()
-        client.DB.session.query.return_value.all = \
+        mock_query.all = \
             MagicMock(return_value=[mock_person1, mock_person2])
         return_value = client.get_persons()
         # assertions
@@ -140,16 +493,18 @@ class UWPersonClientTest(TestCase):
     @patch.object(UWPersonClient, '_map_person', return_value=None)
     def test_get_registered_students(self, mock_map_person):
         client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
         mock_person1, mock_person2 = MagicMock(), MagicMock()
-        client.DB.session.query.return_value.join.return_value.filter.\
+        mock_query.join.return_value.filter.\
             return_value.all = MagicMock(
                 return_value=[mock_person1, mock_person2])
         return_value = client.get_registered_students()
         # assertions
         client.DB.session.query.assert_called_once_with(client.DB.Person)
-        client.DB.session.query.return_value.join.\
+        mock_query.join.\
             assert_called_once_with(client.DB.Student)
-        client.DB.session.query.return_value.join.return_value.filter.\
+        mock_query.join.return_value.filter.\
             assert_called_once_with(
                 client.DB.Student.enroll_status_code == '12')
         self.assertEqual(return_value,
@@ -159,13 +514,15 @@ class UWPersonClientTest(TestCase):
     @patch.object(UWPersonClient, '_map_person', return_value=None)
     def test_get_active_students(self, mock_map_person):
         client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
         mock_person1, mock_person2 = MagicMock(), MagicMock()
-        client.DB.session.query.return_value.filter.return_value.\
+        mock_query.filter.return_value.\
             all = MagicMock(return_value=[mock_person1, mock_person2])
         return_value = client.get_active_students()
         # assertions
         client.DB.session.query.assert_called_once_with(client.DB.Person)
-        client.DB.session.query.return_value.filter.assert_called_once_with(
+        mock_query.filter.assert_called_once_with(
             client.DB.Person._is_active_student == True)  # noqa
         self.assertEqual(return_value,
                          [mock_map_person(mock_person1),
@@ -174,13 +531,15 @@ class UWPersonClientTest(TestCase):
     @patch.object(UWPersonClient, '_map_person', return_value=None)
     def test_get_active_employees(self, mock_map_person):
         client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
         mock_person1, mock_person2 = MagicMock(), MagicMock()
-        client.DB.session.query.return_value.filter.return_value.\
+        mock_query.filter.return_value.\
             all = MagicMock(return_value=[mock_person1, mock_person2])
         return_value = client.get_active_employees()
         # assertions
         client.DB.session.query.assert_called_once_with(client.DB.Person)
-        client.DB.session.query.return_value.filter.assert_called_once_with(
+        mock_query.filter.assert_called_once_with(
             client.DB.Person._is_active_employee == True)  # noqa
         self.assertEqual(return_value,
                          [mock_map_person(mock_person1),
@@ -189,16 +548,18 @@ class UWPersonClientTest(TestCase):
     @patch.object(UWPersonClient, '_map_person', return_value=None)
     def test_get_advisers(self, mock_map_person):
         client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
         mock_person1, mock_person2 = MagicMock(), MagicMock()
-        client.DB.session.query.return_value.join.return_value.join.\
+        mock_query.join.return_value.join.\
             return_value.all = MagicMock(
                 return_value=[mock_person1, mock_person2])
         return_value = client.get_advisers()
         # assertions
         client.DB.session.query.assert_called_once_with(client.DB.Person)
-        client.DB.session.query.return_value.join.assert_called_once_with(
+        mock_query.join.assert_called_once_with(
             client.DB.Employee)
-        client.DB.session.query.return_value.join.return_value.join.\
+        mock_query.join.return_value.join.\
             assert_called_once_with(client.DB.Adviser)
         self.assertEqual(return_value,
                          [mock_map_person(mock_person1),
@@ -207,25 +568,141 @@ class UWPersonClientTest(TestCase):
     @patch.object(UWPersonClient, '_map_person', return_value=None)
     def test_get_advisers_with_program(self, mock_map_person):
         client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
         mock_person1, mock_person2 = MagicMock(), MagicMock()
-        client.DB.session.query.return_value.join.return_value.join.\
+        mock_query.join.return_value.join.\
             return_value.filter.return_value.all = MagicMock(
                 return_value=[mock_person1, mock_person2])
         advising_program = 'test'
         return_value = client.get_advisers(advising_program=advising_program)
         # assertions
         client.DB.session.query.assert_called_once_with(client.DB.Person)
-        client.DB.session.query.return_value.join.assert_called_once_with(
+        mock_query.join.assert_called_once_with(
             client.DB.Employee)
-        client.DB.session.query.return_value.join.return_value.join.\
+        mock_query.join.return_value.join.\
             assert_called_once_with(client.DB.Adviser)
-        client.DB.session.query.return_value.join.return_value.join.\
+        mock_query.join.return_value.join.\
             return_value.filter.assert_called_once_with(
                 client.DB.Adviser.advising_program == advising_program)
         self.assertEqual(return_value,
                          [mock_map_person(mock_person1),
                           mock_map_person(mock_person2)])
 
+    @patch.object(UWPersonClient, '_map_person', return_value=None)
+    def test_get_persons_paginated(self, mock_map_person):
+        client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_person = MagicMock()
+        mock_query.order_by.return_value.offset.return_value.limit.\
+            return_value.all = MagicMock(return_value=[mock_person])
+
+        return_value = client.get_persons(page=3, page_size=10)
+        # assertions
+        mock_query.order_by.assert_called_once_with(client.DB.Person.id)
+        mock_query.order_by.return_value.offset.assert_called_once_with(20)
+        mock_query.order_by.return_value.offset.return_value.limit.\
+            assert_called_once_with(10)
+        self.assertEqual(return_value, [mock_map_person(mock_person)])
+
+    @patch.object(UWPersonClient, '_map_person', return_value=None)
+    def test_get_persons_page(self, mock_map_person):
+        client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_persons = [MagicMock(id=i) for i in range(1, 4)]
+        mock_query.order_by.return_value.limit.return_value.all = \
+            MagicMock(return_value=mock_persons)
+
+        persons, page_token = client.get_persons_page(2)
+        # assertions
+        mock_query.order_by.assert_called_once_with(client.DB.Person.id)
+        mock_query.order_by.return_value.limit.assert_called_once_with(3)
+        mock_query.filter.assert_not_called()
+        self.assertEqual(len(persons), 2)
+        self.assertEqual(client._decode_page_token(page_token), 2)
+
+        # following page
+        client.DB.Person.id.__gt__.return_value = 'id > 2'
+        mock_query.filter.return_value.order_by.return_value.limit.\
+            return_value.all = MagicMock(return_value=mock_persons[2:])
+        persons, page_token = client.get_persons_page(2, page_token)
+        client.DB.Person.id.__gt__.assert_called_once_with(2)
+        mock_query.filter.assert_called_once_with('id > 2')
+        self.assertEqual(len(persons), 1)
+        self.assertIsNone(page_token)
+
+        with self.assertRaises(InvalidPageTokenException):
+            client.get_persons_page(2, 'foo')
+
+        mock_query.order_by.reset_mock()
+        for page_size in (0, -1):
+            with self.assertRaises(ValueError):
+                client.get_persons_page(page_size)
+        mock_query.order_by.assert_not_called()
+
+    @patch.object(UWPersonClient, '_map_person', return_value=None)
+    def test_get_active_students_page(self, mock_map_person):
+        client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_query.filter.return_value.order_by.return_value.limit.\
+            return_value.all = MagicMock(return_value=[])
+
+        persons, page_token = client.get_active_students_page(10)
+        mock_query.filter.assert_called_once_with(
+            client.DB.Person._is_active_student == True)  # noqa
+        self.assertEqual(persons, [])
+        self.assertIsNone(page_token)
+
+    @patch.object(UWPersonClient, '_map_person', return_value=None)
+    def test_iter_persons(self, mock_map_person):
+        client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_person1, mock_person2 = MagicMock(), MagicMock()
+        mock_query.yield_per.return_value = [mock_person1, mock_person2]
+
+        persons = client.iter_persons(include_employee=False)
+        self.assertNotIsInstance(persons, list)
+        self.assertEqual(list(persons), [mock_map_person(mock_person1),
+                                         mock_map_person(mock_person2)])
+        mock_query.yield_per.assert_called_once_with(
+            client.stream_batch_size)
+        mock_map_person.assert_any_call(mock_person1, include_employee=False,
+                                        adviser_cache={})
+
+    @patch.object(UWPersonClient, '_map_person', return_value=None)
+    def test_iter_active_students(self, mock_map_person):
+        client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_person = MagicMock()
+        mock_query.filter.return_value.yield_per.return_value = [mock_person]
+
+        persons = list(client.iter_active_students(batch_size=10))
+        mock_query.filter.assert_called_once_with(
+            client.DB.Person._is_active_student == True)  # noqa
+        mock_query.filter.return_value.yield_per.assert_called_once_with(10)
+        self.assertEqual(persons, [mock_map_person(mock_person)])
+
+    @patch.object(UWPersonClient, '_map_person', return_value=None)
+    def test_iter_advisers(self, mock_map_person):
+        client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_person = MagicMock()
+        mock_query.join.return_value.join.return_value.filter.return_value.\
+            yield_per.return_value = [mock_person]
+
+        persons = list(client.iter_advisers(advising_program='test',
+                                            batch_size=5))
+        mock_query.join.return_value.join.return_value.filter.\
+            assert_called_once_with(
+                client.DB.Adviser.advising_program == 'test')
+        self.assertEqual(persons, [mock_map_person(mock_person)])
+
     def test_get_persons_by_adviser_netid_not_found(self):
         client = self.get_mock_person_client()
         client.DB.session.query = MagicMock(side_effect=NoResultFound)
@@ -241,29 +718,29 @@ class UWPersonClientTest(TestCase):
         client.DB.session.query.return_value.join.return_value.join.\
             return_value.filter.return_value.one = MagicMock(
                 return_value=mock_adviser)
-        client.DB.session.query.return_value.join.return_value.join.\
-            return_value.join.return_value.filter.return_value.all = MagicMock(
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_query.join.return_value.join.return_value.join.return_value.\
+            filter.return_value.all = MagicMock(
                 return_value=[mock_person1, mock_person2])
         return_value = client.get_persons_by_adviser_netid(mock_netid)
         # assertions
         client.DB.session.query.assert_any_call(client.DB.Person)
         client.DB.session.query.assert_any_call(client.DB.Adviser)
-        client.DB.session.query.return_value.join.assert_any_call(
+        client.DB.session.query.return_value.join.assert_called_once_with(
             client.DB.Employee)
-        client.DB.session.query.return_value.join.assert_any_call(
-            client.DB.Student)
-        client.DB.session.query.return_value.join.return_value.join.\
-            assert_any_call(client.DB.Person)
         client.DB.session.query.return_value.join.return_value.join.\
-            assert_any_call(client.DB.StudentToAdviser)
+            assert_called_once_with(client.DB.Person)
         client.DB.session.query.return_value.join.return_value.join.\
             return_value.filter.assert_called_once_with(
                 client.DB.Person.uwnetid == mock_netid)
-        client.DB.session.query.return_value.join.return_value.join.\
-            return_value.join.assert_called_once_with(
-                client.DB.Adviser)
-        client.DB.session.query.return_value.join.return_value.join.\
-            return_value.join.return_value.filter.assert_called_once_with(
+        mock_query.join.assert_called_once_with(client.DB.Student)
+        mock_query.join.return_value.join.assert_called_once_with(
+            client.DB.StudentToAdviser)
+        mock_query.join.return_value.join.return_value.join.\
+            assert_called_once_with(client.DB.Adviser)
+        mock_query.join.return_value.join.return_value.join.return_value.\
+            filter.assert_called_once_with(
                 client.DB.Adviser.id == mock_adviser.id)
         self.assertEqual(return_value,
                          [mock_map_person(mock_person1),
@@ -284,34 +761,114 @@ class UWPersonClientTest(TestCase):
         client.DB.session.query.return_value.join.return_value.join.\
             return_value.filter.return_value.one = MagicMock(
                 return_value=mock_adviser)
-        client.DB.session.query.return_value.join.return_value.join.\
-            return_value.join.return_value.filter.return_value.all = MagicMock(
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_query.join.return_value.join.return_value.join.return_value.\
+            filter.return_value.all = MagicMock(
                 return_value=[mock_person1, mock_person2])
         return_value = client.get_persons_by_adviser_regid(mock_regid)
         # assertions
         client.DB.session.query.assert_any_call(client.DB.Person)
         client.DB.session.query.assert_any_call(client.DB.Adviser)
-        client.DB.session.query.return_value.join.assert_any_call(
+        client.DB.session.query.return_value.join.assert_called_once_with(
             client.DB.Employee)
-        client.DB.session.query.return_value.join.assert_any_call(
-            client.DB.Student)
         client.DB.session.query.return_value.join.return_value.join.\
-            assert_any_call(client.DB.Person)
-        client.DB.session.query.return_value.join.return_value.join.\
-            assert_any_call(client.DB.StudentToAdviser)
+            assert_called_once_with(client.DB.Person)
         client.DB.session.query.return_value.join.return_value.join.\
             return_value.filter.assert_called_once_with(
                 client.DB.Person.uwregid == mock_regid)
-        client.DB.session.query.return_value.join.return_value.join.\
-            return_value.join.assert_called_once_with(
-                client.DB.Adviser)
-        client.DB.session.query.return_value.join.return_value.join.\
-            return_value.join.return_value.filter.assert_called_once_with(
+        mock_query.join.assert_called_once_with(client.DB.Student)
+        mock_query.join.return_value.join.assert_called_once_with(
+            client.DB.StudentToAdviser)
+        mock_query.join.return_value.join.return_value.join.\
+            assert_called_once_with(client.DB.Adviser)
+        mock_query.join.return_value.join.return_value.join.return_value.\
+            filter.assert_called_once_with(
                 client.DB.Adviser.id == mock_adviser.id)
         self.assertEqual(return_value,
                          [mock_map_person(mock_person1),
                           mock_map_person(mock_person2)])
 
+    @patch.object(UWPersonClient, '_iter_persons')
+    def test_get_persons_updated_since(self, mock_iter_persons):
+        client = self.get_mock_person_client()
+        client.DB.Person, client.DB.Student = models.Person, models.Student
+        client.DB.session.query.return_value.scalar.return_value = None
+        since = datetime(2024, 1, 1)
+        watermark, persons = client.get_persons_updated_since(since)
+        self.assertEqual((watermark, list(persons)), (since, []))
+        mock_iter_persons.assert_not_called()
+
+        client.DB.session.query.return_value.scalar.return_value = \
+            datetime(2024, 1, 2)
+        client.DB.release_session.reset_mock()
+        mock_iter_persons.return_value = iter(["person"])
+        watermark, persons = client.get_persons_updated_since(
+            since, batch_size=10)
+        self.assertEqual(watermark, datetime(2024, 1, 2))
+        # released after the watermark query, and the stream is built later
+        client.DB.release_session.assert_called_once()
+        mock_iter_persons.assert_not_called()
+        self.assertEqual(list(persons), ["person"])
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value.join.return_value.filter.return_value
+        mock_query.filter.assert_called_once()
+        self.assertEqual(
+            str(mock_query.filter.call_args.args[0]),
+            "greatest(student.record_update_dttm, "
+            "student.record_load_dttm) > :greatest_1")
+        mock_iter_persons.assert_called_once_with(
+            mock_query.filter.return_value.order_by.return_value, 10)
+
+    def test_get_update_watermark(self):
+        client = self.get_mock_person_client()
+        client.DB.Student = models.Student
+        client.DB.session.query.return_value.scalar.return_value = \
+            datetime(2024, 1, 2)
+        self.assertEqual(client.get_update_watermark(), datetime(2024, 1, 2))
+        self.assertEqual(
+            str(client.DB.session.query.call_args.args[0]),
+            "max(greatest(student.record_update_dttm, "
+            "student.record_load_dttm))")
+        client.DB.release_session.assert_called_once()
+
+    def test_get_person_keys(self):
+        client = self.get_mock_person_client()
+        client.DB.session.query.return_value.options.return_value.\
+            filter.return_value.with_entities.return_value = [
+                ("REGID1",), ("REGID2",)]
+        self.assertEqual(client.get_person_keys("active_students"),
+                         {"REGID1", "REGID2"})
+        self.assertRaises(ValueError, client.get_person_keys, "alumni")
+
+    def test_get_columns_unknown(self):
+        client = self.get_mock_person_client()
+        self.assertRaises(ValueError, client.get_columns, "alumni")
+        self.assertRaises(ValueError, client.get_columns,
+                          relations=["alumni"])
+
+    def test_select_table(self):
+        client = self.get_mock_person_client()
+        client.DB.Term = models.Term
+        client.DB.session.execute.return_value.keys.return_value = [
+            "system_key"]
+        client.DB.session.execute.return_value.all.return_value = [
+            ("000000001",), ("000000002",)]
+        table = client._select_table(
+            models.Transcript, models.Student.person_id,
+            select(models.Person.id), [models.Student.system_key],
+            [(models.Student,
+              models.Student.id == models.Transcript.student_id)],
+            skip=("id", "student_id"))
+        self.assertEqual(table, {"system_key": ["000000001", "000000002"]})
+
+        query = client.DB.session.execute.call_args.args[0]
+        self.assertIn("tran_term_year", query.selected_columns)
+        self.assertIn("leave_ends_term_quarter", query.selected_columns)
+        self.assertNotIn("tran_term_id", query.selected_columns)
+        sql = str(query.compile(dialect=postgresql.dialect()))
+        self.assertEqual(sql.count("LEFT OUTER JOIN term"), 2)
+
     def _mock_to_dict(self, mock):
         keys = set(dir(mock)) - set(dir(MagicMock()))
         mock_dict = {}
@@ -370,9 +927,182 @@ class UWPersonClientTest(TestCase):
         mock_map_employee.assert_called()
         mock_map_student.assert_called()
 
+    def test_row_includes(self):
+        client = self.get_mock_person_client()
+        self.assertEqual(client._row_includes(), (True, True, [
+            "sports", "advisers", "transcripts", "transfers", "holds",
+            "degrees"]))
+        self.assertEqual(client._row_includes(
+            include_employee=False, include_student_advisers=False,
+            include_student_holds=False), (True, False, [
+                "sports", "transcripts", "transfers", "degrees"]))
+        self.assertEqual(client._row_includes(
+            fields=["uwnetid", "student.majors", "student.sports"]),
+            (True, False, ["majors", "sports"]))
+        self.assertEqual(client._row_includes(fields="uwnetid"),
+                         (False, False, list(STUDENT_RELATIONS)))
+
+    @patch('uw_person_client.clients.core_client.selectinload')
+    @patch('uw_person_client.clients.core_client.joinedload')
+    def test_load_options(self, mock_joinedload, mock_selectinload):
+        client = self.get_mock_person_client()
+        del client._load_options
+
+        options = client._load_options()
+        self.assertEqual(len(options), 2)
+        mock_joinedload.assert_any_call(client.DB.Person.student)
+        mock_joinedload.assert_any_call(client.DB.Person.employee)
+        mock_selectinload.assert_any_call(client.DB.Student.adviser)
+        mock_selectinload.assert_any_call(client.DB.Student.transcript)
+        mock_selectinload.assert_any_call(client.DB.Student.degree)
+        # terms and majors come from reference data
+        called = [c.args[0] for c in mock_selectinload.call_args_list]
+        self.assertNotIn(client.DB.Student.major_1, called)
+        self.assertNotIn(client.DB.Student.academic_term, called)
+
+        mock_joinedload.reset_mock()
+        mock_selectinload.reset_mock()
+        options = client._load_options(include_employee=False,
+                                       include_student_advisers=False,
+                                       include_student_transcripts=False)
+        self.assertEqual(len(options), 1)
+        mock_joinedload.assert_called_once_with(client.DB.Person.student)
+        called = [c.args[0] for c in mock_selectinload.call_args_list]
+        self.assertNotIn(client.DB.Student.adviser, called)
+        self.assertNotIn(client.DB.Student.transcript, called)
+        self.assertIn(client.DB.Student.sport, called)
+
+        mock_joinedload.reset_mock()
+        self.assertEqual(client._load_options(include_student=False,
+                                              include_employee=False), [])
+        mock_joinedload.assert_not_called()
+
+    @patch('uw_person_client.clients.core_client.selectinload')
+    @patch('uw_person_client.clients.core_client.joinedload')
+    @patch('uw_person_client.clients.core_client.load_only')
+    def test_load_options_with_fields(self, mock_load_only, mock_joinedload,
+                                      mock_selectinload):
+        client = self.get_mock_person_client()
+        del client._load_options
+
+        options = client._load_options(
+            include_student=False,
+            fields=['uwnetid', 'active_student', 'student.student_email',
+                    'student.majors', 'employee.primary_title'])
+        self.assertEqual(len(options), 3)
+        mock_load_only.assert_any_call(
+            client.DB.Person.id, client.DB.Person.uwnetid,
+            client.DB.Person._is_active_student)
+        mock_load_only.assert_any_call(
+            client.DB.Student.id, client.DB.Student.person_id,
+            client.DB.Student.student_email, client.DB.Student.major_1_id,
+            client.DB.Student.major_2_id, client.DB.Student.major_3_id)
+        mock_joinedload.return_value.load_only.assert_called_once_with(
+            client.DB.Employee.id, client.DB.Employee.person_id,
+            client.DB.Employee.title)
+
+        del client.DB.Person.foo
+        with self.assertRaises(ValueError):
+            client._load_options(fields=['foo'])
+
+    @patch('uw_person_client.clients.core_client.UWPersonClient._map_adviser')
+    @patch('uw_person_client.clients.core_client.UWPersonClient._get_major')
+    @patch('uw_person_client.clients.core_client.UWPersonClient._map_student')
+    def test_map_person_with_fields(self, mock_map_student, mock_get_major,
+                                    mock_map_adviser):
+        client = self.get_mock_person_client()
+        mock_person = MagicMock()
+        mock_person.student.major_2_id = None
+        mock_person.student.major_3_id = None
+        mock_person.student.class_code = 2
+
+        person = client._map_person(
+            mock_person, fields=['uwnetid', 'active_employee',
+                                 'student.class_code', 'student.majors',
+                                 'employee.primary_department',
+                                 'employee.adviser'])
+        self.assertEqual(sorted(person.to_dict().keys()),
+                         ['active_employee', 'employee', 'student',
+                          'uwnetid'])
+        self.assertEqual(person.uwnetid, mock_person.uwnetid)
+        self.assertEqual(person.active_employee,
+                         mock_person._is_active_employee)
+        self.assertEqual(person.student.to_dict(), {
+            'class_code': '2',
+            'majors': [mock_get_major.return_value]})
+        self.assertEqual(person.employee.to_dict(), {
+            'primary_department': mock_person.employee.department,
+            'adviser': mock_map_adviser.return_value})
+        mock_map_student.assert_not_called()
+
+        person = client._map_person(mock_person, fields=['student'])
+        self.assertEqual(person.student, mock_map_student.return_value)
+        self.assertFalse(hasattr(person, 'employee'))
+
+    @patch.object(UWPersonClient, '_map_person')
+    def test_get_persons_shares_adviser_cache(self, mock_map_person):
+        client = self.get_mock_person_client()
+        mock_query = client.DB.session.query.return_value.options.\
+            return_value
+        mock_query.filter.return_value.all = MagicMock(
+            return_value=[MagicMock(), MagicMock()])
+
+        client.get_active_students()
+        caches = [c.kwargs['adviser_cache']
+                  for c in mock_map_person.call_args_list]
+        self.assertEqual(len(caches), 2)
+        self.assertIs(caches[0], caches[1])
+
+        mock_map_person.reset_mock()
+        client.get_active_students()
+        self.assertIsNot(
+            mock_map_person.call_args_list[0].kwargs['adviser_cache'],
+            caches[0])
+
+    @patch.object(UWPersonClient, '_map_person')
+    def test_map_adviser_person(self, mock_map_person):
+        client = self.get_mock_person_client()
+        mock_adviser1, mock_adviser2 = MagicMock(id=1), MagicMock(id=2)
+        mock_student1, mock_student2 = MagicMock(), MagicMock()
+        mock_student1.adviser = [mock_adviser1, mock_adviser2]
+        mock_student2.adviser = [mock_adviser1]
+        mock_map_person.side_effect = lambda p, **kw: MagicMock()
+
+        adviser_cache = {}
+        advisers1 = client._map_student_relation(
+            mock_student1, 'advisers', adviser_cache)
+        advisers2 = client._map_student_relation(
+            mock_student2, 'advisers', adviser_cache)
+        self.assertIs(advisers1[0], advisers2[0])
+        self.assertIsNot(advisers1[0], advisers1[1])
+        self.assertEqual(mock_map_person.call_count, 2)
+        mock_map_person.assert_any_call(mock_adviser1.employee.person,
+                                        include_student=False)
+
+        # without a cache every adviser is mapped
+        advisers2 = client._map_student_relation(mock_student2, 'advisers')
+        self.assertIsNot(advisers1[0], advisers2[0])
+        self.assertEqual(mock_map_person.call_count, 3)
+
+    @patch('uw_person_client.clients.core_client.UWPersonClient._map_student')
+    @patch('uw_person_client.clients.core_client.UWPersonClient._map_employee')
+    def test_map_person_without_relations(self, mock_map_employee,
+                                          mock_map_student):
+        client = self.get_mock_person_client()
+        mock_person = MagicMock()
+        mock_person.student = None
+        mock_person.employee = None
+
+        person = client._map_person(mock_person)
+        self.assertFalse(hasattr(person, 'student'))
+        self.assertFalse(hasattr(person, 'employee'))
+        mock_map_student.assert_not_called()
+        mock_map_employee.assert_not_called()
+        client.DB.session.query.assert_not_called()
+
     @patch('uw_person_client.clients.core_client.UWPersonClient._map_person')
-    @patch('uw_person_client.clients.core_client.UWPersonClient._map_major')
-    @patch('uw_person_client.clients.core_client.UWPersonClient._map_term')
+    @patch('uw_person_client.clients.core_client.UWPersonClient._get_major')
+    @patch('uw_person_client.clients.core_client.UWPersonClient._get_term')
     @patch('uw_person_client.clients.core_client.UWPersonClient._map_sport')
     @patch('uw_person_client.clients.core_client.UWPersonClient.'
            '_map_transcript')
@@ -381,7 +1111,7 @@ class UWPersonClientTest(TestCase):
     @patch('uw_person_client.clients.core_client.UWPersonClient._map_hold')
     def test_map_student(self, mock_map_hold, mock_map_degree,
                          mock_map_transfer, mock_map_transcript,
-                         mock_map_sport, mock_map_term, mock_map_major,
+                         mock_map_sport, mock_get_term, mock_get_major,
                          mock_map_person):
         client = self.get_mock_person_client()
         mock_student = MagicMock()
@@ -514,8 +1244,9 @@ class UWPersonClientTest(TestCase):
         self.maxDiff = None
         self.assertEqual(sorted(mock_dict.keys()),
                          sorted(student_dict.keys()))
-        mock_map_term.assert_called()
-        mock_map_major.assert_called()
+        mock_get_term.assert_called_once_with(mock_student.academic_term_id)
+        mock_get_major.assert_any_call(mock_student.major_1_id)
+        mock_get_major.assert_any_call(mock_student.pending_major_3_id)
 
     @patch('uw_person_client.clients.core_client.UWPersonClient._map_adviser')
     def test_map_employee(self, mock_map_adviser):
@@ -619,8 +1350,8 @@ class UWPersonClientTest(TestCase):
         self.assertEqual(sorted(mock_dict.keys()),
                          sorted(major.to_dict().keys()))
 
-    @patch('uw_person_client.clients.core_client.UWPersonClient._map_term')
-    def test_map_transcript(self, mock_map_term):
+    @patch('uw_person_client.clients.core_client.UWPersonClient._get_term')
+    def test_map_transcript(self, mock_get_term):
         client = self.get_mock_person_client()
         mock_transcript = MagicMock()
         mock_transcript.tran_term = MagicMock()
@@ -661,11 +1392,11 @@ class UWPersonClientTest(TestCase):
 
         # assertions
         self.assertIsInstance(transcript, Transcript)
-        self.assertEqual(mock_map_term.return_value, transcript.tran_term)
-        mock_map_term.assert_any_call(mock_transcript.tran_term)
-        self.assertEqual(mock_map_term.return_value,
+        self.assertEqual(mock_get_term.return_value, transcript.tran_term)
+        mock_get_term.assert_any_call(mock_transcript.tran_term_id)
+        self.assertEqual(mock_get_term.return_value,
                          transcript.leave_ends_term)
-        mock_map_term.assert_any_call(mock_transcript.leave_ends_term)
+        mock_get_term.assert_any_call(mock_transcript.leave_ends_term_id)
         self.assertEqual(float(mock_transcript.qtr_grade_points),
                          transcript.qtr_grade_points)
         self.assertEqual(float(mock_transcript.qtr_graded_attmp),
@@ -730,8 +1461,8 @@ class UWPersonClientTest(TestCase):
         self.assertEqual(sorted(mock_dict.keys()),
                          sorted(hold.to_dict().keys()))
 
-    @patch('uw_person_client.clients.core_client.UWPersonClient._map_term')
-    def test_map_degree(self, mock_map_term):
+    @patch('uw_person_client.clients.core_client.UWPersonClient._get_term')
+    def test_map_degree(self, mock_get_term):
         client = self.get_mock_person_client()
         mock_degree = MagicMock()
         mock_degree.degree_term = MagicMock()
@@ -763,10 +1494,71 @@ class UWPersonClientTest(TestCase):
 
         # assertions
         self.assertIsInstance(degree, Degree)
-        self.assertEqual(mock_map_term.return_value, degree.degree_term)
+        self.assertEqual(mock_get_term.return_value, degree.degree_term)
+        mock_get_term.assert_called_once_with(mock_degree.degree_term_id)
         self.assertEqual(sorted(mock_dict.keys()),
                          sorted(degree.to_dict().keys()))
 
+    @patch('uw_person_client.clients.core_client.UWPersonClient._map_term')
+    def test_get_term(self, mock_map_term):
+        client = self.get_mock_person_client()
+        mock_term1, mock_term2 = MagicMock(id=1), MagicMock(id=2)
+        client.DB.session.query.return_value = [mock_term1, mock_term2]
+        mock_map_term.side_effect = lambda sqla_term: Term().from_dict(
+            {"year": 2024, "quarter": sqla_term.id})
+
+        self.assertEqual(client._get_term(2).quarter, 2)
+        self.assertEqual(client._get_term(1).quarter, 1)
+        self.assertIsNone(client._get_term(None))
+        client.DB.session.query.assert_called_once_with(client.DB.Term)
+
+        # unknown ids are fetched individually
+        client.DB.session.get.return_value = MagicMock(id=3)
+        self.assertEqual(client._get_term(3).quarter, 3)
+        self.assertEqual(client._get_term(3).quarter, 3)
+        client.DB.session.get.assert_called_once_with(client.DB.Term, 3)
+        client.DB.session.query.assert_called_once_with(client.DB.Term)
+
+    @patch('uw_person_client.clients.core_client.UWPersonClient._map_major')
+    def test_get_major(self, mock_map_major):
+        client = self.get_mock_person_client()
+        client.DB.session.query.return_value = [MagicMock(id=7)]
+        mock_map_major.return_value = Major().from_dict(
+            {"major_abbr_code": "CSE", "major_name": "Computer Science"})
+
+        self.assertIs(client._get_major(7), client._get_major(7))
+        mock_map_major.assert_called_once()
+        client.DB.session.get.return_value = None
+        self.assertIsNone(client._get_major(8))
+
+    @patch('uw_person_client.clients.core_client.UWPersonClient._map_major')
+    def test_get_major_read_only(self, mock_map_major):
+        client = self.get_mock_person_client()
+        client.DB.session.query.return_value = [MagicMock(id=7)]
+        mock_map_major.return_value = Major().from_dict(
+            {"major_abbr_code": "CSE", "major_name": "Computer Science"})
+
+        major = client._get_major(7)
+        self.assertIsInstance(major, Major)
+        with self.assertRaises(AttributeError):
+            major.major_name = "Changed"
+        with self.assertRaises(AttributeError):
+            del major.major_abbr_code
+        with self.assertRaises(AttributeError):
+            major.extra = "Changed"
+        major = client._get_major(7)
+        self.assertEqual(major.major_name, "Computer Science")
+        self.assertEqual(major.major_abbr_code, "CSE")
+        self.assertFalse(hasattr(major, "extra"))
+
+        # copies are writable and not shared
+        for copy in (deepcopy(major), pickle.loads(pickle.dumps(major))):
+            self.assertIs(type(copy), Major)
+            self.assertEqual(copy.to_dict(), major.to_dict())
+            copy.major_name = "Changed"
+            self.assertEqual(client._get_major(7).major_name,
+                             "Computer Science")
+
     def test_map_term(self):
         client = self.get_mock_person_client()
         mock_term = MagicMock()
@@ -780,3 +1572,180 @@ class UWPersonClientTest(TestCase):
         self.assertIsInstance(term, Term)
         self.assertEqual(sorted(mock_dict.keys()),
                          sorted(term.to_dict().keys()))
+
+
+class UWPersonClientSessionTest(TestCase):
+
+    def test_release_session(self):
+        client = UWPersonClient(db=SQLiteDatabase())
+        persons = client.get_persons(page=1, page_size=10, fields="uwnetid")
+        self.assertEqual(persons[0].uwnetid, "netid1")
+        self.assertFalse(client.DB._scoped_session.registry.has())
+
+        with client.session_scope() as session:
+            persons = client.get_persons(
+                page=2, page_size=10, fields="uwnetid")
+            self.assertEqual(persons[0].uwnetid, "netid11")
+            self.assertEqual(len(session.identity_map), 0)
+            self.assertIs(client.DB.session, session)
+
+    def test_release_streamed_batches(self):
+        client = UWPersonClient(db=SQLiteDatabase())
+        with client.session_scope() as session:
+            sizes = [len(session.identity_map) for person in
+                     client.iter_persons(batch_size=50, fields="uwnetid")]
+            self.assertEqual(len(sizes), 2000)
+            self.assertLessEqual(max(sizes), 50)
+            self.assertEqual(len(session.identity_map), 0)
+
+    def test_nested_calls_in_stream(self):
+        client = UWPersonClient(db=SQLiteDatabase())
+        for scope in (False, True):
+            with client.session_scope() if scope else nullcontext():
+                uwnetids = []
+                for person in client.iter_persons(
+                        batch_size=5, fields="uwnetid"):
+                    uwnetids.append(person.uwnetid)
+                    persons = client.get_persons(
+                        page=len(uwnetids), page_size=1, fields="uwnetid")
+                    self.assertEqual(persons[0].uwnetid, person.uwnetid)
+                self.assertEqual(len(uwnetids), 2000)
+                if scope:
+                    self.assertEqual(len(client.DB.session.identity_map), 0)
+                else:
+                    self.assertFalse(
+                        client.DB._scoped_session.registry.has())
+
+    def test_get_adviser_caseloads(self):
+        client = UWPersonClient(db=SQLiteCaseloadDatabase())
+        client._map_person = MagicMock(
+            side_effect=lambda sqla_person, **kwargs: sqla_person.uwnetid)
+        client.lookup_chunk_size = 2
+        statements = []
+        event.listen(client.DB.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: (
+                         statements.append(statement)))
+
+        def get_caseloads(**kwargs):
+            return {key: sorted(persons) for key, persons in
+                    client.get_adviser_caseloads(
+                        fields="uwnetid", **kwargs).items()}
+
+        students = [f"netid{i}" for i in range(4, 8)]
+        self.assertEqual(get_caseloads(uwnetids=[
+            "netid1", "netid2", "netid4", "netid8", "none"]), {
+            "netid1": students, "netid2": []})
+        # each student is mapped once
+        self.assertEqual(client._map_person.call_count, 4)
+        # bound two identifiers at a time
+        self.assertEqual(
+            len([statement for statement in statements
+                 if "student_to_adviser" in statement]), 3)
+        self.assertEqual(
+            get_caseloads(uwnetids=["netid3"], uwregids=["REGID3"]),
+            {"netid3": ["netid6", "netid7"], "REGID3": ["netid6", "netid7"]})
+        self.assertEqual(
+            get_caseloads(uwnetids=["netid1", "netid3"],
+                          advising_program="B"),
+            {"netid3": ["netid6", "netid7"]})
+        self.assertEqual(
+            get_caseloads(uwregids=("REGID2", "REGID3"),
+                          advising_program="A"),
+            {"REGID2": []})
+        self.assertEqual(get_caseloads(), {
+            "netid1": students, "netid3": ["netid6", "netid7"]})
+        self.assertEqual(get_caseloads(uwnetids=[]), {})
+        self.assertRaises(TypeError, client.get_adviser_caseloads,
+                          uwnetids="netid1")
+        self.assertRaises(TypeError, client.get_adviser_caseloads,
+                          uwregids="REGID1")
+
+    def test_persons_updated_since(self):
+        with TemporaryDirectory() as path:
+            client = UWPersonClient(db=SQLiteChangesDatabase(
+                os.path.join(path, "changes.db")))
+            client._map_person = lambda sqla_person, **kwargs: \
+                sqla_person.uwnetid
+            pool = client.DB.engine.pool
+
+            watermark, persons = client.get_persons_updated_since(
+                fields="uwnetid")
+            self.assertEqual(watermark, datetime(2024, 1, 5))
+            self.assertEqual(pool.checkedout(), 0)
+            self.assertEqual(len(list(persons)), 10)
+            self.assertEqual(pool.checkedout(), 0)
+
+            watermark, persons = client.get_persons_updated_since(
+                datetime(2024, 1, 3), fields="uwnetid")
+            self.assertEqual(list(persons), ["netid4", "netid5"])
+            self.assertEqual(pool.checkedout(), 0)
+
+            # keyset pages break ties in the change time by person id
+            uwnetids, page_token = [], None
+            while True:
+                persons, page_token = client.get_persons_updated_since_page(
+                    3, page_token, watermark=watermark, fields="uwnetid")
+                uwnetids.extend(persons)
+                self.assertEqual(pool.checkedout(), 0)
+                if page_token is None:
+                    break
+            self.assertEqual(uwnetids, [
+                f"netid{i}" for i in (1, 6, 7, 8, 9, 10, 2, 3, 4, 5)])
+            self.assertEqual(client.get_persons_updated_since_page(
+                3, since=datetime(2024, 1, 3), watermark=datetime(2024, 1, 4),
+                fields="uwnetid"), (["netid4"], None))
+            with self.assertRaises(InvalidPageTokenException):
+                client.get_persons_updated_since_page(
+                    3, client._encode_page_token(1), fields="uwnetid")
+            client.DB.engine.dispose()
+
+    def test_map_rows(self):
+        client = UWPersonClient(db=SQLiteDatabase())
+        persons = [person.to_dict() for person in client.get_persons(
+            page=2, page_size=10, fields="uwnetid")]
+
+        client.map_rows = True
+        with client.session_scope() as session:
+            self.assertEqual([person.to_dict() for person in
+                              client.get_persons(
+                                  page=2, page_size=10, fields="uwnetid")],
+                             persons)
+            self.assertEqual(len(session.identity_map), 0)
+
+    def test_map_rows_holds(self):
+        client = UWPersonClient(db=SQLiteHoldsDatabase())
+        fields = ["uwnetid", "student.holds"]
+        persons = [person.to_dict() for person in client.get_persons(
+            page=1, page_size=10, fields=fields)]
+        self.assertEqual([[hold["seq"] for hold in person["student"]["holds"]]
+                          for person in persons], [[7, 8, 9], [7, 9], [9]])
+
+        client.map_rows = True
+        self.assertEqual([person.to_dict() for person in client.get_persons(
+            page=1, page_size=10, fields=fields)], persons)
+
+    def test_select_column_lists(self):
+        client = UWPersonClient(db=SQLiteDatabase())
+        query = select(SQLitePerson.id, SQLitePerson.uwnetid)
+        self.assertEqual(
+            client._select_column_lists(query.where(SQLitePerson.id < 4)),
+            {"id": [1, 2, 3], "uwnetid": ["netid1", "netid2", "netid3"]})
+        self.assertEqual(
+            client._select_column_lists(query.where(SQLitePerson.id < 0)),
+            {"id": [], "uwnetid": []})
+
+    def test_memory(self):
+        client = UWPersonClient(db=SQLiteDatabase())
+        tracemalloc.start()
+        try:
+            for page in range(1, 5):
+                client.get_persons(page=page, page_size=100, fields="uwnetid")
+            baseline = tracemalloc.get_traced_memory()[0]
+            # every page loads new rows, which a retained identity map
+            # would keep alive
+            for page in range(5, 21):
+                client.get_persons(page=page, page_size=100, fields="uwnetid")
+            growth = tracemalloc.get_traced_memory()[0] - baseline
+        finally:
+            tracemalloc.stop()
+        self.assertLess(growth, 256 * 1024)
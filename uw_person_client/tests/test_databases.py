@@ -0,0 +1,254 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+import asyncio
+import os
+import re
+from importlib.util import find_spec
+from inspect import getsource
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase, skipUnless
+from unittest.mock import patch, AsyncMock, MagicMock
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from uw_person_client import components
+from uw_person_client.clients.core_client import UWPersonClient
+from uw_person_client.databases import AbstractDatabase, models
+from uw_person_client.databases.uwpds import AsyncUWPDS, UWPDS
+from uw_person_client.databases.routing import EngineRouter, RoutingSession
+
+
+class SQLiteDatabase(AbstractDatabase):
+
+    def create_engine(self):
+        self.engine = create_engine("sqlite://")
+
+
+class AbstractDatabaseTest(TestCase):
+
+    def test_session_per_thread(self):
+        db = SQLiteDatabase()
+        self.assertIs(db.session, db.session)
+        self.assertIs(db.session.get_bind(), db.engine)
+
+        sessions = []
+        thread = Thread(target=lambda: sessions.append(db.session))
+        thread.start()
+        thread.join()
+        self.assertIsNot(sessions[0], db.session)
+
+    def test_session_scope(self):
+        db = SQLiteDatabase()
+        with db.session_scope() as session:
+            self.assertIs(session, db.session)
+            with db.session_scope() as nested_session:
+                self.assertIs(nested_session, session)
+            self.assertIs(db.session, session)
+        self.assertIsNot(db.session, session)
+
+        with self.assertRaises(ValueError):
+            with db.session_scope() as session:
+                raise ValueError()
+        self.assertIsNot(db.session, session)
+
+    def test_stream_scope(self):
+        db = SQLiteDatabase()
+        with db.stream_scope() as session:
+            with db.stream_scope() as nested_session:
+                self.assertIs(nested_session, session)
+                db.release_session()
+            db.release_session()
+            self.assertIs(db.session, session)
+        self.assertFalse(db._scoped_session.registry.has())
+
+
+class EngineRouterTest(TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.engines = {}
+        for name in ["primary", "replica1", "replica2"]:
+            engine = create_engine(
+                f"sqlite:///{os.path.join(self.tmpdir.name, name)}.db")
+            with engine.begin() as connection:
+                connection.execute(text("CREATE TABLE node (name TEXT)"))
+                connection.execute(
+                    text("INSERT INTO node VALUES (:name)"), {"name": name})
+            self.engines[name] = engine
+        self.unavailable = create_engine(
+            f"sqlite:///{self.tmpdir.name}/missing/replica.db")
+
+    def tearDown(self):
+        for engine in self.engines.values():
+            engine.dispose()
+        self.tmpdir.cleanup()
+
+    def get_router(self, replicas, **kwargs):
+        return EngineRouter(self.engines["primary"],
+                            [self.engines.get(name, self.unavailable)
+                             for name in replicas], **kwargs)
+
+    def test_round_robin(self):
+        router = self.get_router(["replica1", "replica2"])
+        self.assertEqual(
+            [router.get_engine() for i in range(4)],
+            [self.engines["replica1"], self.engines["replica2"],
+             self.engines["replica1"], self.engines["replica2"]])
+
+    def test_least_in_use(self):
+        router = self.get_router(["replica1", "replica2"],
+                                 policy="least_in_use")
+        with self.engines["replica1"].connect():
+            self.assertIs(router.get_engine(), self.engines["replica2"])
+        with self.engines["replica2"].connect():
+            self.assertIs(router.get_engine(), self.engines["replica1"])
+
+    @patch('uw_person_client.databases.routing.monotonic')
+    def test_fallback(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        router = self.get_router(["missing", "replica1"], retry_interval=30)
+        with self.assertLogs('uw_person_client.databases.routing'):
+            self.assertIs(router.get_engine(), self.engines["replica1"])
+        self.assertIs(router.get_engine(), self.engines["replica1"])
+
+        router = self.get_router(["missing"])
+        with self.assertLogs('uw_person_client.databases.routing'):
+            self.assertIs(router.get_engine(), self.engines["primary"])
+        self.assertEqual(router._candidates(), [])
+        mock_monotonic.return_value = 131
+        self.assertEqual(router._candidates(), [self.unavailable])
+
+    def test_policy(self):
+        with self.assertRaises(ValueError):
+            self.get_router([], policy="random")
+
+    def test_routing_session(self):
+        router = self.get_router(["replica1", "replica2"])
+
+        class RoutedDatabase(AbstractDatabase):
+            def create_engine(db):
+                db.engine = router.primary
+                db.router = router
+
+        db = RoutedDatabase()
+        self.assertIsInstance(db.session, RoutingSession)
+        nodes = []
+        for i in range(3):
+            with db.session_scope() as session:
+                nodes.append(session.execute(
+                    text("SELECT name FROM node")).scalar())
+                # the session keeps its replica
+                nodes.append(session.execute(
+                    text("SELECT name FROM node")).scalar())
+        self.assertEqual(nodes, ["replica1", "replica1", "replica2",
+                                 "replica2", "replica1", "replica1"])
+
+
+def create_sqlite_engine(db):
+    db.engine = create_engine("sqlite://")
+
+
+class UWPDSTest(TestCase):
+
+    @patch.object(UWPDS, 'initialize_relationships')
+    @patch.object(UWPDS, 'create_engine', autospec=True,
+                  side_effect=create_sqlite_engine)
+    def test_static_models(self, mock_create_engine,
+                           mock_initialize_relationships):
+        db = UWPDS()
+        mock_initialize_relationships.assert_not_called()
+        self.assertIs(db.Person, models.Person)
+        self.assertIs(db.Hold, models.Hold)
+        self.assertIs(db.StudentToAdviser, models.student_to_adviser)
+
+        # the client's loader options resolve against the models
+        client = UWPersonClient(db=db)
+        for kwargs in [{}, {"fields": ["uwnetid", "student.majors",
+                                       "student.advisers", "employee"]}]:
+            sql = str(client._query_persons(**kwargs).statement.compile(
+                dialect=postgresql.dialect()))
+            self.assertIn("FROM person", sql)
+        sql = str(client._query_registered_students().statement.compile(
+            dialect=postgresql.dialect()))
+        self.assertIn("JOIN student ON person.id = student.person_id", sql)
+
+    @patch.object(UWPDS, 'map_classes')
+    @patch.object(UWPDS, 'initialize_relationships')
+    @patch.object(UWPDS, 'create_engine', autospec=True,
+                  side_effect=create_sqlite_engine)
+    def test_reflect_schema(self, mock_create_engine,
+                            mock_initialize_relationships, mock_map_classes):
+        UWPDS(reflect_schema=True)
+        mock_initialize_relationships.assert_called_once()
+        mock_map_classes.assert_called_once_with(UWPDS.Base.classes)
+
+
+def create_mock_async_engine(db):
+    db.engine = MagicMock()
+    db.engine.connect.return_value.__aenter__.return_value = AsyncMock()
+
+
+@skipUnless(find_spec("greenlet"), "requires greenlet")
+class AsyncUWPDSTest(TestCase):
+
+    @patch.object(AsyncUWPDS, 'map_classes')
+    @patch.object(AsyncUWPDS, 'create_engine', autospec=True,
+                  side_effect=create_mock_async_engine)
+    def test_prepare(self, mock_create_engine, mock_map_classes):
+        # created outside of any event loop
+        db = AsyncUWPDS(reflect_schema=True)
+        self.assertIsNone(db._prepare_lock)
+        connection = db.engine.connect.return_value.__aenter__.return_value
+
+        # each run has its own event loop
+        for count in (1, 2):
+            asyncio.run(db.prepare())
+            self.assertEqual(connection.run_sync.await_count, count)
+        connection.run_sync.assert_awaited_with(db.initialize_relationships)
+        self.assertIsInstance(db._prepare_lock, asyncio.Lock)
+        mock_map_classes.assert_called_with(AsyncUWPDS.Base.classes)
+
+
+class ModelsTest(TestCase):
+    # component fields that the mappers build from differently named
+    # model attributes
+    RENAMED = {
+        ("Person", "active_student"): "_is_active_student",
+        ("Person", "active_employee"): "_is_active_employee",
+        ("Employee", "primary_title"): "title",
+        ("Employee", "primary_department"): "department",
+        ("Student", "majors"): "major_1",
+        ("Student", "pending_majors"): "pending_major_1",
+        ("Student", "sports"): "sport",
+        ("Student", "advisers"): "adviser",
+        ("Student", "transcripts"): "transcript",
+        ("Student", "transfers"): "transfer",
+        ("Student", "holds"): "student_hold",
+        ("Student", "degrees"): "degree",
+    }
+
+    def test_mapped_attributes(self):
+        source = getsource(UWPersonClient)
+        # sqla_persons is a list of persons, sqla_row any reference row
+        attributes = set(re.findall(
+            r"\bsqla_([a-z]+)(?<!persons)(?<!row)\.(\w+)", source))
+        self.assertIn(("student", "admitted_for_yr_qtr_id"), attributes)
+        for name, attribute in attributes:
+            model = getattr(models, name.capitalize())
+            self.assertTrue(hasattr(model, attribute),
+                            f"{model.__name__} has no {attribute}")
+
+    def test_component_fields(self):
+        for name in models.CLASSES:
+            model = models.CLASSES[name]
+            component = getattr(components, getattr(model, "__name__", ""),
+                                None)
+            if component is None:
+                continue
+            for field in component.FIELDS:
+                attribute = self.RENAMED.get(
+                    (component.__name__, field), field)
+                self.assertTrue(hasattr(model, attribute),
+                                f"{model.__name__} has no {attribute}")
@@ -0,0 +1,161 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+import csv
+import json
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from uw_person_client.clients.mock_client import MockedUWPersonClient
+from uw_person_client.components import Person
+from uw_person_client.export import (
+    csv_columns, export_persons, flatten, iter_json, main)
+
+
+class ExportTest(TestCase):
+
+    def setUp(self):
+        self.persons = MockedUWPersonClient().get_persons()
+
+    def test_flatten(self):
+        self.assertEqual(flatten({
+            "uwnetid": "javerage",
+            "student": {"student_number": "1234567",
+                        "majors": [{"major_name": "Biology"}]},
+            "employee": {"adviser": {"advising_program": "OMAD"}},
+        }), {
+            "uwnetid": "javerage",
+            "student.student_number": "1234567",
+            "student.majors": [{"major_name": "Biology"}],
+            "employee.adviser.advising_program": "OMAD",
+        })
+
+    def test_export_ndjson(self):
+        fileobj = StringIO()
+        stats = export_persons(iter(self.persons), fileobj)
+        lines = fileobj.getvalue().splitlines()
+        self.assertEqual(stats.count, len(self.persons))
+        self.assertEqual(len(lines), len(self.persons))
+        self.assertEqual([json.loads(line) for line in lines], [
+            json.loads(json.dumps(person.to_dict(), default=str))
+            for person in self.persons])
+
+    def test_export_json(self):
+        fileobj = StringIO()
+        stats = export_persons(iter(self.persons), fileobj, format="json")
+        self.assertEqual(stats.count, len(self.persons))
+        self.assertEqual(json.loads(fileobj.getvalue()), [
+            person.to_dict() for person in self.persons])
+
+        self.assertEqual(fileobj.getvalue(), "".join(iter_json(self.persons)))
+
+        fileobj = StringIO()
+        export_persons([], fileobj, format="json")
+        self.assertEqual(json.loads(fileobj.getvalue()), [])
+
+    def test_iter_json(self):
+        chunks = list(iter_json(iter(self.persons)))
+        self.assertEqual(len(chunks), len(self.persons) + 2)
+        self.assertEqual(json.loads("".join(chunks)), [
+            person.to_dict() for person in self.persons])
+        self.assertEqual("".join(iter_json([])), "[]\n")
+
+    def test_export_csv(self):
+        fileobj = StringIO()
+        export_persons(iter(self.persons), fileobj, format="csv")
+        rows = list(csv.DictReader(StringIO(fileobj.getvalue())))
+        self.assertEqual(len(rows), len(self.persons))
+        self.assertEqual(rows[0]["uwnetid"], self.persons[0].uwnetid)
+        self.assertIn("student.student_number", rows[0])
+        self.assertEqual(json.loads(rows[0]["prior_uwnetids"]),
+                         self.persons[0].prior_uwnetids)
+
+    def test_export_csv_late_columns(self):
+        persons = [Person().from_dict({"uwnetid": f"netid{i}"})
+                   for i in range(3)] + [Person().from_dict({
+                       "uwnetid": "student",
+                       "student": {"student_number": "1234567"}})]
+        fileobj = StringIO()
+        export_persons(persons, fileobj, format="csv")
+        rows = list(csv.DictReader(StringIO(fileobj.getvalue())))
+        self.assertEqual(rows[3]["student.student_number"], "1234567")
+        self.assertEqual(rows[0]["student.student_number"], "")
+        self.assertEqual(list(rows[0]), csv_columns())
+
+    def test_csv_columns(self):
+        columns = csv_columns()
+        self.assertEqual(columns[:2], ["uwnetid", "uwregid"])
+        self.assertIn("student.academic_term.year", columns)
+        self.assertIn("employee.adviser.advising_program", columns)
+        self.assertNotIn("student", columns)
+        self.assertEqual(csv_columns(["uwnetid", "employee.adviser"]), [
+            "uwnetid", "employee.adviser.is_dept_adviser",
+            "employee.adviser.advising_email",
+            "employee.adviser.advising_phone_number",
+            "employee.adviser.advising_program",
+            "employee.adviser.advising_pronouns",
+            "employee.adviser.booking_url"])
+
+    def test_export_csv_columns(self):
+        person = Person().from_dict({"uwnetid": "javerage", "surname": "A"})
+        fileobj = StringIO()
+        export_persons([person], fileobj, format="csv",
+                       columns=["uwnetid", "student.student_number"])
+        self.assertEqual(fileobj.getvalue().splitlines(), [
+            "uwnetid,student.student_number", "javerage,"])
+
+    def test_progress(self):
+        persons = [Person().from_dict({"uwnetid": f"netid{i}"})
+                   for i in range(25)]
+        progress = MagicMock()
+        stats = export_persons(persons, StringIO(), progress=progress,
+                               progress_interval=10)
+        self.assertEqual(progress.call_count, 3)
+        self.assertEqual(stats.to_dict()["count"], 25)
+        for format in ("json", "csv"):
+            progress.reset_mock()
+            stats = export_persons(persons, StringIO(), format,
+                                   progress=progress, progress_interval=10)
+            self.assertEqual(progress.call_count, 3)
+            self.assertEqual(stats.count, 25)
+        self.assertGreaterEqual(stats.rate, 0)
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, export_persons, [], StringIO(), "xml")
+
+    @patch('uw_person_client.UWPersonClient', MockedUWPersonClient,
+           create=True)
+    def test_main(self):
+        with TemporaryDirectory() as path:
+            output = os.path.join(path, "students.csv")
+            self.assertEqual(main(["active-students", "-o", output]), 0)
+            with open(output, newline="") as fileobj:
+                rows = list(csv.DictReader(fileobj))
+        self.assertEqual(len(rows), len(
+            MockedUWPersonClient().get_active_students()))
+
+        with TemporaryDirectory() as path:
+            output = os.path.join(path, "advisers.csv")
+            main(["advisers", "-o", output, "--field", "uwnetid",
+                  "--field", "employee.adviser"])
+            with open(output, newline="") as fileobj:
+                reader = csv.DictReader(fileobj)
+                rows = list(reader)
+        self.assertEqual(reader.fieldnames, csv_columns(
+            ["uwnetid", "employee.adviser"]))
+        self.assertEqual(rows[0]["employee.adviser.advising_program"],
+                         "OMAD Advising")
+
+    @patch('uw_person_client.UWPersonClient', MockedUWPersonClient,
+           create=True)
+    def test_main_json(self):
+        with TemporaryDirectory() as path:
+            output = os.path.join(path, "advisers.json")
+            self.assertEqual(main(["advisers", "-o", output]), 0)
+            with open(output) as fileobj:
+                persons = json.load(fileobj)
+        self.assertEqual(len(persons), len(
+            MockedUWPersonClient().get_advisers()))
@@ -0,0 +1,57 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+import json
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+# cumulative import time allowed for the package and its light modules
+IMPORT_BUDGET_US = 250000
+
+SCRIPT = """
+import json, logging, sys
+import uw_person_client
+import uw_person_client.components
+import uw_person_client.clients.mock_client
+print(json.dumps({
+    "modules": sorted(name for name in sys.modules
+                      if name.split(".")[0] in HEAVY_PACKAGES),
+    "root_handlers": len(logging.getLogger().handlers),
+    "client": uw_person_client.UWPersonClient.__name__,
+}))
+"""
+
+
+class ImportTest(TestCase):
+
+    def run_script(self, *options, env=None):
+        return subprocess.run(
+            [sys.executable, *options, "-c",
+             "HEAVY_PACKAGES = ('sqlalchemy', 'psycopg2', 'commonconf')\n" +
+             SCRIPT],
+            env=dict(os.environ, PYTHONPATH=PACKAGE_PARENT,
+                     UW_PERSON_CLIENT_ENV=env or ""),
+            capture_output=True, text=True, check=True)
+
+    def test_import_side_effects(self):
+        result = json.loads(self.run_script().stdout)
+        self.assertEqual(result["modules"], [])
+        self.assertEqual(result["root_handlers"], 0)
+        self.assertEqual(result["client"], "MockedUWPersonClient")
+
+    def test_import_time(self):
+        stderr = self.run_script("-X", "importtime").stderr
+        cumulative = {}
+        for line in stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, total, name = line.split("|")
+                if total.strip().isdigit():
+                    cumulative[name.strip()] = int(total)
+        for name in ["uw_person_client", "uw_person_client.components",
+                     "uw_person_client.clients.mock_client"]:
+            self.assertLess(cumulative[name], IMPORT_BUDGET_US, name)
@@ -2,8 +2,11 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
+from datetime import datetime
 from unittest import TestCase
-from uw_person_client.exceptions import PersonNotFoundException
+from unittest.mock import patch
+from uw_person_client.exceptions import (
+    InvalidPageTokenException, PersonNotFoundException)
 from uw_person_client.clients.mock_client import MockedUWPersonClient
 
 
@@ -60,6 +63,36 @@ class MockedUWPersonClientTest(TestCase):
         with self.assertRaises(PersonNotFoundException):
             client.get_person_by_student_number(None)
 
+    def test_get_persons_by_uwnetids(self):
+        client = MockedUWPersonClient()
+        persons = client.get_persons_by_uwnetids(["javerage", "foo"])
+        self.assertEqual(persons["javerage"].uwnetid, "javerage")
+        self.assertIsNone(persons["foo"])
+
+    def test_get_persons_by_uwregids(self):
+        client = MockedUWPersonClient()
+        persons = client.get_persons_by_uwregids(
+            ["FE36CCB8F66711D5BE060004AC494FCD", "foo"],
+            include_student=False)
+        person = persons["FE36CCB8F66711D5BE060004AC494FCD"]
+        self.assertEqual(person.uwnetid, "jbothell")
+        self.assertFalse(hasattr(person, "student"))
+        self.assertIsNone(persons["foo"])
+
+    def test_get_persons_by_student_numbers(self):
+        client = MockedUWPersonClient()
+        persons = client.get_persons_by_student_numbers(
+            ["1033334", "1234", None])
+        self.assertEqual(persons["1033334"].uwnetid, "javerage")
+        self.assertIsNone(persons["1234"])
+        self.assertIsNone(persons[None])
+
+    def test_get_persons_by_system_keys(self):
+        client = MockedUWPersonClient()
+        persons = client.get_persons_by_system_keys(["532353230", "12345"])
+        self.assertEqual(persons["532353230"].uwnetid, "javerage")
+        self.assertIsNone(persons["12345"])
+
     def test_get_persons(self):
         client = MockedUWPersonClient()
         persons = client.get_persons()
@@ -93,6 +126,58 @@ class MockedUWPersonClientTest(TestCase):
         persons = client.get_advisers()
         self.assertEqual(len(persons), 1)
 
+    def test_get_persons_page(self):
+        client = MockedUWPersonClient()
+        uwnetids = []
+        persons, page_token = client.get_persons_page(3)
+        uwnetids.extend([person.uwnetid for person in persons])
+        self.assertEqual(len(persons), 3)
+        self.assertIsNotNone(page_token)
+        persons, page_token = client.get_persons_page(3, page_token)
+        uwnetids.extend([person.uwnetid for person in persons])
+        self.assertEqual(len(persons), 1)
+        self.assertIsNone(page_token)
+        self.assertEqual(sorted(uwnetids), sorted(
+            [person.uwnetid for person in client.get_persons()]))
+
+        for page_token in ["foo", "dHJ1ZQ==", 5]:
+            with self.assertRaises(InvalidPageTokenException):
+                client.get_persons_page(3, page_token)
+
+        for page_size in (0, -1):
+            with self.assertRaises(ValueError):
+                client.get_persons_page(page_size)
+
+    def test_get_population_pages(self):
+        client = MockedUWPersonClient()
+        persons, page_token = client.get_registered_students_page(1)
+        self.assertEqual(len(persons), 1)
+        persons, page_token = client.get_registered_students_page(
+            1, page_token)
+        self.assertEqual(len(persons), 1)
+        self.assertIsNone(page_token)
+        persons, page_token = client.get_active_students_page(5)
+        self.assertEqual(len(persons), 2)
+        self.assertIsNone(page_token)
+        persons, page_token = client.get_active_employees_page(2)
+        self.assertEqual(len(persons), 2)
+        self.assertIsNone(page_token)
+        persons, page_token = client.get_advisers_page(
+            5, advising_program="OMAD Advising")
+        self.assertEqual(len(persons), 1)
+        self.assertIsNone(page_token)
+
+    def test_iter_persons(self):
+        client = MockedUWPersonClient()
+        persons = client.iter_persons(batch_size=1)
+        self.assertEqual(len(list(persons)), 4)
+        self.assertEqual(len(list(client.iter_registered_students())), 2)
+        self.assertEqual(len(list(client.iter_active_students())), 2)
+        self.assertEqual(len(list(client.iter_active_employees())), 2)
+        self.assertEqual(len(list(client.iter_advisers())), 1)
+        self.assertEqual(
+            len(list(client.iter_advisers(advising_program="foo"))), 0)
+
     def test_get_persons_by_adviser_netid(self):
         client = MockedUWPersonClient()
         persons = client.get_persons_by_adviser_netid("jadviser")
@@ -108,6 +193,101 @@ class MockedUWPersonClientTest(TestCase):
         persons = client.get_persons_by_adviser_regid("foo")
         self.assertEqual(len(persons), 0)
 
+    def test_session_scope(self):
+        client = MockedUWPersonClient()
+        with client.session_scope():
+            person = client.get_person_by_uwnetid("javerage")
+        self.assertEqual(person.uwnetid, "javerage")
+
+    def test_get_adviser_caseloads(self):
+        client = MockedUWPersonClient()
+        caseloads = client.get_adviser_caseloads(uwnetids=["jadviser"])
+        self.assertEqual(list(caseloads), ["jadviser"])
+        self.assertEqual(len(caseloads["jadviser"]), 2)
+        caseloads = client.get_adviser_caseloads(
+            uwregids=["5136CCB9F66711D5BE060004AC494FF0"],
+            advising_program="OMAD Advising")
+        self.assertEqual(list(caseloads), ["5136CCB9F66711D5BE060004AC494FF0"])
+        self.assertEqual(
+            len(caseloads["5136CCB9F66711D5BE060004AC494FF0"]), 2)
+        caseloads = client.get_adviser_caseloads(
+            uwnetids=["jadviser"],
+            uwregids=["5136CCB9F66711D5BE060004AC494FF0"])
+        self.assertEqual(sorted(caseloads), [
+            "5136CCB9F66711D5BE060004AC494FF0", "jadviser"])
+        self.assertEqual(
+            client.get_adviser_caseloads(advising_program="foo"), {})
+        self.assertEqual(client.get_adviser_caseloads(uwnetids=["foo"]), {})
+        self.assertEqual(client.get_adviser_caseloads(
+            uwnetids=["jadviser"], advising_program="foo"), {})
+        self.assertRaises(TypeError, client.get_adviser_caseloads,
+                          uwnetids="jadviser")
+        with patch.object(client, "get_active_students", return_value=[]):
+            self.assertEqual(client.get_adviser_caseloads(
+                uwnetids=["jadviser", "javerage"]), {"jadviser": []})
+            self.assertEqual(client.get_adviser_caseloads(), {})
+
+    def test_get_persons_updated_since(self):
+        client = MockedUWPersonClient()
+        watermark, persons = client.get_persons_updated_since()
+        self.assertEqual(watermark, datetime(2022, 7, 6, 4, 0, 9, 613000))
+        self.assertEqual(sorted(person.uwnetid for person in persons),
+                         ["javerage", "jbothell"])
+        watermark, persons = client.get_persons_updated_since(watermark)
+        self.assertEqual(list(persons), [])
+        self.assertEqual(client.get_update_watermark(), watermark)
+
+        persons, page_token = client.get_persons_updated_since_page(
+            1, watermark=watermark)
+        self.assertEqual(len(persons), 1)
+        persons, page_token = client.get_persons_updated_since_page(
+            1, page_token, watermark=watermark)
+        self.assertEqual(len(persons), 1)
+        self.assertIsNone(page_token)
+        self.assertEqual(client.get_persons_updated_since_page(
+            1, since=watermark), ([], None))
+
+    def test_get_person_keys(self):
+        client = MockedUWPersonClient()
+        self.assertEqual(client.get_person_keys("advisers"),
+                         {"5136CCB9F66711D5BE060004AC494FF0"})
+        self.assertEqual(len(client.get_person_keys()), 4)
+        self.assertRaises(ValueError, client.get_person_keys, "alumni")
+
+    def test_get_columns(self):
+        client = MockedUWPersonClient()
+        tables = client.get_columns("active_students")
+        self.assertEqual(sorted(tables["person"]["uwnetid"]),
+                         ["javerage", "jbothell"])
+        self.assertEqual(tables["employee"]["uwregid"], [])
+        self.assertEqual(len(tables["student"]["system_key"]), 2)
+        self.assertIn("academic_term_year", tables["student"])
+        self.assertNotIn("majors", tables["student"])
+        self.assertEqual(tables["majors"]["position"], [1, 1])
+        self.assertEqual(tables["advisers"]["uwnetid"],
+                         ["jadviser", "jadviser"])
+        self.assertEqual(tables["advisers"]["advising_program"],
+                         ["OMAD Advising", "OMAD Advising"])
+        self.assertEqual(tables["transcripts"]["tran_term_year"],
+                         [2013, 2013])
+        self.assertEqual(tables["sports"], {"system_key": [],
+                                            "sport_code": []})
+        # each table's columns are of equal length
+        for table in tables.values():
+            self.assertEqual(len({len(values) for values in
+                                  table.values()}), 1)
+
+        tables = client.get_columns("advisers", relations=["holds"])
+        self.assertEqual(sorted(tables), [
+            "employee", "holds", "person", "student"])
+        self.assertEqual(tables["employee"]["uwregid"],
+                         ["5136CCB9F66711D5BE060004AC494FF0"])
+        self.assertEqual(tables["employee"]["primary_title"], [
+            client.get_person_by_uwnetid("jadviser").employee.primary_title])
+        self.assertRaises(ValueError, client.get_columns, "alumni")
+        self.assertRaises(ValueError, client.get_columns,
+                          relations=["alumni"])
+
     def test_person_includes(self):
         client = MockedUWPersonClient()
         filters = {"include_student_transcripts": False,
@@ -137,6 +317,34 @@ class MockedUWPersonClientTest(TestCase):
                                               include_employee=False)
         self.assertFalse(hasattr(person, "employee"))
 
+    def test_person_fields(self):
+        client = MockedUWPersonClient()
+        person = client.get_person_by_uwnetid(
+            "javerage", fields=["uwnetid", "display_name",
+                                "student.student_email", "student.majors"])
+        self.assertEqual(person.display_name, "Jamesy McJamesy")
+        self.assertFalse(hasattr(person, "surname"))
+        self.assertFalse(hasattr(person, "employee"))
+        self.assertEqual(person.student.student_email, "javerage@uw.edu")
+        self.assertEqual(len(person.student.majors), 1)
+        self.assertFalse(hasattr(person.student, "transcripts"))
+
+        persons = client.get_advisers(fields=["uwnetid", "employee"])
+        self.assertEqual(persons[0].employee.adviser.advising_program,
+                         "OMAD Advising")
+        self.assertEqual(sorted(persons[0].to_dict().keys()),
+                         ["employee", "uwnetid"])
+
+    def test_parse_fields(self):
+        client = MockedUWPersonClient()
+        self.assertEqual(client._parse_fields("uwnetid"),
+                         {"person": ["uwnetid"]})
+        self.assertEqual(
+            client._parse_fields(["uwnetid", "student.majors", "student",
+                                  "employee.primary_title"]),
+            {"person": ["uwnetid"], "student": None,
+             "employee": ["primary_title"]})
+
     def test_degree_term(self):
         client = MockedUWPersonClient()
         person = client.get_person_by_uwnetid("javerage")
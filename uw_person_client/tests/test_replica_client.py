@@ -0,0 +1,157 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+from datetime import datetime
+from time import sleep
+from unittest import TestCase
+from unittest.mock import patch
+from uw_person_client.clients.mock_client import MockedUWPersonClient
+from uw_person_client.clients.replica_client import ReplicaUWPersonClient
+from uw_person_client.components import Person
+from uw_person_client.exceptions import PersonNotFoundException
+
+JAVERAGE_REGID = "9136CCB8F66711D5BE060004AC494FFE"
+JBOTHELL_REGID = "FE36CCB8F66711D5BE060004AC494FCD"
+
+
+class ReplicaUWPersonClientTest(TestCase):
+
+    def setUp(self):
+        self.mock_client = MockedUWPersonClient()
+        self.client = ReplicaUWPersonClient(self.mock_client)
+        self.client.load()
+
+    def test_unknown_population(self):
+        self.assertRaises(ValueError, ReplicaUWPersonClient,
+                          self.mock_client, population="alumni")
+
+    def test_load(self):
+        self.assertEqual(set(self.client._persons),
+                         {JAVERAGE_REGID, JBOTHELL_REGID})
+        self.assertEqual(self.client.watermark,
+                         datetime(2022, 7, 6, 4, 0, 9, 613000))
+        self.assertFalse(self.client.is_stale())
+
+        with patch.object(MockedUWPersonClient,
+                          'get_persons_updated_since') as mock_changes:
+            self.client.load()
+            mock_changes.assert_not_called()
+
+    @patch.object(MockedUWPersonClient, 'get_person_by_uwnetid')
+    def test_get_person(self, mock_get_person):
+        person = self.client.get_person_by_uwnetid("javerage")
+        self.assertIs(person, self.client.get_person_by_uwregid(
+            JAVERAGE_REGID))
+        self.assertIs(person, self.client.get_person_by_student_number(
+            1033334))
+        self.assertIs(person, self.client.get_person_by_system_key(
+            "532353230"))
+        # prior identifiers
+        self.assertIs(person, self.client.get_person_by_uwregid(
+            "9136CCB8F66711D5BE060004AC494FF0"))
+        mock_get_person.assert_not_called()
+
+        # misses are passed to the client
+        self.client.get_person_by_uwnetid("jadviser")
+        mock_get_person.assert_called_once_with("jadviser")
+
+    def test_get_person_pruned(self):
+        person = self.client.get_person_by_uwnetid(
+            "javerage", fields=["uwnetid"])
+        self.assertEqual(person.to_dict(), {"uwnetid": "javerage"})
+        self.assertTrue(hasattr(
+            self.client.get_person_by_uwnetid("javerage"), "student"))
+
+    def test_get_person_stale(self):
+        self.client.refreshed -= self.client.max_staleness + 1
+        self.assertTrue(self.client.is_stale())
+        with patch.object(MockedUWPersonClient,
+                          'get_person_by_uwnetid') as mock_get_person:
+            self.client.get_person_by_uwnetid("javerage")
+            mock_get_person.assert_called_once_with("javerage")
+
+    def test_reload(self):
+        self.client.loaded -= self.client.reload_interval
+        self.assertFalse(self.client.is_stale())
+        renamed = self.mock_client.get_person_by_uwregid(JAVERAGE_REGID)
+        renamed.uwnetid = "javerage2"
+        with patch.object(MockedUWPersonClient, 'iter_active_students',
+                          return_value=iter([renamed])), \
+                patch.object(MockedUWPersonClient,
+                             'get_persons_updated_since') as mock_changes:
+            self.client.refresh()
+            mock_changes.assert_not_called()
+        self.assertEqual(list(self.client._persons), [JAVERAGE_REGID])
+        self.assertIs(self.client.get_person_by_uwnetid("javerage2"),
+                      renamed)
+
+        # not reloaded for max_staleness after reload_interval
+        self.client.loaded -= (self.client.reload_interval +
+                               self.client.max_staleness + 1)
+        self.assertTrue(self.client.is_stale())
+
+    def test_get_persons_by_uwnetids(self):
+        persons = self.client.get_persons_by_uwnetids(
+            ["javerage", "jadviser", "foo"])
+        self.assertIs(persons["javerage"],
+                      self.client.get_person_by_uwnetid("javerage"))
+        self.assertEqual(persons["jadviser"].uwnetid, "jadviser")
+        self.assertIsNone(persons["foo"])
+
+    def test_refresh(self):
+        renamed = Person().from_dict({
+            "uwnetid": "javerage2", "uwregid": JAVERAGE_REGID,
+            "prior_uwnetids": ["javerage"], "active_student": True})
+        left = Person().from_dict({
+            "uwnetid": "jbothell", "uwregid": JBOTHELL_REGID,
+            "active_student": False})
+        watermark = datetime(2024, 1, 1)
+        with patch.object(MockedUWPersonClient, 'get_persons_updated_since',
+                          return_value=(watermark, iter([renamed, left]))), \
+                patch.object(MockedUWPersonClient,
+                             'get_person_keys') as mock_get_keys:
+            self.client.refresh()
+            # keys are checked every key_check_interval
+            mock_get_keys.assert_not_called()
+        self.assertEqual(self.client.watermark, watermark)
+        self.assertIs(self.client.get_person_by_uwnetid("javerage"), renamed)
+        self.assertIs(self.client.get_person_by_uwnetid("javerage2"),
+                      renamed)
+        # removed from the population
+        self.assertEqual(list(self.client._persons), [JAVERAGE_REGID])
+        self.assertEqual(self.client.get_person_by_uwnetid(
+            "jbothell").uwnetid, "jbothell")
+
+    def test_refresh_keys(self):
+        self.client.keys_checked -= self.client.key_check_interval
+        with patch.object(MockedUWPersonClient, 'get_person_keys',
+                          return_value={JAVERAGE_REGID}):
+            self.client.refresh()
+        self.assertEqual(list(self.client._persons), [JAVERAGE_REGID])
+
+    def test_check_keys_added(self):
+        with patch.object(MockedUWPersonClient, 'get_person_keys',
+                          return_value={JAVERAGE_REGID, JBOTHELL_REGID,
+                                        "5136CCB9F66711D5BE060004AC494FF0"}):
+            self.assertEqual(self.client.check_keys(), 1)
+        with patch.object(MockedUWPersonClient,
+                          'get_person_by_uwnetid') as mock_get_person:
+            person = self.client.get_person_by_uwnetid("jadviser")
+            mock_get_person.assert_not_called()
+        self.assertEqual(person.uwregid, "5136CCB9F66711D5BE060004AC494FF0")
+
+    def test_start(self):
+        client = ReplicaUWPersonClient(self.mock_client,
+                                       refresh_interval=0.01)
+        with patch.object(ReplicaUWPersonClient, 'refresh',
+                          side_effect=PersonNotFoundException) as refresh, \
+                patch('uw_person_client.clients.replica_client.logger') as \
+                mock_logger:
+            client.start()
+            sleep(0.1)
+            client.stop()
+        # failed refreshes are logged and retried
+        self.assertGreater(refresh.call_count, 1)
+        mock_logger.exception.assert_called()
+        self.assertIsNone(client._thread)
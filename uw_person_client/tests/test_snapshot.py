@@ -0,0 +1,199 @@
+# Copyright 2024 UW-IT, University of Washington
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from uw_person_client.clients.mock_client import MockedUWPersonClient
+from uw_person_client.clients.snapshot_client import SnapshotUWPersonClient
+from uw_person_client.exceptions import (
+    AdviserNotFoundException, PersonNotFoundException)
+from uw_person_client.snapshot import Snapshot, build_snapshot
+
+
+class SnapshotTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "persons.snapshot")
+        self.mock_client = MockedUWPersonClient()
+        self.count = build_snapshot(self.mock_client.iter_persons(),
+                                    self.path)
+        self.client = SnapshotUWPersonClient(self.path)
+
+    def tearDown(self):
+        self.client.close()
+        self.directory.cleanup()
+
+    def assertSamePersons(self, persons, expected):
+        self.assertEqual(
+            sorted([person.to_dict() for person in persons],
+                   key=lambda person: person["uwnetid"]),
+            sorted([person.to_dict() for person in expected],
+                   key=lambda person: person["uwnetid"]))
+
+    def test_build_snapshot(self):
+        self.assertEqual(self.count, len(self.mock_client.get_persons()))
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+        snapshot = Snapshot(self.path)
+        self.assertEqual(snapshot.count, self.count)
+        self.assertEqual(snapshot.find("uwnetid", "nobody"), [])
+        self.assertEqual(len(snapshot.find("adviser_uwnetid", "jadviser")),
+                         2)
+        snapshot.close()
+
+    def test_not_a_snapshot(self):
+        path = os.path.join(self.directory.name, "persons.json")
+        with open(path, "wb") as fileobj:
+            fileobj.write(b"{}" * 16)
+        self.assertRaises(ValueError, Snapshot, path)
+
+    def test_get_person(self):
+        for method, value in [
+                ("get_person_by_uwnetid", "javerage"),
+                ("get_person_by_uwregid",
+                 "FE36CCB8F66711D5BE060004AC494FCD"),
+                ("get_person_by_student_number", 1033334),
+                ("get_person_by_system_key", "532353230")]:
+            self.assertEqual(
+                getattr(self.client, method)(value).to_dict(),
+                getattr(self.mock_client, method)(value).to_dict())
+            self.assertRaises(PersonNotFoundException,
+                              getattr(self.client, method), "1")
+
+    def test_get_person_by_prior_identifier(self):
+        self.assertEqual(
+            self.client.get_person_by_uwnetid("jadviser1").uwnetid,
+            "jadviser")
+        self.assertEqual(self.client.get_person_by_uwregid(
+            "9136CCB8F66711D5BE060004AC494FF0").uwnetid, "javerage")
+
+    def test_get_person_pruned(self):
+        person = self.client.get_person_by_uwnetid(
+            "javerage", include_student_transcripts=False)
+        self.assertFalse(hasattr(person.student, "transcripts"))
+        person = self.client.get_person_by_uwnetid(
+            "javerage", fields=["uwnetid", "student.student_number"])
+        self.assertEqual(person.to_dict(), {
+            "uwnetid": "javerage", "student": {"student_number": "1033334"}})
+
+    def test_get_persons_by_uwnetids(self):
+        persons = self.client.get_persons_by_uwnetids(["javerage", "none"])
+        self.assertEqual(persons["javerage"].uwnetid, "javerage")
+        self.assertIsNone(persons["none"])
+
+    def test_populations(self):
+        for method in ["get_persons", "get_registered_students",
+                       "get_active_students", "get_active_employees",
+                       "get_advisers"]:
+            self.assertSamePersons(getattr(self.client, method)(),
+                                   getattr(self.mock_client, method)())
+        self.assertSamePersons(
+            self.client.get_advisers(advising_program="OMAD"),
+            self.mock_client.get_advisers(advising_program="OMAD"))
+        self.assertEqual(len(self.client.get_persons(page=2, page_size=3)),
+                         self.count - 3)
+
+    def test_pages(self):
+        persons, page_token = self.client.get_persons_page(3)
+        self.assertEqual(len(persons), 3)
+        persons, page_token = self.client.get_persons_page(3, page_token)
+        self.assertEqual(len(persons), self.count - 3)
+        self.assertIsNone(page_token)
+        for page_size in (0, -1):
+            self.assertRaises(ValueError, self.client.get_persons_page,
+                              page_size)
+        self.assertSamePersons(self.client.iter_active_students(),
+                               self.mock_client.get_active_students())
+
+    def test_adviser_persons(self):
+        self.assertSamePersons(
+            self.client.get_persons_by_adviser_netid("jadviser"),
+            self.mock_client.get_persons_by_adviser_netid("jadviser"))
+        self.assertRaises(AdviserNotFoundException,
+                          self.client.get_persons_by_adviser_netid,
+                          "javerage")
+        self.assertRaises(AdviserNotFoundException,
+                          self.client.get_persons_by_adviser_regid, "none")
+
+    def test_get_adviser_caseloads(self):
+        for kwargs in [{}, {"uwnetids": ["jadviser"]},
+                       {"uwregids": ["5136CCB9F66711D5BE060004AC494FF0"]},
+                       {"uwnetids": ["jadviser"],
+                        "uwregids": ["5136CCB9F66711D5BE060004AC494FF0"]},
+                       {"advising_program": "none"}]:
+            caseloads = self.client.get_adviser_caseloads(**kwargs)
+            expected = self.mock_client.get_adviser_caseloads(**kwargs)
+            self.assertEqual(sorted(caseloads), sorted(expected))
+            for key, persons in caseloads.items():
+                self.assertSamePersons(persons, expected[key])
+        self.assertRaises(TypeError, self.client.get_adviser_caseloads,
+                          uwregids="5136CCB9F66711D5BE060004AC494FF0")
+
+    def test_get_adviser_caseloads_empty(self):
+        path = os.path.join(self.directory.name, "advisers.snapshot")
+        build_snapshot(self.mock_client.iter_advisers(), path)
+        client = SnapshotUWPersonClient(path)
+        self.assertEqual(client.get_adviser_caseloads(
+            uwnetids=["jadviser", "javerage"],
+            uwregids=["5136CCB9F66711D5BE060004AC494FF0"]), {
+            "jadviser": [], "5136CCB9F66711D5BE060004AC494FF0": []})
+        self.assertEqual(client.get_adviser_caseloads(
+            uwnetids=["jadviser"], advising_program="none"), {})
+        self.assertEqual(client.get_adviser_caseloads(), {})
+        client.close()
+
+    def test_get_person_keys(self):
+        for population in ["persons", "registered_students",
+                           "active_students", "active_employees",
+                           "advisers"]:
+            self.assertEqual(self.client.get_person_keys(population),
+                             self.mock_client.get_person_keys(population))
+        self.assertEqual(
+            self.client.get_person_keys("advisers", advising_program="none"),
+            set())
+        self.assertRaises(ValueError, self.client.get_person_keys, "alumni")
+
+    def test_get_columns(self):
+        self.assertEqual(self.client.get_columns("active_students"),
+                         self.mock_client.get_columns("active_students"))
+        self.assertRaises(ValueError, self.client.get_columns, "alumni")
+
+    def test_persons_updated_since(self):
+        watermark = self.mock_client.get_update_watermark()
+        self.assertEqual(self.client.get_update_watermark(), watermark)
+        snapshot = Snapshot(self.path)
+        self.assertEqual(snapshot.watermark, watermark)
+        snapshot.close()
+
+        expected_watermark, expected = \
+            self.mock_client.get_persons_updated_since()
+        expected = [person.uwnetid for person in expected]
+        watermark, persons = self.client.get_persons_updated_since()
+        self.assertEqual(watermark, expected_watermark)
+        self.assertEqual([person.uwnetid for person in persons], expected)
+        watermark, persons = self.client.get_persons_updated_since(
+            watermark)
+        self.assertEqual(list(persons), [])
+
+        persons, page_token = self.client.get_persons_updated_since_page(
+            1, watermark=watermark, fields="uwnetid")
+        self.assertEqual([person.to_dict() for person in persons],
+                         [{"uwnetid": expected[0]}])
+        persons, page_token = self.client.get_persons_updated_since_page(
+            1, page_token, watermark=watermark, fields="uwnetid")
+        self.assertEqual([person.uwnetid for person in persons],
+                         expected[1:])
+        self.assertIsNone(page_token)
+        self.assertEqual(self.client.get_persons_updated_since_page(
+            1, since=watermark), ([], None))
+
+    def test_persons_updated_since_none(self):
+        path = os.path.join(self.directory.name, "employees.snapshot")
+        build_snapshot(self.mock_client.iter_active_employees(), path)
+        client = SnapshotUWPersonClient(path)
+        self.assertIsNone(client.get_update_watermark())
+        watermark, persons = client.get_persons_updated_since("since")
+        self.assertEqual((watermark, list(persons)), ("since", []))
+        client.close()